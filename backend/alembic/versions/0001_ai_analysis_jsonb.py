@@ -0,0 +1,48 @@
+"""Store ai_analysis as JSONB with extracted, indexed fields
+
+The existing Text column is kept as ai_analysis_legacy so the upgrade is a
+cheap metadata-only change; run scripts/backfill_ai_analysis.py afterwards
+to convert existing rows in batches.
+
+Revision ID: 0001
+Revises:
+Create Date: 2024-12-10
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.alter_column("glove_listings", "ai_analysis", new_column_name="ai_analysis_legacy")
+    op.add_column("glove_listings", sa.Column("ai_analysis", postgresql.JSONB(), nullable=True))
+    op.add_column("glove_listings", sa.Column("ai_suggested_price_eur", sa.Float(), nullable=True))
+    op.add_column("glove_listings", sa.Column("ai_is_valid_glove", sa.Boolean(), nullable=True))
+    op.add_column("glove_listings", sa.Column("ai_model_version", sa.String(100), nullable=True))
+    op.create_index("ix_glove_listings_ai_is_valid_glove", "glove_listings", ["ai_is_valid_glove"])
+    op.create_index("ix_glove_listings_ai_model_version", "glove_listings", ["ai_model_version"])
+    op.create_index(
+        "ix_glove_listings_postal_code_price",
+        "glove_listings",
+        ["postal_code", "ai_suggested_price_eur"],
+    )
+
+
+def downgrade():
+    op.drop_index("ix_glove_listings_postal_code_price", table_name="glove_listings")
+    op.drop_index("ix_glove_listings_ai_model_version", table_name="glove_listings")
+    op.drop_index("ix_glove_listings_ai_is_valid_glove", table_name="glove_listings")
+    op.execute(
+        "UPDATE glove_listings SET ai_analysis_legacy = ai_analysis::text "
+        "WHERE ai_analysis IS NOT NULL AND ai_analysis_legacy IS NULL"
+    )
+    op.drop_column("glove_listings", "ai_model_version")
+    op.drop_column("glove_listings", "ai_is_valid_glove")
+    op.drop_column("glove_listings", "ai_suggested_price_eur")
+    op.drop_column("glove_listings", "ai_analysis")
+    op.alter_column("glove_listings", "ai_analysis_legacy", new_column_name="ai_analysis")
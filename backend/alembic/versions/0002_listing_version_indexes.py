@@ -0,0 +1,26 @@
+"""Indexes backing ETag data versions (max updated_at, per postal code)
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2024-12-12
+"""
+from alembic import op
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index("ix_glove_listings_updated_at", "glove_listings", ["updated_at"])
+    op.create_index(
+        "ix_glove_listings_postal_code_updated_at",
+        "glove_listings",
+        ["postal_code", "updated_at"],
+    )
+
+
+def downgrade():
+    op.drop_index("ix_glove_listings_postal_code_updated_at", table_name="glove_listings")
+    op.drop_index("ix_glove_listings_updated_at", table_name="glove_listings")
@@ -0,0 +1,87 @@
+"""Listing lifecycle: expired status, archive table, FK-free child references
+
+Reports and contact requests keep pointing at listings after those move to
+glove_listings_archive, so their foreign keys become plain indexed columns.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2024-12-15
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+def enum_type(name):
+    return postgresql.ENUM(name=name, create_type=False)
+
+
+def upgrade():
+    # SQLAlchemy stores enum member names
+    with op.get_context().autocommit_block():
+        op.execute("ALTER TYPE listingstatus ADD VALUE IF NOT EXISTS 'EXPIRED'")
+
+    op.drop_constraint("glove_reports_listing_id_fkey", "glove_reports", type_="foreignkey")
+    op.drop_constraint("contact_requests_listing_id_fkey", "contact_requests", type_="foreignkey")
+    op.create_index("ix_glove_reports_listing_id", "glove_reports", ["listing_id"])
+    op.create_index("ix_contact_requests_listing_id", "contact_requests", ["listing_id"])
+
+    op.create_index("ix_glove_listings_status_created_at", "glove_listings", ["status", "created_at"])
+    op.create_index("ix_glove_listings_status_updated_at", "glove_listings", ["status", "updated_at"])
+
+    op.create_table(
+        "glove_listings_archive",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=False),
+        sa.Column("photo_url", sa.String(500), nullable=False),
+        sa.Column("photo_filename", sa.String(255), nullable=False),
+        sa.Column("brand", sa.String(100)),
+        sa.Column("color", sa.String(50), nullable=False),
+        sa.Column("size", enum_type("glovesize")),
+        sa.Column("side", enum_type("gloveside")),
+        sa.Column("material", sa.String(100)),
+        sa.Column("description", sa.Text()),
+        sa.Column("postal_code", sa.String(5), nullable=False),
+        sa.Column("found_date", sa.DateTime(), nullable=False),
+        sa.Column("found_location_description", sa.String(255)),
+        sa.Column("finder_email", sa.String(255), nullable=False),
+        sa.Column("finder_display_name", sa.String(100)),
+        sa.Column("fee_amount", sa.Float()),
+        sa.Column("fee_currency", enum_type("feecurrency")),
+        sa.Column("status", enum_type("listingstatus")),
+        sa.Column("confidence_score", sa.Float()),
+        sa.Column("ai_moderation_passed", sa.Boolean()),
+        sa.Column("ai_moderation_notes", sa.Text()),
+        sa.Column("ai_analysis", postgresql.JSONB()),
+        sa.Column("ai_suggested_price_eur", sa.Float()),
+        sa.Column("ai_is_valid_glove", sa.Boolean()),
+        sa.Column("ai_model_version", sa.String(100)),
+        sa.Column("created_at", sa.DateTime()),
+        sa.Column("updated_at", sa.DateTime()),
+        sa.Column("archived_at", sa.DateTime(), server_default=sa.func.now()),
+    )
+    op.create_index("ix_glove_listings_archive_found_date", "glove_listings_archive", ["found_date"])
+    op.create_index(
+        "ix_glove_listings_archive_postal_code_status",
+        "glove_listings_archive",
+        ["postal_code", "status"],
+    )
+
+
+def downgrade():
+    # Archived rows are not moved back; the EXPIRED enum value can't be dropped in Postgres
+    op.drop_table("glove_listings_archive")
+    op.drop_index("ix_glove_listings_status_updated_at", table_name="glove_listings")
+    op.drop_index("ix_glove_listings_status_created_at", table_name="glove_listings")
+    op.drop_index("ix_contact_requests_listing_id", table_name="contact_requests")
+    op.drop_index("ix_glove_reports_listing_id", table_name="glove_reports")
+    op.create_foreign_key(
+        "contact_requests_listing_id_fkey", "contact_requests", "glove_listings", ["listing_id"], ["id"]
+    )
+    op.create_foreign_key(
+        "glove_reports_listing_id_fkey", "glove_reports", "glove_listings", ["listing_id"], ["id"]
+    )
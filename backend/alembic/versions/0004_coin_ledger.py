@@ -0,0 +1,42 @@
+"""Append-only Postaal coin ledger with compacted balance snapshots
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2024-12-18
+"""
+import sqlalchemy as sa
+from alembic import op
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "coin_transactions",
+        sa.Column("id", sa.BigInteger().with_variant(sa.Integer(), "sqlite"), primary_key=True, autoincrement=True),
+        sa.Column("transfer_key", sa.String(100), nullable=False),
+        sa.Column("account_email", sa.String(255), nullable=False),
+        sa.Column("counterparty_email", sa.String(255), nullable=True),
+        sa.Column("amount", sa.Integer(), nullable=False),
+        sa.Column("kind", sa.String(20), nullable=False),
+        sa.Column("listing_id", sa.Integer(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), server_default=sa.func.now()),
+        sa.UniqueConstraint("transfer_key", "account_email", name="uq_coin_transactions_key_account"),
+    )
+    op.create_index("ix_coin_transactions_account_id", "coin_transactions", ["account_email", "id"])
+    op.create_table(
+        "coin_balance_snapshots",
+        sa.Column("account_email", sa.String(255), primary_key=True),
+        sa.Column("balance", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("last_transaction_id", sa.BigInteger(), nullable=False, server_default="0"),
+        sa.Column("updated_at", sa.DateTime(), server_default=sa.func.now()),
+    )
+
+
+def downgrade():
+    op.drop_table("coin_balance_snapshots")
+    op.drop_index("ix_coin_transactions_account_id", table_name="coin_transactions")
+    op.drop_table("coin_transactions")
@@ -0,0 +1,58 @@
+"""Saved search alerts with a postal-code-scoped inverted index
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2024-12-20
+"""
+import sqlalchemy as sa
+from alembic import op
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "glove_alerts",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("email", sa.String(255), nullable=False),
+        sa.Column("postal_codes", sa.String(255), nullable=False),
+        sa.Column("brand", sa.String(100), nullable=True),
+        sa.Column("color", sa.String(100), nullable=True),
+        sa.Column("size", sa.String(10), nullable=True),
+        sa.Column("side", sa.String(10), nullable=True),
+        sa.Column("required_terms", sa.Integer(), nullable=False),
+        sa.Column("unsubscribe_token", sa.String(64), nullable=False, unique=True),
+        sa.Column("is_active", sa.Boolean(), nullable=False, server_default=sa.true()),
+        sa.Column("created_at", sa.DateTime(), server_default=sa.func.now()),
+        sa.Column("last_notified_at", sa.DateTime(), nullable=True),
+    )
+    op.create_index("ix_glove_alerts_id", "glove_alerts", ["id"])
+    op.create_index("ix_glove_alerts_email", "glove_alerts", ["email"])
+
+    op.create_table(
+        "glove_alert_terms",
+        sa.Column("term", sa.String(120), primary_key=True),
+        sa.Column("alert_id", sa.Integer(), primary_key=True),
+    )
+    op.create_index("ix_glove_alert_terms_alert_id", "glove_alert_terms", ["alert_id"])
+
+    op.create_table(
+        "glove_alert_matches",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("alert_id", sa.Integer(), nullable=False),
+        sa.Column("listing_id", sa.Integer(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), server_default=sa.func.now()),
+        sa.Column("notified_at", sa.DateTime(), nullable=True),
+        sa.UniqueConstraint("alert_id", "listing_id", name="uq_glove_alert_matches_alert_listing"),
+    )
+    op.create_index("ix_glove_alert_matches_id", "glove_alert_matches", ["id"])
+    op.create_index("ix_glove_alert_matches_notified_at_id", "glove_alert_matches", ["notified_at", "id"])
+
+
+def downgrade():
+    op.drop_table("glove_alert_matches")
+    op.drop_table("glove_alert_terms")
+    op.drop_table("glove_alerts")
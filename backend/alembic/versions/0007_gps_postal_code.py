@@ -0,0 +1,23 @@
+"""Postal code resolved from the photo's EXIF GPS
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2024-12-21
+"""
+import sqlalchemy as sa
+from alembic import op
+
+revision = "0007"
+down_revision = "0006"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column("glove_listings", sa.Column("gps_postal_code", sa.String(5), nullable=True))
+    op.add_column("glove_listings_archive", sa.Column("gps_postal_code", sa.String(5), nullable=True))
+
+
+def downgrade():
+    op.drop_column("glove_listings_archive", "gps_postal_code")
+    op.drop_column("glove_listings", "gps_postal_code")
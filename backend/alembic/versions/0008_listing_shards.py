@@ -0,0 +1,26 @@
+"""Listing directory for region sharding
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2024-12-23
+"""
+import sqlalchemy as sa
+from alembic import op
+
+revision = "0008"
+down_revision = "0007"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "listing_shards",
+        sa.Column("listing_id", sa.Integer(), primary_key=True),
+        sa.Column("shard", sa.String(50), nullable=False),
+        sa.Column("created_at", sa.DateTime(), server_default=sa.func.now()),
+    )
+
+
+def downgrade():
+    op.drop_table("listing_shards")
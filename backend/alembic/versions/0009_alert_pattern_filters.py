@@ -0,0 +1,45 @@
+"""Alert brand / color filters match as patterns, not index terms
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2024-12-24
+"""
+import sqlalchemy as sa
+from alembic import op
+
+revision = "0009"
+down_revision = "0008"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute("DELETE FROM glove_alert_terms WHERE term LIKE '%:brand:%' OR term LIKE '%:color:%'")
+    op.execute("""
+        UPDATE glove_alerts SET required_terms = 1
+            + CASE WHEN size IS NULL THEN 0 ELSE 1 END
+            + CASE WHEN side IS NULL THEN 0 ELSE 1 END
+    """)
+
+
+def downgrade():
+    conn = op.get_bind()
+    alerts = conn.execute(sa.text(
+        "SELECT id, postal_codes, brand, color FROM glove_alerts WHERE brand IS NOT NULL OR color IS NOT NULL"
+    )).all()
+    terms = [
+        {"term": f"{code}:{field}:{' '.join(value.split())}", "alert_id": alert.id}
+        for alert in alerts
+        for code in alert.postal_codes.split(",")
+        for field, value in (("brand", alert.brand), ("color", alert.color))
+        if value
+    ]
+    if terms:
+        conn.execute(sa.text("INSERT INTO glove_alert_terms (term, alert_id) VALUES (:term, :alert_id)"), terms)
+    op.execute("""
+        UPDATE glove_alerts SET required_terms = 1
+            + CASE WHEN size IS NULL THEN 0 ELSE 1 END
+            + CASE WHEN side IS NULL THEN 0 ELSE 1 END
+            + CASE WHEN brand IS NULL THEN 0 ELSE 1 END
+            + CASE WHEN color IS NULL THEN 0 ELSE 1 END
+    """)
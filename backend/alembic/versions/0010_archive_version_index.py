@@ -0,0 +1,20 @@
+"""Index backing the archive part of the stats ETag (max archived_at)
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2024-12-25
+"""
+from alembic import op
+
+revision = "0010"
+down_revision = "0009"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index("ix_glove_listings_archive_archived_at", "glove_listings_archive", ["archived_at"])
+
+
+def downgrade():
+    op.drop_index("ix_glove_listings_archive_archived_at", table_name="glove_listings_archive")
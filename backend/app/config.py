@@ -6,6 +6,16 @@ class Settings(BaseSettings):
     # Database - PostgreSQL in production, set via DATABASE_URL env var
     database_url: str = "postgresql://localhost/postalcodeworx"
     
+    # Optional read replica for read-only endpoints
+    database_read_url: str = ""
+    read_your_writes_seconds: float = 5.0  # Keep a client's reads on the primary this long after a write
+    replica_max_lag_seconds: float = 10.0  # Fall back to the primary when the replica lags more
+    replica_lag_check_interval: float = 5.0
+    
+    # Region sharding of listings (off unless shard URLs are set, see app/sharding.py)
+    shard_database_urls: str = ""  # e.g. "hamburg=postgresql://.../pcw_hamburg,munich=sqlite:///./munich.db"
+    shard_routes: str = ""  # PLZ prefix -> shard, e.g. "2=hamburg,8=munich"; other codes use DATABASE_URL
+    
     # Anthropic Claude API
     anthropic_api_key: str = ""
     
@@ -16,15 +26,153 @@ class Settings(BaseSettings):
     max_upload_size: int = 5 * 1024 * 1024  # 5MB
     upload_dir: str = "./uploads"
     
+    # Photo storage - "local" (sharded upload_dir) or "s3" (any S3-compatible store)
+    storage_backend: str = "local"
+    upload_shard_depth: int = 2  # uploads/ab/cd/<uuid>.jpg
+    s3_bucket: str = ""
+    s3_endpoint_url: str = ""  # e.g. http://localhost:9000 for MinIO
+    s3_region: str = ""
+    s3_access_key_id: str = ""
+    s3_secret_access_key: str = ""
+    s3_public_url: str = ""  # CDN or public bucket URL used in photo_url
+    s3_key_prefix: str = "gloves"
+    s3_max_pool_connections: int = 20
+    s3_multipart_threshold: int = 8 * 1024 * 1024
+    s3_multipart_chunksize: int = 8 * 1024 * 1024
+    
+    # Photo garbage collection (see services/photo_gc.py)
+    photo_gc_interval_seconds: float = 6 * 3600.0
+    photo_gc_orphan_grace_hours: float = 24.0  # Unreferenced files younger than this are kept (uploads in flight)
+    photo_gc_dead_retention_days: float = 7.0  # Photos of removed/expired listings are kept this long after the last change
+    photo_gc_batch_size: int = 5000  # photo_filename rows fetched per batch
+    photo_gc_max_deletes: int = 10000  # Per pass, a safety stop
+    
+    # HTTP caching & compression
+    gzip_minimum_size: int = 1024  # Only compress responses larger than this (bytes)
+    cache_control_search: str = "public, max-age=0, must-revalidate"
+    cache_control_stats: str = "public, max-age=60, stale-while-revalidate=300"
+    cache_control_detail: str = "private, max-age=0, must-revalidate"
+    detail_cache_ttl_seconds: float = 60.0  # In-process listing detail cache (also checked against updated_at)
+    detail_cache_max_entries: int = 5000
+    facet_cache_ttl_seconds: float = 300.0  # Facet counts per filter set (also checked against updated_at)
+    facet_cache_max_entries: int = 2000
+    facet_max_values: int = 20  # Most common values returned per facet
+    
+    # In-memory columnar search index of active listings (see services/search_index.py)
+    search_index_enabled: bool = False
+    search_index_refresh_seconds: float = 2.0  # Change feed poll; results can lag writes on other workers this long
+    search_index_feed_overlap_seconds: float = 30.0  # Re-read window for transactions that commit late
+    search_index_rebuild_seconds: float = 3600.0  # Full reload
+    search_index_batch_size: int = 5000  # Rows fetched per batch during a reload
+    
+    # Rate limiting & admission control for Claude-backed endpoints
+    rate_limit_enabled: bool = True
+    rate_limit_redis_url: str = ""  # Share buckets across workers, e.g. redis://localhost:6379/0
+    rate_limit_analyze: str = "10/minute"  # Per client IP and per email
+    rate_limit_upload: str = "5/minute"
+    rate_limit_contact: str = "5/minute"
+    rate_limit_alert: str = "10/hour"
+    trust_proxy_headers: bool = True  # Use X-Forwarded-For for the client IP (Render proxy)
+    trusted_proxy_hops: int = 1  # Proxies in front of the app that append to X-Forwarded-For (Render: 1)
+    claude_max_in_flight: int = 8  # Concurrent Claude calls per worker
+    claude_admission_wait_seconds: float = 2.0  # Wait this long for a slot before returning 503
+    
+    # Claude model routing: fast model screens first, large model only when needed
+    claude_model_large: str = "claude-sonnet-4-20250514"
+    claude_model_fast: str = "claude-3-5-haiku-20241022"
+    claude_model_moderation: str = ""  # Defaults to the fast model
+    claude_cascade_enabled: bool = True
+    claude_escalation_confidence: float = 0.8  # Escalate when the fast model is less sure than this
+    
+    # Claude output limits per operation (tool-call output is compact JSON)
+    claude_analysis_max_tokens: int = 600
+    claude_moderation_max_tokens: int = 128
+    
+    # Claude resilience
+    claude_request_deadline_seconds: float = 45.0  # Total time budget per call, retries included
+    claude_max_attempts: int = 3
+    claude_retry_base_delay: float = 0.5  # Full-jitter exponential backoff base (seconds)
+    claude_retry_budget_ratio: float = 0.2  # At most ~20% extra calls from retries
+    claude_breaker_failure_threshold: int = 5  # Consecutive failures before the breaker opens
+    claude_breaker_reset_seconds: float = 30.0  # Cool-down before a half-open probe
+    degraded_mode_enabled: bool = True  # Accept uploads as pending_moderation while Claude is down
+    
+    # Local photo pre-screen before any Claude call (see services/image_quality.py)
+    image_prescreen_enabled: bool = True
+    image_prescreen_workers: int = 2
+    image_min_side_px: int = 320
+    image_min_brightness: float = 20.0  # Mean luminance 0-255; also the margin below white
+    image_min_contrast: float = 6.0  # Luminance standard deviation of a near-uniform frame
+    image_blur_threshold: float = 10.0  # Variance of the Laplacian at 512 px
+    image_screenshot_flat_share: float = 0.7  # Pixels in the 8 most common gray levels, without camera EXIF
+    pending_moderation_interval_seconds: float = 60.0
+    
     # Business logic
     platform_fee_percentage: float = 0.20  # 20% fee on EUR transactions
     confidence_removal_threshold: float = 0.30  # Remove at 30%
     initial_confidence_score: float = 0.50  # Start at 50%
     initial_postaal_coins: int = 10  # New users get 10 coins
     
-    # Berlin postal code validation
-    berlin_postal_prefix: str = "1"  # Berlin codes start with 1
-    postal_code_length: int = 5
+    # Photo GPS vs. claimed postal code (in-process lookup against PLZ boundary polygons)
+    plz_boundaries_path: str = ""  # GeoJSON; defaults to app/data/berlin_plz.geojson
+    plz_grid_cell_degrees: float = 0.005  # Spatial index cell size (~350 x 550 m in Berlin)
+    gps_match_confidence_bonus: float = 0.20  # Photo taken in the claimed postal code
+    gps_mismatch_confidence_penalty: float = 0.10  # Photo taken in a different postal code
+    
+    # Confidence rescoring (weights from PLAN.md; weather and community votes are neutral until they have data)
+    confidence_weight_ai: float = 0.25  # Street scene / real glove per Claude
+    confidence_weight_gps: float = 0.20
+    confidence_weight_weather: float = 0.15
+    confidence_weight_history: float = 0.15  # Finder's returned vs. removed listings
+    confidence_weight_community: float = 0.15
+    confidence_weight_spam: float = 0.10  # AI moderation verdict
+    confidence_report_penalty: float = 0.10  # Per report, applied immediately and on every rescore
+    confidence_age_half_life_days: float = 30.0
+    confidence_age_floor: float = 0.70  # Age alone never takes a listing below this share of its score
+    confidence_rescore_batch_size: int = 5000
+    confidence_rescore_interval_seconds: float = 3600.0
+    
+    # Listing lifecycle maintenance
+    listing_expiry_days: int = 60  # Active listings older than this become expired
+    listing_archive_after_days: int = 30  # Claimed/removed/expired listings move to the archive after this
+    maintenance_batch_size: int = 500  # Rows per transaction, keeps locks short
+    maintenance_interval_seconds: float = 3600.0
+    
+    # Postaal coin ledger
+    coin_compaction_interval_seconds: float = 300.0  # Fold ledger rows into balance snapshots
+    coin_balance_secret: str = ""  # Signs the balance links in payment emails; empty disables /api/coins/balance
+    
+    # Idempotency-Key handling for upload / contact
+    idempotency_ttl_hours: int = 24  # Stored results are replayed for this long
+    idempotency_wait_seconds: float = 60.0  # Max wait on an in-flight duplicate before 409
+    idempotency_lock_timeout_seconds: float = 180.0  # In-flight claims older than this are taken over
+    
+    # Saved search alerts
+    app_base_url: str = "http://localhost:3000"  # Frontend, for listing links in emails
+    api_base_url: str = "http://localhost:8000"  # For unsubscribe links in emails
+    alert_max_per_email: int = 10
+    alert_max_postal_codes: int = 20
+    alert_digest_interval_seconds: float = 900.0  # Batch matches into one email per owner
+    alert_digest_batch_size: int = 1000  # Matches handled per digest run
+    
+    # Live listing feed (Server-Sent Events)
+    stream_queue_size: int = 64  # Events buffered per client before it is dropped as too slow
+    stream_max_subscribers: int = 10000  # Open streams per worker
+    stream_heartbeat_seconds: float = 15.0
+    stream_retry_ms: int = 5000  # Reconnect delay suggested to EventSource
+    
+    # Request profiling (see services/profiling.py)
+    profiling_token: str = ""  # Requests with X-Profile: <token> are profiled; empty disables the header
+    profiling_sample_rate: float = 0.0  # Fraction of all requests profiled automatically
+    profiling_interval_ms: float = 5.0  # CPU stack sampling interval
+    profiling_dir: str = "./profiles"
+    profiling_max_files: int = 200  # Ring buffer; the oldest files are deleted
+    profiling_top_allocations: int = 25
+    memory_sampler_interval_seconds: float = 0.0  # > 0 keeps tracemalloc on and records growth this often
+    
+    # Postal code validation
+    enabled_regions: str = "berlin"  # Comma-separated: berlin, hamburg, munich, germany
+    postal_registry_path: str = ""  # Binary PLZ registry; defaults to app/data/postal_codes.bin
     
     class Config:
         env_file = ".env"
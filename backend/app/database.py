@@ -1,22 +1,147 @@
-from sqlalchemy import create_engine
+import logging
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Optional
+from sqlalchemy import create_engine, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from .config import get_settings
 
-settings = get_settings()
+logger = logging.getLogger(__name__)
 
-engine = create_engine(settings.database_url)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Engines are built on first use, so importing models or routes never touches the database
+SessionLocal = sessionmaker(autocommit=False, autoflush=False)
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False)
 
 Base = declarative_base()
 
+# Cookie carrying the read-your-writes deadline across workers (epoch seconds)
+PRIMARY_UNTIL_COOKIE = "pcw_primary_until"
+
+
+@lru_cache()
+def get_engine():
+    engine = create_engine(get_settings().database_url, pool_pre_ping=True)
+    SessionLocal.configure(bind=engine)
+    return engine
+
+
+@lru_cache()
+def get_read_engine():
+    """Replica engine when DATABASE_READ_URL is set, otherwise the primary"""
+    read_url = get_settings().database_read_url
+    engine = create_engine(read_url, pool_pre_ping=True) if read_url else get_engine()
+    ReadSessionLocal.configure(bind=engine)
+    return engine
+
+
+def get_session():
+    get_engine()
+    return SessionLocal()
+
+
+class ReplicaRouter:
+    """
+    Decides whether a read may go to the replica.
+    Reads fall back to the primary when the client wrote recently (read-your-writes,
+    tracked per client in memory and via a cookie) or when the replica lags too far.
+    """
+    
+    def __init__(self, sticky_seconds: float, max_lag_seconds: float, lag_check_interval: float, max_clients: int = 50_000):
+        self.sticky_seconds = sticky_seconds
+        self.max_lag_seconds = max_lag_seconds
+        self.lag_check_interval = lag_check_interval
+        self.max_clients = max_clients
+        self.replica_lag: Optional[float] = None
+        self.replica_healthy = True
+        self.reads = {"replica": 0, "primary_sticky": 0, "primary_lagging": 0}
+        self._lag_checked_at = 0.0
+        self._recent_writers: "OrderedDict[str, float]" = OrderedDict()
+    
+    def note_write(self, client_key: Optional[str]) -> float:
+        """Remember a successful write; returns the wall-clock time reads stay on the primary"""
+        if client_key:
+            self._recent_writers.pop(client_key, None)
+            self._recent_writers[client_key] = time.monotonic() + self.sticky_seconds
+            if len(self._recent_writers) > self.max_clients:
+                self._recent_writers.popitem(last=False)
+        return time.time() + self.sticky_seconds
+    
+    def is_sticky(self, client_key: Optional[str], primary_until: Optional[str]) -> bool:
+        if client_key and self._recent_writers.get(client_key, 0) > time.monotonic():
+            return True
+        try:
+            return primary_until is not None and float(primary_until) > time.time()
+        except ValueError:
+            return False
+    
+    def replica_usable(self) -> bool:
+        """Cached replica lag check; any error counts as unusable until the next check"""
+        now = time.monotonic()
+        if now - self._lag_checked_at < self.lag_check_interval:
+            return self.replica_healthy
+        self._lag_checked_at = now
+        engine = get_read_engine()
+        try:
+            if engine.dialect.name == "postgresql":
+                # The last replay timestamp keeps aging while the primary is idle, so it only
+                # counts when the replica has received WAL it hasn't replayed yet
+                with engine.connect() as conn:
+                    lag = conn.execute(text(
+                        "SELECT CASE WHEN NOT pg_is_in_recovery() THEN 0 "
+                        "WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+                        "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+                    )).scalar()
+            else:
+                lag = 0.0  # e.g. a SQLite file standing in for the replica locally
+            self.replica_lag = float(lag)
+            self.replica_healthy = self.replica_lag <= self.max_lag_seconds
+        except Exception as e:
+            logger.warning(f"Replica lag check failed, reading from primary: {e}")
+            self.replica_lag = None
+            self.replica_healthy = False
+        return self.replica_healthy
+    
+    def use_replica(self, client_key: Optional[str], primary_until: Optional[str]) -> bool:
+        if self.is_sticky(client_key, primary_until):
+            self.reads["primary_sticky"] += 1
+            return False
+        if not self.replica_usable():
+            self.reads["primary_lagging"] += 1
+            return False
+        self.reads["replica"] += 1
+        return True
+    
+    def stats(self) -> dict:
+        return {
+            "replica_lag_seconds": self.replica_lag,
+            "replica_healthy": self.replica_healthy,
+            "sticky_clients": len(self._recent_writers),
+            "reads": self.reads,
+        }
+
+
+@lru_cache()
+def get_replica_router() -> ReplicaRouter:
+    settings = get_settings()
+    return ReplicaRouter(
+        sticky_seconds=settings.read_your_writes_seconds,
+        max_lag_seconds=settings.replica_max_lag_seconds,
+        lag_check_interval=settings.replica_lag_check_interval,
+    )
+
 
 def get_db():
-    db = SessionLocal()
+    db = get_session()
     try:
         yield db
     finally:
         db.close()
 
 
-
+def get_read_session(client_key: Optional[str] = None, primary_until: Optional[str] = None):
+    if get_settings().database_read_url and get_replica_router().use_replica(client_key, primary_until):
+        get_read_engine()
+        return ReadSessionLocal()
+    return get_session()
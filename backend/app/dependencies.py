@@ -0,0 +1,47 @@
+"""
+Lazily created service singletons, injected with Depends().
+Nothing here runs at import time, so importing the app stays cheap and
+doesn't need API keys, a database or cloud credentials.
+"""
+from functools import lru_cache
+
+from fastapi import Depends, Request
+from sqlalchemy.orm import Session
+
+from .database import PRIMARY_UNTIL_COOKIE, get_db, get_read_session
+from .sharding import get_shard_router
+from .services.rate_limiter import client_ip
+
+
+@lru_cache()
+def get_claude_service():
+    # anthropic (and its HTTP client) is only imported once Claude is actually needed
+    from .services.claude_service import ClaudeService
+    return ClaudeService()
+
+
+@lru_cache()
+def get_storage_service():
+    from .services.storage_service import create_storage
+    return create_storage()
+
+
+def get_read_db(request: Request):
+    """Session for read-only endpoints: the replica unless the client just wrote or it lags"""
+    db = get_read_session(client_ip(request), request.cookies.get(PRIMARY_UNTIL_COOKIE))
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def get_listing_db(listing_id: int, db: Session = Depends(get_db)):
+    """Session on the shard that holds the listing in the path (the request's own session on the default shard)"""
+    with get_shard_router().shard_session(get_shard_router().shard_of_listing(listing_id), db) as listing_db:
+        yield listing_db
+
+
+def get_listing_read_db(listing_id: int, db: Session = Depends(get_read_db)):
+    """Read-only session for the listing in the path: its shard, or get_read_db on the default shard"""
+    with get_shard_router().shard_session(get_shard_router().shard_of_listing(listing_id), db) as listing_db:
+        yield listing_db
@@ -0,0 +1,47 @@
+"""
+HTTP conditional request helpers.
+Endpoints compute a cheap data version (e.g. max updated_at) first; if the client
+already holds the matching ETag we answer 304 without running the main query.
+"""
+import hashlib
+from typing import Any, Optional
+
+from fastapi import Request, Response
+from fastapi.responses import ORJSONResponse
+
+
+def make_etag(*parts: Any) -> str:
+    """Build a weak ETag from the request identity and data version"""
+    digest = hashlib.blake2b(repr(parts).encode("utf-8"), digest_size=12).hexdigest()
+    return f'W/"{digest}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Weak comparison against If-None-Match (RFC 9110 13.1.2)"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == opaque for tag in header.split(","))
+
+
+def cache_headers(etag: str, cache_control: Optional[str]) -> dict:
+    headers = {"ETag": etag}
+    if cache_control:
+        headers["Cache-Control"] = cache_control
+    return headers
+
+
+def not_modified(etag: str, cache_control: Optional[str] = None) -> Response:
+    return Response(status_code=304, headers=cache_headers(etag, cache_control))
+
+
+def cached_json(content: Any, etag: str, cache_control: Optional[str] = None) -> ORJSONResponse:
+    return ORJSONResponse(content, headers=cache_headers(etag, cache_control))
+
+
+def cached_body(body: bytes, etag: str, cache_control: Optional[str] = None) -> Response:
+    """Like cached_json, for a body that is already serialized JSON"""
+    return Response(body, media_type="application/json", headers=cache_headers(etag, cache_control))
@@ -1,13 +1,18 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.staticfiles import StaticFiles
 from contextlib import asynccontextmanager
 import os
+import asyncio
 import logging
 
 from .config import get_settings
-from .database import engine, Base
-from .routes import gloves
+from .database import PRIMARY_UNTIL_COOKIE, get_replica_router
+from .dependencies import get_claude_service
+from .routes import gloves, coins, alerts as alert_routes, postal_codes
+from .services import moderation_queue, listing_lifecycle, coin_ledger, idempotency, alerts, live_feed, confidence, listing_cache, profiling, photo_gc, facets, search_index, image_quality, postal_geo
+from .services.rate_limiter import claude_admission, client_ip
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -18,17 +23,55 @@ settings = get_settings()
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # Startup: create directories and tables
-    try:
+    # Startup stays cheap: the schema is managed by `python -m scripts.migrate` at deploy time,
+    # the database, Claude and storage clients are created on first use, and the postal code
+    # boundaries load in a background thread.
+    if settings.storage_backend == "local":
         os.makedirs(settings.upload_dir, exist_ok=True)
-        logger.info(f"Upload directory ready: {settings.upload_dir}")
-        Base.metadata.create_all(bind=engine)
-        logger.info("Database tables created successfully")
-    except Exception as e:
-        logger.error(f"Startup error: {e}")
+    postal_index_loader = asyncio.create_task(postal_geo.preload_postal_code_index())
+    moderation_worker = asyncio.create_task(
+        moderation_queue.run_moderation_worker(settings.pending_moderation_interval_seconds)
+    )
+    maintenance_worker = asyncio.create_task(
+        listing_lifecycle.run_maintenance_worker(settings.maintenance_interval_seconds)
+    )
+    compaction_worker = asyncio.create_task(
+        coin_ledger.run_compaction_worker(settings.coin_compaction_interval_seconds)
+    )
+    digest_worker = asyncio.create_task(
+        alerts.run_digest_worker(settings.alert_digest_interval_seconds)
+    )
+    rescore_worker = asyncio.create_task(
+        confidence.run_rescore_worker(settings.confidence_rescore_interval_seconds)
+    )
+    photo_gc_worker = asyncio.create_task(
+        photo_gc.run_photo_gc_worker(settings.photo_gc_interval_seconds)
+    )
+    search_index_worker = None
+    if settings.search_index_enabled:
+        search_index_worker = asyncio.create_task(
+            search_index.run_search_index_worker(settings.search_index_refresh_seconds)
+        )
+    memory_sampler = None
+    if settings.memory_sampler_interval_seconds > 0:
+        memory_sampler = asyncio.create_task(
+            profiling.run_memory_sampler(settings.memory_sampler_interval_seconds)
+        )
     yield
     # Shutdown
     logger.info("Shutting down...")
+    postal_index_loader.cancel()
+    moderation_worker.cancel()
+    maintenance_worker.cancel()
+    compaction_worker.cancel()
+    digest_worker.cancel()
+    rescore_worker.cancel()
+    photo_gc_worker.cancel()
+    if search_index_worker is not None:
+        search_index_worker.cancel()
+    if memory_sampler is not None:
+        memory_sampler.cancel()
+    live_feed.hub.stop()
 
 
 # Create FastAPI app
@@ -49,16 +92,70 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "Idempotency-Replayed"],
 )
 
-# Ensure upload directory exists
-os.makedirs(settings.upload_dir, exist_ok=True)
+class NoStreamGZipMiddleware(GZipMiddleware):
+    """GZip, except for Server-Sent Events: the compressor would hold events back"""
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["path"].endswith("/stream"):
+            await self.app(scope, receive, send)
+            return
+        await super().__call__(scope, receive, send)
+
+
+# Compress JSON responses above the configured size
+app.add_middleware(NoStreamGZipMiddleware, minimum_size=settings.gzip_minimum_size)
+
+# Mount static files for uploads (S3 photos are served by the bucket/CDN).
+# The directory is created in lifespan, so skip the import-time existence check.
+if settings.storage_backend == "local":
+    app.mount("/uploads", StaticFiles(directory=settings.upload_dir, check_dir=False), name="uploads")
+
+# Read-your-writes: after a successful write, keep this client's reads on the primary
+@app.middleware("http")
+async def read_your_writes(request: Request, call_next):
+    response = await call_next(request)
+    if (
+        settings.database_read_url
+        and request.method not in ("GET", "HEAD", "OPTIONS")
+        and response.status_code < 400
+    ):
+        primary_until = get_replica_router().note_write(client_ip(request))
+        response.set_cookie(
+            PRIMARY_UNTIL_COOKIE,
+            f"{primary_until:.0f}",
+            max_age=int(settings.read_your_writes_seconds) + 1,
+            httponly=True,
+            samesite="lax",
+        )
+    return response
+
+
+# Admin-gated profiling of single requests (X-Profile header or PROFILING_SAMPLE_RATE)
+@app.middleware("http")
+async def profile_request(request: Request, call_next):
+    if request.url.path.endswith("/stream") or not profiling.wants_profile(
+        request.headers.get(profiling.PROFILE_HEADER)
+    ):
+        return await call_next(request)
+    profile = profiling.try_begin(f"{request.method} {request.url.path}")
+    if profile is None:
+        return await call_next(request)
+    try:
+        response = await call_next(request)
+    finally:
+        await profiling.finish(profile)
+    response.headers[profiling.PROFILE_ID_HEADER] = profile.id
+    return response
 
-# Mount static files for uploads
-app.mount("/uploads", StaticFiles(directory=settings.upload_dir), name="uploads")
 
 # Include routers
 app.include_router(gloves.router)
+app.include_router(coins.router)
+app.include_router(alert_routes.router)
+app.include_router(postal_codes.router)
 
 
 @app.get("/")
@@ -76,4 +173,50 @@ async def health_check():
     return {"status": "healthy"}
 
 
+@app.get("/health/database")
+async def database_health():
+    """Read routing: replica lag, sticky clients, where reads went and the listing detail and facet caches, the search index"""
+    return {
+        "read_replica_configured": bool(settings.database_read_url),
+        **get_replica_router().stats(),
+        "detail_cache": {"entries": len(listing_cache.detail_cache), **listing_cache.detail_cache.stats},
+        "facet_cache": {"entries": len(facets.facet_cache), **facets.facet_cache.stats},
+        "search_index": {
+            "enabled": settings.search_index_enabled,
+            "listings": len(search_index.listing_index) if search_index.listing_index is not None else 0,
+            **search_index.stats,
+        },
+    }
+
+
+@app.get("/health/storage")
+async def storage_health():
+    """Photo storage backend and garbage collection counters"""
+    return {"backend": settings.storage_backend, "photo_gc": photo_gc.stats}
+
 
+@app.get("/health/claude")
+async def claude_health():
+    """Circuit breaker state, retry budget, degraded-mode, photo pre-screen and idempotency counters"""
+    return {
+        **get_claude_service().stats(),
+        "admission": {
+            "in_flight": claude_admission.in_flight,
+            "max_in_flight": claude_admission.max_in_flight,
+            "rejected": claude_admission.rejected,
+        },
+        "moderation_queue": moderation_queue.stats,
+        "prescreen": image_quality.stats,
+        "idempotency": idempotency.stats,
+    }
+
+
+@app.get("/health/stream")
+async def stream_health():
+    """Live feed subscribers on this worker and fan-out / backpressure counters"""
+    return {
+        "subscribers": live_feed.hub.subscribers,
+        "max_subscribers": live_feed.hub.max_subscribers,
+        "channels": len(live_feed.hub.channels),
+        **live_feed.hub.stats,
+    }
@@ -1,8 +1,22 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, Enum, Text, Boolean, ForeignKey
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, BigInteger, String, Float, DateTime, Enum, Text, Boolean, JSON, Index, UniqueConstraint
+from sqlalchemy.orm import relationship, deferred
 from sqlalchemy.sql import func
+from sqlalchemy.types import TypeDecorator
 from .database import Base
 import enum
+from typing import Optional
+
+
+class JSONDocument(TypeDecorator):
+    """JSONB on PostgreSQL, JSON elsewhere; loads the PostgreSQL dialect only when it is used"""
+    impl = JSON
+    cache_ok = True
+
+    def load_dialect_impl(self, dialect):
+        if dialect.name == "postgresql":
+            from sqlalchemy.dialects.postgresql import JSONB
+            return dialect.type_descriptor(JSONB())
+        return dialect.type_descriptor(JSON())
 
 
 class GloveSide(str, enum.Enum):
@@ -30,6 +44,7 @@ class ListingStatus(str, enum.Enum):
     CLAIMED = "claimed"
     REMOVED = "removed"
     PENDING_MODERATION = "pending_moderation"
+    EXPIRED = "expired"
 
 
 class GloveListing(Base):
@@ -53,6 +68,7 @@ class GloveListing(Base):
     postal_code = Column(String(5), nullable=False, index=True)
     found_date = Column(DateTime, nullable=False)
     found_location_description = Column(String(255), nullable=True)  # e.g., "Near Alexanderplatz U-Bahn"
+    gps_postal_code = Column(String(5), nullable=True)  # Where the photo's EXIF GPS says it was taken
     
     # Finder info
     finder_email = Column(String(255), nullable=False)
@@ -66,25 +82,105 @@ class GloveListing(Base):
     status = Column(Enum(ListingStatus), default=ListingStatus.ACTIVE)
     confidence_score = Column(Float, default=0.50)
     ai_moderation_passed = Column(Boolean, default=True)
-    ai_moderation_notes = Column(Text, nullable=True)
+    ai_moderation_notes = deferred(Column(Text, nullable=True))
+    
+    # AI analysis raw data (deferred: large and never needed by list/detail views)
+    ai_analysis = deferred(Column(JSONDocument, nullable=True))
     
-    # AI analysis raw data
-    ai_analysis = Column(Text, nullable=True)  # JSON string of Claude's analysis
+    # Frequently queried analysis fields, extracted on write so they can be indexed
+    ai_suggested_price_eur = Column(Float, nullable=True)
+    ai_is_valid_glove = Column(Boolean, nullable=True, index=True)
+    ai_model_version = Column(String(100), nullable=True, index=True)
     
     # Timestamps
     created_at = Column(DateTime, server_default=func.now())
     updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
     
     # Relationships
-    reports = relationship("GloveReport", back_populates="listing")
-    contact_requests = relationship("ContactRequest", back_populates="listing")
+    # Reports and contacts outlive the listing row (it may move to the archive), so no FK
+    reports = relationship(
+        "GloveReport",
+        primaryjoin="GloveListing.id == foreign(GloveReport.listing_id)",
+        back_populates="listing",
+    )
+    contact_requests = relationship(
+        "ContactRequest",
+        primaryjoin="GloveListing.id == foreign(ContactRequest.listing_id)",
+        back_populates="listing",
+    )
+    
+    __table_args__ = (
+        Index("ix_glove_listings_postal_code_price", "postal_code", "ai_suggested_price_eur"),
+        # Cheap data versions for ETags: max(updated_at) overall or per postal code
+        Index("ix_glove_listings_updated_at", "updated_at"),
+        Index("ix_glove_listings_postal_code_updated_at", "postal_code", "updated_at"),
+        # Lifecycle maintenance scans
+        Index("ix_glove_listings_status_created_at", "status", "created_at"),
+        Index("ix_glove_listings_status_updated_at", "status", "updated_at"),
+    )
+
+
+class GloveListingArchive(Base):
+    """
+    Claimed, removed and expired listings moved out of glove_listings by the
+    lifecycle maintenance task, so the hot table only holds live listings.
+    Same columns as GloveListing (ids are preserved) plus archived_at.
+    """
+    __tablename__ = "glove_listings_archive"
+    
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    photo_url = Column(String(500), nullable=False)
+    photo_filename = Column(String(255), nullable=False)
+    brand = Column(String(100), nullable=True)
+    color = Column(String(50), nullable=False)
+    size = Column(Enum(GloveSize))
+    side = Column(Enum(GloveSide))
+    material = Column(String(100), nullable=True)
+    description = Column(Text, nullable=True)
+    postal_code = Column(String(5), nullable=False)
+    found_date = Column(DateTime, nullable=False, index=True)
+    found_location_description = Column(String(255), nullable=True)
+    gps_postal_code = Column(String(5), nullable=True)
+    finder_email = Column(String(255), nullable=False)
+    finder_display_name = Column(String(100), nullable=True)
+    fee_amount = Column(Float)
+    fee_currency = Column(Enum(FeeCurrency))
+    status = Column(Enum(ListingStatus))
+    confidence_score = Column(Float)
+    ai_moderation_passed = Column(Boolean)
+    ai_moderation_notes = deferred(Column(Text, nullable=True))
+    ai_analysis = deferred(Column(JSONDocument, nullable=True))
+    ai_suggested_price_eur = Column(Float, nullable=True)
+    ai_is_valid_glove = Column(Boolean, nullable=True)
+    ai_model_version = Column(String(100), nullable=True)
+    created_at = Column(DateTime)
+    updated_at = Column(DateTime)
+    archived_at = Column(DateTime, server_default=func.now())
+    
+    __table_args__ = (
+        Index("ix_glove_listings_archive_postal_code_status", "postal_code", "status"),
+        # Stats ETag: archiving deletes live rows, so max(updated_at) alone can go backwards
+        Index("ix_glove_listings_archive_archived_at", "archived_at"),
+    )
+
+
+def analysis_indexed_fields(analysis: Optional[dict], model_version: Optional[str] = None) -> dict:
+    """Pull the indexed columns out of a Claude analysis dict"""
+    analysis = analysis or {}
+    price = analysis.get("suggested_price_eur")
+    is_valid = analysis.get("is_valid_glove")
+    return {
+        "ai_suggested_price_eur": float(price) if isinstance(price, (int, float)) else None,
+        "ai_is_valid_glove": is_valid if isinstance(is_valid, bool) else None,
+        "ai_model_version": analysis.get("model_version") or model_version,
+    }
 
 
 class GloveReport(Base):
     __tablename__ = "glove_reports"
     
     id = Column(Integer, primary_key=True, index=True)
-    listing_id = Column(Integer, ForeignKey("glove_listings.id"), nullable=False)
+    listing_id = Column(Integer, nullable=False, index=True)  # glove_listings or glove_listings_archive
     
     reason = Column(String(50), nullable=False)  # spam, inappropriate, wrong_location, other
     description = Column(Text, nullable=True)
@@ -94,14 +190,18 @@ class GloveReport(Base):
     created_at = Column(DateTime, server_default=func.now())
     
     # Relationships
-    listing = relationship("GloveListing", back_populates="reports")
+    listing = relationship(
+        "GloveListing",
+        primaryjoin="foreign(GloveReport.listing_id) == GloveListing.id",
+        back_populates="reports",
+    )
 
 
 class ContactRequest(Base):
     __tablename__ = "contact_requests"
     
     id = Column(Integer, primary_key=True, index=True)
-    listing_id = Column(Integer, ForeignKey("glove_listings.id"), nullable=False)
+    listing_id = Column(Integer, nullable=False, index=True)  # glove_listings or glove_listings_archive
     
     # Requester info
     requester_email = Column(String(255), nullable=False)
@@ -120,7 +220,11 @@ class ContactRequest(Base):
     created_at = Column(DateTime, server_default=func.now())
     
     # Relationships
-    listing = relationship("GloveListing", back_populates="contact_requests")
+    listing = relationship(
+        "GloveListing",
+        primaryjoin="foreign(ContactRequest.listing_id) == GloveListing.id",
+        back_populates="contact_requests",
+    )
 
 
 # Future: User model for authentication
@@ -132,7 +236,7 @@ class User(Base):
     postal_code = Column(String(5), nullable=True)
     display_name = Column(String(100), nullable=True)
     
-    # Postaal economy
+    # Postaal economy (legacy; balances are derived from the coin_transactions ledger)
     postaal_balance = Column(Integer, default=10)
     
     # Status
@@ -143,4 +247,118 @@ class User(Base):
     updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
 
 
+class CoinTransaction(Base):
+    """
+    Append-only Postaal coin ledger. A transfer writes two rows sharing a
+    transfer_key (debit for the sender, credit for the recipient); rows are
+    never updated or deleted. (transfer_key, account_email) is unique, which
+    makes every transfer idempotent.
+    """
+    __tablename__ = "coin_transactions"
+    
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True)
+    transfer_key = Column(String(100), nullable=False)
+    account_email = Column(String(255), nullable=False)
+    counterparty_email = Column(String(255), nullable=True)
+    amount = Column(Integer, nullable=False)  # Positive = credit, negative = debit
+    kind = Column(String(20), nullable=False)  # grant, transfer
+    listing_id = Column(Integer, nullable=True)
+    
+    created_at = Column(DateTime, server_default=func.now())
+    
+    __table_args__ = (
+        UniqueConstraint("transfer_key", "account_email", name="uq_coin_transactions_key_account"),
+        # Balance delta reads: rows for one account above the snapshot's last id
+        Index("ix_coin_transactions_account_id", "account_email", "id"),
+    )
+
+
+class CoinBalanceSnapshot(Base):
+    """Compacted balance per account up to last_transaction_id; reads add the delta after it"""
+    __tablename__ = "coin_balance_snapshots"
+    
+    account_email = Column(String(255), primary_key=True)
+    balance = Column(Integer, nullable=False, default=0)
+    last_transaction_id = Column(BigInteger().with_variant(Integer, "sqlite"), nullable=False, default=0)
+    
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+
+
+class IdempotencyKey(Base):
+    """
+    Result of a POST made with an Idempotency-Key header. While the first request
+    runs the row is in_progress; afterwards it holds the response to replay.
+    """
+    __tablename__ = "idempotency_keys"
+    
+    scope = Column(String(50), primary_key=True)  # upload, contact
+    key = Column(String(255), primary_key=True)
+    fingerprint = Column(String(64), nullable=False)  # sha256 of the request
+    state = Column(String(20), nullable=False, default="in_progress")  # in_progress, completed
+    response_status = Column(Integer, nullable=True)
+    response_body = Column(JSON, nullable=True)
+    
+    locked_at = Column(DateTime, nullable=False)
+    created_at = Column(DateTime, server_default=func.now())
+    expires_at = Column(DateTime, nullable=False, index=True)
+
+
+class GloveAlert(Base):
+    """A saved search: email the owner when a matching glove is listed"""
+    __tablename__ = "glove_alerts"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    email = Column(String(255), nullable=False, index=True)
+    postal_codes = Column(String(255), nullable=False)  # Comma-separated, like the search filter
+    brand = Column(String(100), nullable=True)
+    color = Column(String(100), nullable=True)
+    size = Column(String(10), nullable=True)
+    side = Column(String(10), nullable=True)
+    required_terms = Column(Integer, nullable=False)  # Terms a listing must hit: 1 + size / side filters
+    unsubscribe_token = Column(String(64), nullable=False, unique=True)
+    is_active = Column(Boolean, default=True, nullable=False)
+    
+    created_at = Column(DateTime, server_default=func.now())
+    last_notified_at = Column(DateTime, nullable=True)
+
+
+class GloveAlertTerm(Base):
+    """
+    Inverted index over active alerts. Terms are scoped by postal code
+    ("10115:*", "10115:size:m"), so matching an upload only reads the
+    posting lists of its own postal code.
+    """
+    __tablename__ = "glove_alert_terms"
+    
+    term = Column(String(120), primary_key=True)
+    alert_id = Column(Integer, primary_key=True, index=True)
 
+
+class GloveAlertMatch(Base):
+    """A listing that matched an alert, waiting for (or included in) a digest email"""
+    __tablename__ = "glove_alert_matches"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    alert_id = Column(Integer, nullable=False)
+    listing_id = Column(Integer, nullable=False)
+    created_at = Column(DateTime, server_default=func.now())
+    notified_at = Column(DateTime, nullable=True)
+    
+    __table_args__ = (
+        UniqueConstraint("alert_id", "listing_id", name="uq_glove_alert_matches_alert_listing"),
+        # Digest worker: pending matches in arrival order
+        Index("ix_glove_alert_matches_notified_at_id", "notified_at", "id"),
+    )
+
+
+class ListingShard(Base):
+    """
+    Listing directory on the main database when region sharding is on: hands
+    out listing ids (unique across shards) and records which shard holds each
+    listing. Listings without a row live on the main database.
+    """
+    __tablename__ = "listing_shards"
+    
+    listing_id = Column(Integer, primary_key=True)
+    shard = Column(String(50), nullable=False)
+    created_at = Column(DateTime, server_default=func.now())
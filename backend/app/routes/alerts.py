@@ -0,0 +1,68 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from sqlalchemy.orm import Session
+
+from ..config import get_settings
+from ..database import get_db
+from ..models import GloveAlert
+from ..schemas import GloveAlertCreate, GloveAlertResponse
+from ..services import alerts
+from ..services.rate_limiter import rate_limiter
+
+router = APIRouter(prefix="/api/alerts", tags=["alerts"])
+settings = get_settings()
+
+
+@router.post("", response_model=GloveAlertResponse)
+async def create_alert(alert: GloveAlertCreate, request: Request, db: Session = Depends(get_db)):
+    """
+    Save a search and get an email digest when matching gloves are listed,
+    instead of polling /api/gloves/search.
+    """
+    await rate_limiter.enforce("alert", request, alert.email)
+    
+    if len(set(alert.postal_codes)) > settings.alert_max_postal_codes:
+        raise HTTPException(
+            status_code=400,
+            detail=f"An alert can cover at most {settings.alert_max_postal_codes} postal codes",
+        )
+    
+    email = alert.email.strip().lower()
+    active = (
+        db.query(GloveAlert)
+        .filter(GloveAlert.email == email, GloveAlert.is_active.is_(True))
+        .count()
+    )
+    if active >= settings.alert_max_per_email:
+        raise HTTPException(
+            status_code=400,
+            detail=f"You can have at most {settings.alert_max_per_email} active alerts",
+        )
+    
+    created = alerts.create_alert(
+        db,
+        email=email,
+        postal_codes=alert.postal_codes,
+        brand=alert.brand,
+        color=alert.color,
+        size=alert.size.value if alert.size else None,
+        side=alert.side.value if alert.side else None,
+    )
+    db.commit()
+    db.refresh(created)
+    
+    return created
+
+
+@router.get("/unsubscribe")
+async def unsubscribe_alert(token: str = Query(...), db: Session = Depends(get_db)):
+    """Turn an alert off (linked from every digest email)"""
+    alert = db.query(GloveAlert).filter(GloveAlert.unsubscribe_token == token).first()
+    
+    if not alert:
+        raise HTTPException(status_code=404, detail="Alert not found")
+    
+    if alert.is_active:
+        alerts.deactivate_alert(db, alert)
+        db.commit()
+    
+    return {"message": "You will no longer receive emails for this alert", "alert_id": alert.id}
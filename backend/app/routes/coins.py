@@ -0,0 +1,26 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+
+from ..config import get_settings
+from ..database import get_db
+from ..schemas import CoinBalance
+from ..services import coin_ledger
+
+router = APIRouter(prefix="/api/coins", tags=["coins"])
+settings = get_settings()
+
+
+@router.get("/balance", response_model=CoinBalance)
+async def get_coin_balance(email: str = Query(...), token: str = Query(...), db: Session = Depends(get_db)):
+    """
+    Get the Postaal coin balance for an account, through the signed link
+    in its payment emails. Read-only: starting coins not granted yet (on the
+    first transfer) are counted but not written.
+    """
+    account = email.strip().lower()
+    if not coin_ledger.valid_balance_token(account, token):
+        raise HTTPException(status_code=403, detail="Invalid balance link")
+    balance = coin_ledger.get_balance(db, account)
+    if not coin_ledger.has_signup_grant(db, account):
+        balance += settings.initial_postaal_coins
+    return CoinBalance(email=account, balance=balance)
@@ -1,22 +1,29 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Query, Request
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Header, Query, Request
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from sqlalchemy import func, or_
+from sqlalchemy import func, or_, and_, case, select, union_all
 from typing import Optional, List
-import os
 import uuid
 import base64
+import heapq
+import itertools
 import json
+import orjson
 from datetime import datetime
 
 from ..database import get_db
+from ..sharding import get_shard_router
+from ..dependencies import get_claude_service, get_storage_service, get_read_db, get_listing_db, get_listing_read_db
+from ..http_cache import make_etag, etag_matches, not_modified, cached_json, cached_body
 from ..config import get_settings
-from ..models import GloveListing, GloveReport, ContactRequest, ListingStatus, FeeCurrency as DBFeeCurrency
+from ..models import GloveListing, GloveListingArchive, GloveReport, ContactRequest, ListingStatus, FeeCurrency as DBFeeCurrency, analysis_indexed_fields
 from ..schemas import (
     GloveListingCreate,
     GloveListingResponse,
     GloveListingDetail,
     GloveSearchParams,
     GloveSearchResponse,
+    GloveFacetsResponse,
     GloveReportCreate,
     GloveReportResponse,
     ContactRequestCreate,
@@ -28,24 +35,159 @@ from ..schemas import (
     GloveSize,
     PostalCodeStats,
 )
-from ..services.claude_service import claude_service
 from ..services.email_service import email_service
+from ..services.rate_limiter import rate_limiter, claude_admission, client_ip
+from ..services.resilience import ServiceUnavailableError
+from ..services import moderation_queue, coin_ledger, idempotency, alerts, live_feed, postal_geo, postal_registry, listing_cache, facets, search_index, image_quality
 
 router = APIRouter(prefix="/api/gloves", tags=["gloves"])
 settings = get_settings()
+shard_router = get_shard_router()
+
+
+# Only the columns GloveListingResponse renders; heavy text columns are never loaded
+LISTING_RESPONSE_COLUMNS = tuple(
+    getattr(GloveListing, name) for name in GloveListingResponse.model_fields
+)
 
 
 def get_photo_url(filename: str) -> str:
-    """Generate the URL for a photo"""
-    return f"/uploads/{filename}"
+    """Generate the URL for a photo via the configured storage backend"""
+    return get_storage_service().url(filename)
+
+
+def service_unavailable(error: ServiceUnavailableError) -> HTTPException:
+    retry_after = max(1, int(error.retry_after or 30))
+    return HTTPException(
+        status_code=503,
+        detail="Image analysis is temporarily unavailable. Please try again shortly.",
+        headers={"Retry-After": str(retry_after)},
+    )
+
+
+def parse_search_date(value: Optional[str]) -> Optional[datetime]:
+    """ISO date filter value; unparseable values are ignored like a missing filter"""
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+
+
+def search_filter_parts(
+    postal_codes: Optional[str] = None,
+    brand: Optional[str] = None,
+    color: Optional[str] = None,
+    size: Optional[str] = None,
+    side: Optional[str] = None,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    color_family: Optional[str] = None,
+) -> tuple[list, dict]:
+    """
+    Translate search query parameters into SQLAlchemy filter conditions:
+    (base filters, {facet: condition}) for the filters the facets endpoint counts by
+    """
+    filters = [
+        GloveListing.status == ListingStatus.ACTIVE,
+        GloveListing.confidence_score >= settings.confidence_removal_threshold,
+    ]
+    facet_filters = {}
+    
+    # Filter by postal codes
+    if postal_codes:
+        codes = [c.strip() for c in postal_codes.split(",")]
+        filters.append(GloveListing.postal_code.in_(codes))
+    
+    # Filter by brand (case-insensitive partial match)
+    if brand:
+        facet_filters["brand"] = GloveListing.brand.ilike(f"%{brand}%")
+    
+    # Filter by color (case-insensitive partial match) and/or color family
+    color_filters = []
+    if color:
+        color_filters.append(GloveListing.color.ilike(f"%{color}%"))
+    if color_family:
+        color_filters.append(facets.color_family_column(GloveListing.color) == color_family)
+    if color_filters:
+        facet_filters["color_family"] = and_(*color_filters)
+    
+    # Filter by size
+    if size and size != "unknown":
+        facet_filters["size"] = GloveListing.size == size
+    
+    # Filter by side
+    if side and side != "unknown":
+        facet_filters["side"] = GloveListing.side == side
+    
+    # Filter by date range
+    from_date = parse_search_date(date_from)
+    if from_date:
+        filters.append(GloveListing.found_date >= from_date)
+    
+    to_date = parse_search_date(date_to)
+    if to_date:
+        filters.append(GloveListing.found_date <= to_date)
+    
+    return filters, facet_filters
+
+
+def build_search_filters(*args, **kwargs) -> list:
+    """All search filter conditions as one list"""
+    filters, facet_filters = search_filter_parts(*args, **kwargs)
+    return filters + list(facet_filters.values())
+
+
+def listings_data_version(db: Session, postal_codes: Optional[str] = None):
+    """Cheap version stamp for listing data: max(updated_at), per postal code when filtered"""
+    query = db.query(func.max(GloveListing.updated_at))
+    if postal_codes:
+        codes = [c.strip() for c in postal_codes.split(",")]
+        query = query.filter(GloveListing.postal_code.in_(codes))
+    return query.scalar()
+
+
+def stats_data_version(db: Session) -> tuple:
+    """
+    Version stamp for the stats, which also count archived listings. Archiving
+    deletes rows from glove_listings, so its max(updated_at) can fall back to
+    an older value; the newest archived_at moves forward instead.
+    """
+    return (
+        listings_data_version(db),
+        db.query(func.max(GloveListingArchive.archived_at)).scalar(),
+    )
+
+
+async def load_listing_rows(page_ids: list, db: Session) -> list:
+    """Response rows for (shard, listing id) pairs by primary key, in the given order"""
+    ids_by_shard: dict = {}
+    for shard, listing_id in page_ids:
+        ids_by_shard.setdefault(shard, []).append(listing_id)
+    rows = {}
+    for shard, listing_ids in ids_by_shard.items():
+        def load(shard_db: Session, listing_ids=listing_ids):
+            return shard_db.query(*LISTING_RESPONSE_COLUMNS).filter(GloveListing.id.in_(listing_ids)).all()
+        for row in (await shard_router.scatter([shard], load, db))[0]:
+            rows[row.id] = dict(row._mapping)
+    # A listing changed since the index saw it may be gone; the next feed refresh drops it
+    return [rows[listing_id] for _, listing_id in page_ids if listing_id in rows]
 
 
 @router.post("/analyze", response_model=GloveAnalysisResponse)
-async def analyze_glove_image(file: UploadFile = File(...)):
+async def analyze_glove_image(
+    request: Request,
+    file: UploadFile = File(...),
+    detailed: bool = Query(True, description="Run full attribute extraction on the large model"),
+    claude_service=Depends(get_claude_service),
+):
     """
     Upload a glove image and get AI analysis.
     Returns brand, color, size, side, material, and suggested price.
     """
+    await rate_limiter.enforce("analyze", request)
+    
     # Validate file size
     contents = await file.read()
     if len(contents) > settings.max_upload_size:
@@ -56,17 +198,30 @@ async def analyze_glove_image(file: UploadFile = File(...)):
     if file.content_type not in allowed_types:
         raise HTTPException(status_code=400, detail=f"Invalid file type. Allowed: {allowed_types}")
     
+    # Obvious junk (dark, blank, blurry, tiny, screenshots) never reaches Claude
+    problem = await image_quality.prescreen(contents)
+    if problem:
+        raise HTTPException(status_code=400, detail=problem)
+    
     # Convert to base64 for Claude
     image_base64 = base64.b64encode(contents).decode("utf-8")
     
     # Analyze with Claude
-    analysis = await claude_service.analyze_glove_image(image_base64, file.content_type)
+    try:
+        async with claude_admission.slot():
+            analysis = await claude_service.analyze_glove_image(image_base64, file.content_type, detailed)
+    except ServiceUnavailableError as e:
+        raise service_unavailable(e)
+    
+    # Pre-fill the postal code from where the photo was taken
+    analysis.suggested_postal_code = await postal_geo.locate_photo(contents)
     
     return analysis
 
 
 @router.post("/upload", response_model=GloveListingResponse)
 async def upload_glove(
+    request: Request,
     file: UploadFile = File(...),
     brand: Optional[str] = Form(None),
     color: str = Form(...),
@@ -82,88 +237,159 @@ async def upload_glove(
     fee_amount: float = Form(0.0),
     fee_currency: str = Form("postaal"),
     ai_analysis: Optional[str] = Form(None),
-    db: Session = Depends(get_db)
+    idempotency_key: Optional[str] = Header(None),
+    db: Session = Depends(get_db),
+    claude_service=Depends(get_claude_service),
+    storage_service=Depends(get_storage_service),
 ):
     """
     Upload a found glove listing.
     The image is analyzed by Claude AI for moderation.
+    Send an Idempotency-Key header to make retries safe.
     """
-    # Validate file size
     contents = await file.read()
-    if len(contents) > settings.max_upload_size:
-        raise HTTPException(status_code=400, detail=f"File too large. Max size: {settings.max_upload_size // (1024*1024)}MB")
-    
-    # Validate file type
-    allowed_types = ["image/jpeg", "image/png", "image/webp"]
-    if file.content_type not in allowed_types:
-        raise HTTPException(status_code=400, detail=f"Invalid file type. Allowed: {allowed_types}")
-    
-    # Validate Berlin postal code
-    if not postal_code or len(postal_code) != 5 or not postal_code.startswith("1"):
-        raise HTTPException(status_code=400, detail="Must be a valid Berlin postal code (5 digits starting with 1)")
-    
-    # Parse date
-    try:
-        parsed_date = datetime.fromisoformat(found_date.replace("Z", "+00:00"))
-    except ValueError:
-        raise HTTPException(status_code=400, detail="Invalid date format. Use ISO 8601.")
-    
-    # Generate unique filename and save
-    file_ext = file.filename.split(".")[-1] if "." in file.filename else "jpg"
-    filename = f"{uuid.uuid4()}.{file_ext}"
-    
-    # Ensure upload directory exists
-    os.makedirs(settings.upload_dir, exist_ok=True)
-    file_path = os.path.join(settings.upload_dir, filename)
-    
-    with open(file_path, "wb") as f:
-        f.write(contents)
-    
-    # Run moderation check with Claude
-    image_base64 = base64.b64encode(contents).decode("utf-8")
-    analysis = await claude_service.analyze_glove_image(image_base64, file.content_type)
-    
-    if not analysis.moderation_passed:
-        # Delete the uploaded file
-        os.remove(file_path)
-        raise HTTPException(
-            status_code=400, 
-            detail=f"Image failed moderation: {analysis.moderation_notes}"
-        )
-    
-    # Create listing
-    listing = GloveListing(
-        photo_url=get_photo_url(filename),
-        photo_filename=filename,
-        brand=brand,
-        color=color,
-        size=size,
-        side=side,
-        material=material,
-        description=description,
-        postal_code=postal_code,
-        found_date=parsed_date,
-        found_location_description=found_location_description,
-        finder_email=finder_email,
-        finder_display_name=finder_display_name,
-        fee_amount=fee_amount,
-        fee_currency=fee_currency,
-        ai_analysis=ai_analysis or json.dumps(analysis.model_dump()),
-        ai_moderation_passed=analysis.moderation_passed,
-        ai_moderation_notes=analysis.moderation_notes,
-        confidence_score=settings.initial_confidence_score,
-        status=ListingStatus.ACTIVE,
+    request_fingerprint = idempotency.request_fingerprint(
+        contents, file.content_type, file.filename, brand, color, size, side, material, description,
+        postal_code, found_date, found_location_description, finder_email, finder_display_name,
+        fee_amount, fee_currency, ai_analysis,
     )
-    
-    db.add(listing)
-    db.commit()
-    db.refresh(listing)
-    
-    return listing
+    async with idempotency.idempotent("upload", idempotency_key, request_fingerprint) as idem:
+        if idem.replay:
+            return idem.replay
+        
+        await rate_limiter.enforce("upload", request, finder_email)
+        
+        # Validate file size
+        if len(contents) > settings.max_upload_size:
+            raise HTTPException(status_code=400, detail=f"File too large. Max size: {settings.max_upload_size // (1024*1024)}MB")
+        
+        # Validate file type
+        allowed_types = ["image/jpeg", "image/png", "image/webp"]
+        if file.content_type not in allowed_types:
+            raise HTTPException(status_code=400, detail=f"Invalid file type. Allowed: {allowed_types}")
+        
+        # Validate postal code (must exist and be in an enabled region)
+        try:
+            postal_code = postal_registry.validate_postal_code(postal_code)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        
+        # Parse date
+        try:
+            parsed_date = datetime.fromisoformat(found_date.replace("Z", "+00:00"))
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid date format. Use ISO 8601.")
+        
+        # Obvious junk (dark, blank, blurry, tiny, screenshots) is rejected before storage and Claude
+        problem = await image_quality.prescreen(contents)
+        if problem:
+            raise HTTPException(status_code=400, detail=f"Image failed moderation: {problem}")
+        
+        # Check the claimed postal code against the photo's GPS location
+        gps_postal_code = await postal_geo.locate_photo(contents)
+        
+        # Generate unique filename and save
+        file_ext = file.filename.split(".")[-1] if "." in file.filename else "jpg"
+        filename = storage_service.make_key(f"{uuid.uuid4()}.{file_ext}")
+        await storage_service.save(filename, contents, file.content_type)
+        
+        # Run moderation check with Claude
+        image_base64 = base64.b64encode(contents).decode("utf-8")
+        try:
+            async with claude_admission.slot():
+                # Upload only needs the moderation verdict: the fast tier is enough unless unsure
+                analysis = await claude_service.analyze_glove_image(image_base64, file.content_type, detailed=False)
+        except ServiceUnavailableError as e:
+            if not settings.degraded_mode_enabled:
+                await storage_service.delete(filename)
+                raise service_unavailable(e)
+            # Degraded mode: accept now, moderate later (hidden from search until then)
+            analysis = None
+            moderation_queue.stats["degraded_uploads"] += 1
+        except HTTPException:
+            await storage_service.delete(filename)
+            raise
+        
+        if analysis is not None and not analysis.moderation_passed:
+            # Delete the uploaded file
+            await storage_service.delete(filename)
+            raise HTTPException(
+                status_code=400, 
+                detail=f"Image failed moderation: {analysis.moderation_notes}"
+            )
+        
+        if analysis is None:
+            moderation_fields = dict(
+                ai_moderation_passed=False,
+                ai_moderation_notes="Queued for moderation: AI analysis temporarily unavailable",
+                status=ListingStatus.PENDING_MODERATION,
+            )
+        else:
+            # Store the analysis as JSON; indexed fields always come from our own moderation run
+            analysis_data = analysis.model_dump(mode="json")
+            if ai_analysis:
+                try:
+                    analysis_data = {**json.loads(ai_analysis), "model_version": analysis.model_version}
+                except (ValueError, TypeError):
+                    pass
+            moderation_fields = dict(
+                ai_analysis=analysis_data,
+                **analysis_indexed_fields(analysis.model_dump()),
+                ai_moderation_passed=analysis.moderation_passed,
+                ai_moderation_notes=analysis.moderation_notes,
+                status=ListingStatus.ACTIVE,
+            )
+        
+        # Create listing
+        listing = GloveListing(
+            photo_url=get_photo_url(filename),
+            photo_filename=filename,
+            brand=brand,
+            color=color,
+            size=size,
+            side=side,
+            material=material,
+            description=description,
+            postal_code=postal_code,
+            found_date=parsed_date,
+            found_location_description=found_location_description,
+            gps_postal_code=gps_postal_code,
+            finder_email=finder_email,
+            finder_display_name=finder_display_name,
+            fee_amount=fee_amount,
+            fee_currency=fee_currency,
+            confidence_score=postal_geo.initial_confidence(postal_code, gps_postal_code),
+            **moderation_fields,
+        )
+        
+        # The listing goes to its region's shard; alerts and the live feed stay on the main database
+        shard = shard_router.for_postal_code(postal_code)
+        listing.id = shard_router.allocate_listing_id(shard)
+        with shard_router.shard_session(shard, db) as listing_db:
+            listing_db.add(listing)
+            listing_db.commit()
+            if listing.status == ListingStatus.ACTIVE:
+                # Notify owners with saved alerts and live feed clients instead of making them poll search
+                alerts.match_listing_safely(db, listing)
+                live_feed.publish_listing_safely(db, listing)
+            listing_db.refresh(listing)
+        search_index.apply_safely(shard, listing)
+        # Write-through: the first views of a freshly shared listing are already cached
+        listing_cache.detail_cache.put(listing.id, listing_cache.CachedDetail(
+            listing.updated_at,
+            {column.key: getattr(listing, column.key) for column in LISTING_RESPONSE_COLUMNS},
+            listing.finder_email,
+            (),
+        ))
+        
+        body = GloveListingResponse.model_validate(listing).model_dump(mode="json")
+        idem.complete(200, body)
+        return body
 
 
 @router.get("/search", response_model=GloveSearchResponse)
 async def search_gloves(
+    request: Request,
     postal_codes: Optional[str] = Query(None, description="Comma-separated postal codes"),
     brand: Optional[str] = None,
     color: Optional[str] = None,
@@ -171,111 +397,208 @@ async def search_gloves(
     side: Optional[str] = None,
     date_from: Optional[str] = None,
     date_to: Optional[str] = None,
+    color_family: Optional[str] = Query(None, description="One of the color families listed by /facets"),
     page: int = Query(1, ge=1),
     per_page: int = Query(20, ge=1, le=100),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """
     Search for glove listings with filters.
+    Rows are projected to the response columns and serialized straight to JSON bytes.
+    Supports If-None-Match: unchanged results return 304 without running the search.
     """
-    query = db.query(GloveListing).filter(
-        GloveListing.status == ListingStatus.ACTIVE,
-        GloveListing.confidence_score >= settings.confidence_removal_threshold
+    codes = [c.strip() for c in postal_codes.split(",")] if postal_codes else None
+    shards = shard_router.for_postal_codes(codes)
+    versions = await shard_router.scatter(shards, lambda shard_db: listings_data_version(shard_db, postal_codes), db)
+    # Served from the in-memory index when it is on; its feed position joins the ETag
+    index = search_index.listing_index
+    use_index = settings.search_index_enabled and index is not None
+    if settings.search_index_enabled and not use_index:
+        search_index.stats["fallbacks"] += 1
+    etag = make_etag(
+        "search",
+        str(request.query_params),
+        max((v for v in versions if v is not None), default=None),
+        index.feed_versions(shards) if use_index else None,
     )
+    if etag_matches(request, etag):
+        return not_modified(etag, settings.cache_control_search)
     
-    # Filter by postal codes
-    if postal_codes:
-        codes = [c.strip() for c in postal_codes.split(",")]
-        query = query.filter(GloveListing.postal_code.in_(codes))
-    
-    # Filter by brand (case-insensitive partial match)
-    if brand:
-        query = query.filter(GloveListing.brand.ilike(f"%{brand}%"))
-    
-    # Filter by color (case-insensitive partial match)
-    if color:
-        query = query.filter(GloveListing.color.ilike(f"%{color}%"))
-    
-    # Filter by size
-    if size and size != "unknown":
-        query = query.filter(GloveListing.size == size)
-    
-    # Filter by side
-    if side and side != "unknown":
-        query = query.filter(GloveListing.side == side)
-    
-    # Filter by date range
-    if date_from:
-        try:
-            from_date = datetime.fromisoformat(date_from.replace("Z", "+00:00"))
-            query = query.filter(GloveListing.found_date >= from_date)
-        except ValueError:
-            pass
-    
-    if date_to:
-        try:
-            to_date = datetime.fromisoformat(date_to.replace("Z", "+00:00"))
-            query = query.filter(GloveListing.found_date <= to_date)
-        except ValueError:
-            pass
-    
-    # Get total count
-    total = query.count()
-    
-    # Paginate
     offset = (page - 1) * per_page
-    items = query.order_by(GloveListing.found_date.desc()).offset(offset).limit(per_page).all()
+    if use_index:
+        search_index.stats["searches"] += 1
+        total, page_ids = index.search(
+            codes, brand, color, size, side,
+            parse_search_date(date_from), parse_search_date(date_to), color_family,
+            offset=offset, limit=per_page,
+        )
+        return cached_json({
+            "items": await load_listing_rows(page_ids, db),
+            "total": total,
+            "page": page,
+            "per_page": per_page,
+            "total_pages": (total + per_page - 1) // per_page,
+        }, etag, settings.cache_control_search)
+    
+    filters = build_search_filters(postal_codes, brand, color, size, side, date_from, date_to, color_family)
+    
+    def search_shard(shard_db: Session):
+        total = shard_db.query(func.count(GloveListing.id)).filter(*filters).scalar()
+        # Across several shards each one returns its top offset + per_page rows, merged below
+        rows = (
+            shard_db.query(*LISTING_RESPONSE_COLUMNS)
+            .filter(*filters)
+            .order_by(GloveListing.found_date.desc())
+            .offset(offset if len(shards) == 1 else 0)
+            .limit(per_page if len(shards) == 1 else offset + per_page)
+            .all()
+        )
+        return total, [dict(row._mapping) for row in rows]
+    
+    results = await shard_router.scatter(shards, search_shard, db)
+    total = sum(shard_total for shard_total, _ in results)
+    if len(results) == 1:
+        items = results[0][1]
+    else:
+        merged = heapq.merge(*(items for _, items in results), key=lambda item: item["found_date"], reverse=True)
+        items = list(itertools.islice(merged, offset, offset + per_page))
     
     total_pages = (total + per_page - 1) // per_page
     
-    return GloveSearchResponse(
-        items=items,
-        total=total,
-        page=page,
-        per_page=per_page,
-        total_pages=total_pages
+    return cached_json({
+        "items": items,
+        "total": total,
+        "page": page,
+        "per_page": per_page,
+        "total_pages": total_pages,
+    }, etag, settings.cache_control_search)
+
+
+@router.get("/facets", response_model=GloveFacetsResponse)
+async def get_search_facets(
+    request: Request,
+    postal_codes: Optional[str] = Query(None, description="Comma-separated postal codes"),
+    brand: Optional[str] = None,
+    color: Optional[str] = None,
+    size: Optional[str] = None,
+    side: Optional[str] = None,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    color_family: Optional[str] = None,
+    db: Session = Depends(get_read_db)
+):
+    """
+    Result counts per size, side, color family, brand and postal code for the search filters.
+    Each facet ignores its own filter, so the alternatives to a selected value stay visible.
+    """
+    codes = [c.strip() for c in postal_codes.split(",")] if postal_codes else None
+    shards = shard_router.for_postal_codes(codes)
+    versions = tuple(await shard_router.scatter(shards, lambda shard_db: listings_data_version(shard_db, postal_codes), db))
+    etag = make_etag("facets", str(request.query_params), max((v for v in versions if v is not None), default=None))
+    if etag_matches(request, etag):
+        return not_modified(etag, settings.cache_control_search)
+    
+    cache_key = (str(request.query_params),)
+    body = facets.facet_cache.get(cache_key, versions)
+    if body is None:
+        filters, facet_filters = search_filter_parts(postal_codes, brand, color, size, side, date_from, date_to, color_family)
+        results = await shard_router.scatter(
+            shards,
+            lambda shard_db: facets.count_facets(shard_db, GloveListing.__table__, filters, facet_filters),
+            db,
+        )
+        total = sum(shard_total for shard_total, _ in results)
+        counts = {facet: {} for facet in facets.FACETS}
+        for _, shard_counts in results:
+            for facet, values in shard_counts.items():
+                for value, count in values.items():
+                    counts[facet][value] = counts[facet].get(value, 0) + count
+        body = orjson.dumps({
+            "total": total,
+            **{
+                facet: [
+                    {"value": value, "count": count}
+                    for value, count in sorted(values.items(), key=lambda item: (-item[1], item[0]))[:settings.facet_max_values]
+                ]
+                for facet, values in counts.items()
+            },
+        })
+        facets.facet_cache.put(cache_key, versions, body)
+    
+    return cached_body(body, etag, settings.cache_control_search)
+
+
+@router.get("/stream")
+async def stream_listings(
+    postal_codes: Optional[str] = Query(None, description="Comma-separated postal codes"),
+):
+    """
+    Server-Sent Events stream of newly listed gloves ("listing" events),
+    optionally limited to some postal codes.
+    """
+    codes = [c.strip() for c in postal_codes.split(",") if c.strip()] if postal_codes else []
+    try:
+        subscriber = live_feed.hub.subscribe(codes)
+    except live_feed.HubFullError:
+        raise HTTPException(
+            status_code=503,
+            detail="Live updates are busy right now. Please try again shortly.",
+            headers={"Retry-After": "30"},
+        )
+    
+    return StreamingResponse(
+        live_feed.event_stream(subscriber),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
 
 
 @router.get("/{listing_id}", response_model=GloveListingDetail)
 async def get_glove_listing(
     listing_id: int,
+    request: Request,
     requester_email: Optional[str] = None,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_listing_read_db)
 ):
     """
     Get a single glove listing by ID.
     Finder email is only shown if the requester has paid.
     """
-    listing = db.query(GloveListing).filter(GloveListing.id == listing_id).first()
-    
-    if not listing:
+    # Paid contacts bump the listing's updated_at, so this also covers contact_unlocked
+    version = db.query(GloveListing.updated_at).filter(GloveListing.id == listing_id).scalar()
+    if version is None:
+        raise HTTPException(status_code=404, detail="Listing not found")
+    etag = make_etag("detail", listing_id, requester_email, version)
+    if etag_matches(request, etag):
+        return not_modified(etag, settings.cache_control_detail)
+    
+    def load_detail() -> Optional[listing_cache.CachedDetail]:
+        # The listing and everyone who paid to unlock it, in one query
+        rows = (
+            db.query(*LISTING_RESPONSE_COLUMNS, GloveListing.finder_email, ContactRequest.requester_email)
+            .outerjoin(
+                ContactRequest,
+                (ContactRequest.listing_id == GloveListing.id) & (ContactRequest.is_paid == True),
+            )
+            .filter(GloveListing.id == listing_id)
+            .all()
+        )
+        if not rows:
+            return None
+        public = {column.key: rows[0]._mapping[column.key] for column in LISTING_RESPONSE_COLUMNS}
+        unlocked = [row.requester_email for row in rows if row.requester_email]
+        return listing_cache.CachedDetail(version, public, rows[0].finder_email, unlocked)
+    
+    detail = await listing_cache.detail_cache.get(listing_id, version, load_detail)
+    if detail is None:
         raise HTTPException(status_code=404, detail="Listing not found")
     
-    # Check if requester has unlocked contact
-    contact_unlocked = False
-    finder_email = None
-    
-    if requester_email:
-        contact_request = db.query(ContactRequest).filter(
-            ContactRequest.listing_id == listing_id,
-            ContactRequest.requester_email == requester_email,
-            ContactRequest.is_paid == True
-        ).first()
-        
-        if contact_request:
-            contact_unlocked = True
-            finder_email = listing.finder_email
-    
-    # Build response, excluding internal fields and overriding finder_email
-    listing_dict = {k: v for k, v in listing.__dict__.items() if not k.startswith("_")}
-    listing_dict["finder_email"] = finder_email  # Only show if contact unlocked
-    listing_dict["contact_unlocked"] = contact_unlocked
-    return GloveListingDetail(**listing_dict)
+    # Finder email is only included once the requester has unlocked contact
+    return cached_body(detail.body_for(requester_email), etag, settings.cache_control_detail)
 
 
 @router.get("/{listing_id}/payment-info", response_model=PaymentInfo)
-async def get_payment_info(listing_id: int, db: Session = Depends(get_db)):
+async def get_payment_info(listing_id: int, db: Session = Depends(get_listing_read_db)):
     """
     Get payment information for contacting a finder.
     """
@@ -304,74 +627,125 @@ async def get_payment_info(listing_id: int, db: Session = Depends(get_db)):
 async def contact_finder(
     listing_id: int,
     request: ContactRequestCreate,
-    db: Session = Depends(get_db)
+    http_request: Request,
+    idempotency_key: Optional[str] = Header(None),
+    db: Session = Depends(get_db),
+    listing_db: Session = Depends(get_listing_db),
+    claude_service=Depends(get_claude_service),
 ):
     """
     Pay the finder's fee and send a contact message.
     The message is forwarded to the finder's email.
+    Send an Idempotency-Key header to make retries safe.
     """
-    listing = db.query(GloveListing).filter(GloveListing.id == listing_id).first()
-    
-    if not listing:
-        raise HTTPException(status_code=404, detail="Listing not found")
-    
-    if listing.status != ListingStatus.ACTIVE:
-        raise HTTPException(status_code=400, detail="This listing is no longer active")
-    
-    # Moderate the message
-    passed, notes = await claude_service.moderate_content(request.message)
-    if not passed:
-        raise HTTPException(status_code=400, detail=f"Message failed moderation: {notes}")
-    
-    # Calculate fees
-    platform_fee = 0.0
-    if listing.fee_currency == "eur" and listing.fee_amount > 0:
-        platform_fee = listing.fee_amount * settings.platform_fee_percentage
-    
-    # Create contact request (in production, verify payment first)
-    contact_request = ContactRequest(
-        listing_id=listing_id,
-        requester_email=request.requester_email,
-        requester_name=request.requester_name,
-        message=request.message,
-        fee_paid=listing.fee_amount,
-        fee_currency=listing.fee_currency,
-        platform_fee=platform_fee,
-        is_paid=True,  # In MVP, assume payment is successful
-        message_sent=False,
-    )
-    
-    db.add(contact_request)
-    db.commit()
-    db.refresh(contact_request)
-    
-    # Send email to finder
-    glove_desc = f"{listing.color} {listing.brand or ''} glove ({listing.side} hand, size {listing.size})"
-    await email_service.send_contact_message(
-        finder_email=listing.finder_email,
-        finder_name=listing.finder_display_name,
-        requester_email=request.requester_email,
-        requester_name=request.requester_name,
-        message=request.message,
-        glove_description=glove_desc,
-        listing_id=listing_id
-    )
-    
-    # Send confirmation to requester
-    await email_service.send_payment_confirmation(
-        requester_email=request.requester_email,
-        amount=listing.fee_amount,
-        currency=listing.fee_currency,
-        platform_fee=platform_fee,
-        listing_id=listing_id
-    )
-    
-    # Update contact request
-    contact_request.message_sent = True
-    db.commit()
-    db.refresh(contact_request)
-    
-    return contact_request
+    request_fingerprint = idempotency.request_fingerprint(listing_id, request.model_dump_json())
+    async with idempotency.idempotent("contact", idempotency_key, request_fingerprint) as idem:
+        if idem.replay:
+            return idem.replay
+        
+        await rate_limiter.enforce("contact", http_request, request.requester_email)
+        
+        listing = listing_db.query(GloveListing).filter(GloveListing.id == listing_id).first()
+        
+        if not listing:
+            raise HTTPException(status_code=404, detail="Listing not found")
+        
+        if listing.status != ListingStatus.ACTIVE:
+            raise HTTPException(status_code=400, detail="This listing is no longer active")
+        
+        # Moderate the message
+        async with claude_admission.slot():
+            passed, notes = await claude_service.moderate_content(request.message)
+        if not passed:
+            raise HTTPException(status_code=400, detail=f"Message failed moderation: {notes}")
+        
+        # Calculate fees
+        platform_fee = 0.0
+        if listing.fee_currency == "eur" and listing.fee_amount > 0:
+            platform_fee = listing.fee_amount * settings.platform_fee_percentage
+        
+        # Create contact request (in production, verify payment first)
+        contact_request = ContactRequest(
+            listing_id=listing_id,
+            requester_email=request.requester_email,
+            requester_name=request.requester_name,
+            message=request.message,
+            fee_paid=listing.fee_amount,
+            fee_currency=listing.fee_currency,
+            platform_fee=platform_fee,
+            is_paid=True,  # In MVP, assume payment is successful
+            message_sent=False,
+        )
+        
+        listing_db.add(contact_request)
+        listing_db.flush()
+        
+        # Postaal fees move through the coin ledger in the same transaction as the contact
+        # (on a region shard: committed on the main database first, then the contact).
+        # The transfer key must survive a retry after the contact commit failed, so it comes
+        # from the Idempotency-Key and request, not the contact id a retry would get anew.
+        if idempotency_key:
+            ledger_key = f"contact:{idempotency.request_fingerprint(idempotency_key, request_fingerprint)}"
+        else:
+            ledger_key = f"contact:{uuid.uuid4().hex}"
+        coin_fee = int(round(listing.fee_amount))
+        if listing.fee_currency == "postaal" and coin_fee > 0:
+            requester = request.requester_email.lower()
+            try:
+                coin_ledger.grant_signup_coins(db, requester)
+                coin_ledger.transfer(
+                    db,
+                    key=ledger_key,
+                    sender=requester,
+                    recipient=listing.finder_email.lower(),
+                    amount=coin_fee,
+                    listing_id=listing_id,
+                )
+            except coin_ledger.InsufficientCoinsError as e:
+                db.rollback()
+                listing_db.rollback()
+                raise HTTPException(status_code=402, detail=str(e))
+            except ValueError as e:
+                db.rollback()
+                listing_db.rollback()
+                raise HTTPException(status_code=400, detail=str(e))
+        
+        # Touch the listing so cached detail views (ETag) see the unlock
+        listing.updated_at = func.now()
+        db.commit()
+        listing_db.commit()
+        listing_cache.detail_cache.invalidate(listing_id)
+        listing_db.refresh(contact_request)
+        
+        # Send email to finder
+        glove_desc = f"{listing.color} {listing.brand or ''} glove ({listing.side} hand, size {listing.size})"
+        await email_service.send_contact_message(
+            finder_email=listing.finder_email,
+            finder_name=listing.finder_display_name,
+            requester_email=request.requester_email,
+            requester_name=request.requester_name,
+            message=request.message,
+            glove_description=glove_desc,
+            listing_id=listing_id
+        )
+        
+        # Send confirmation to requester
+        await email_service.send_payment_confirmation(
+            requester_email=request.requester_email,
+            amount=listing.fee_amount,
+            currency=listing.fee_currency,
+            platform_fee=platform_fee,
+            listing_id=listing_id,
+            balance_url=coin_ledger.balance_url(request.requester_email.lower()) if listing.fee_currency == "postaal" else None,
+        )
+        
+        # Update contact request
+        contact_request.message_sent = True
+        listing_db.commit()
+        listing_db.refresh(contact_request)
+        
+        idem.complete(200, ContactRequestResponse.model_validate(contact_request).model_dump(mode="json"))
+        return contact_request
 
 
 @router.post("/{listing_id}/report", response_model=GloveReportResponse)
@@ -379,7 +753,7 @@ async def report_listing(
     listing_id: int,
     report: GloveReportCreate,
     request: Request,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_listing_db)
 ):
     """
     Report a listing as spam, inappropriate, or wrong location.
@@ -391,7 +765,7 @@ async def report_listing(
         raise HTTPException(status_code=404, detail="Listing not found")
     
     # Get reporter IP
-    reporter_ip = request.client.host if request.client else None
+    reporter_ip = client_ip(request)
     
     # Create report
     glove_report = GloveReport(
@@ -404,48 +778,67 @@ async def report_listing(
     
     db.add(glove_report)
     
-    # Decrease confidence score
-    report_count = db.query(GloveReport).filter(GloveReport.listing_id == listing_id).count()
-    # Each report reduces score by 10%
-    listing.confidence_score = max(0, listing.confidence_score - 0.10)
+    # Each report lowers the score right away; the periodic rescore (services/confidence.py)
+    # recomputes it from all signals, reports included
+    listing.confidence_score = max(0, listing.confidence_score - settings.confidence_report_penalty)
     
     # Check if listing should be removed
     if listing.confidence_score < settings.confidence_removal_threshold:
         listing.status = ListingStatus.REMOVED
     
     db.commit()
+    listing_cache.detail_cache.invalidate(listing_id)
+    search_index.apply_safely(shard_router.shard_of_listing(listing_id), listing)
     db.refresh(glove_report)
     
     return glove_report
 
 
 @router.get("/stats/postal-codes", response_model=List[PostalCodeStats])
-async def get_postal_code_stats(db: Session = Depends(get_db)):
+async def get_postal_code_stats(request: Request, db: Session = Depends(get_read_db)):
     """
     Get statistics for each postal code (leaderboard).
     """
-    stats = db.query(
-        GloveListing.postal_code,
-        func.count(GloveListing.id).label("total_listings"),
-        func.sum(
-            func.case(
-                (GloveListing.status == ListingStatus.CLAIMED, 1),
-                else_=0
-            )
-        ).label("gloves_claimed"),
-    ).filter(
-        GloveListing.status.in_([ListingStatus.ACTIVE, ListingStatus.CLAIMED])
-    ).group_by(GloveListing.postal_code).all()
-    
-    return [
+    versions = await shard_router.scatter(shard_router.names, stats_data_version, db)
+    etag = make_etag("stats", *versions)
+    if etag_matches(request, etag):
+        return not_modified(etag, settings.cache_control_stats)
+    
+    def shard_stats(shard_db: Session):
+        # Claimed listings keep counting after they move to the archive
+        listings = union_all(
+            select(GloveListing.postal_code, GloveListing.status).where(
+                GloveListing.status.in_([ListingStatus.ACTIVE, ListingStatus.CLAIMED])
+            ),
+            select(GloveListingArchive.postal_code, GloveListingArchive.status).where(
+                GloveListingArchive.status == ListingStatus.CLAIMED
+            ),
+        ).subquery()
+        
+        return shard_db.query(
+            listings.c.postal_code,
+            func.count().label("total_listings"),
+            func.sum(
+                case(
+                    (listings.c.status == ListingStatus.CLAIMED, 1),
+                    else_=0
+                )
+            ).label("gloves_claimed"),
+        ).group_by(listings.c.postal_code).all()
+    
+    # Sum per postal code across shards (a code only spans shards if SHARD_ROUTES changed)
+    totals = {}
+    for rows in await shard_router.scatter(shard_router.names, shard_stats, db):
+        for row in rows:
+            listed, claimed = totals.get(row.postal_code, (0, 0))
+            totals[row.postal_code] = (listed + row.total_listings, claimed + (row.gloves_claimed or 0))
+    
+    return cached_json([
         PostalCodeStats(
-            postal_code=row.postal_code,
-            gloves_found=row.total_listings,
-            gloves_claimed=row.gloves_claimed or 0,
-            total_listings=row.total_listings,
-        )
-        for row in stats
-    ]
-
-
-
+            postal_code=postal_code,
+            gloves_found=listed,
+            gloves_claimed=claimed,
+            total_listings=listed,
+        ).model_dump()
+        for postal_code, (listed, claimed) in totals.items()
+    ], etag, settings.cache_control_stats)
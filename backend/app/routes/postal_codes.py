@@ -0,0 +1,24 @@
+from fastapi import APIRouter, HTTPException, Response
+
+from ..schemas import PostalCodeInfo
+from ..services import postal_registry
+
+router = APIRouter(prefix="/api/postal-codes", tags=["postal-codes"])
+
+
+@router.get("/{postal_code}", response_model=PostalCodeInfo)
+async def get_postal_code(postal_code: str, response: Response):
+    """
+    City, district and state for a postal code, and whether listings are enabled there.
+    Served from the in-memory registry; static data, so clients may cache it.
+    """
+    info = postal_registry.lookup(postal_code)
+    enabled = postal_registry.is_enabled(postal_code)
+    if info is None and not enabled:
+        raise HTTPException(status_code=404, detail="Unknown postal code")
+    
+    response.headers["Cache-Control"] = "public, max-age=86400"
+    if info is None:
+        # No registry installed: only the region range check is available
+        return PostalCodeInfo(postal_code=postal_code, enabled=enabled)
+    return PostalCodeInfo(**info._asdict(), enabled=enabled)
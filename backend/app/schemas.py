@@ -1,8 +1,9 @@
-from pydantic import BaseModel, EmailStr, Field, field_validator
+from pydantic import BaseModel, ConfigDict, EmailStr, Field, field_validator
 from typing import Optional, List
 from datetime import datetime
 from enum import Enum
-import re
+
+from .services import postal_registry
 
 
 class GloveSide(str, Enum):
@@ -30,16 +31,12 @@ class ListingStatus(str, Enum):
     CLAIMED = "claimed"
     REMOVED = "removed"
     PENDING_MODERATION = "pending_moderation"
+    EXPIRED = "expired"
 
 
-# Berlin postal code validator
-def validate_berlin_postal_code(v: str) -> str:
-    if not v:
-        raise ValueError("Postal code is required")
-    v = v.strip()
-    if not re.match(r"^1\d{4}$", v):
-        raise ValueError("Must be a valid Berlin postal code (5 digits starting with 1)")
-    return v
+# Postal codes must exist and lie in an enabled region (see services/postal_registry.py)
+def validate_postal_code(v: str) -> str:
+    return postal_registry.validate_postal_code(v)
 
 
 # ==================== Glove Analysis ====================
@@ -51,6 +48,8 @@ class GloveAnalysisRequest(BaseModel):
 
 class GloveAnalysisResponse(BaseModel):
     """Claude AI's analysis of a glove image"""
+    model_config = ConfigDict(protected_namespaces=())  # Allow the model_version field
+    
     brand: Optional[str] = None
     color: str
     size: GloveSize = GloveSize.UNKNOWN
@@ -61,6 +60,8 @@ class GloveAnalysisResponse(BaseModel):
     is_valid_glove: bool
     moderation_passed: bool
     moderation_notes: Optional[str] = None
+    model_version: Optional[str] = None  # Which Claude model produced this analysis
+    suggested_postal_code: Optional[str] = None  # From the photo's GPS metadata, if any
 
 
 # ==================== Glove Listing ====================
@@ -95,7 +96,7 @@ class GloveListingCreate(BaseModel):
     @field_validator("postal_code")
     @classmethod
     def validate_postal(cls, v):
-        return validate_berlin_postal_code(v)
+        return validate_postal_code(v)
 
 
 class GloveListingResponse(BaseModel):
@@ -149,6 +150,21 @@ class GloveSearchResponse(BaseModel):
     total_pages: int
 
 
+class FacetCount(BaseModel):
+    value: str
+    count: int
+
+
+class GloveFacetsResponse(BaseModel):
+    """Matching listings per filter value; each facet ignores its own filter"""
+    total: int
+    size: List[FacetCount]
+    side: List[FacetCount]
+    color_family: List[FacetCount]
+    brand: List[FacetCount]
+    postal_code: List[FacetCount]
+
+
 # ==================== Contact Request ====================
 
 class ContactRequestCreate(BaseModel):
@@ -180,6 +196,60 @@ class PaymentInfo(BaseModel):
     total_amount: float  # What user pays
 
 
+# ==================== Postal Codes ====================
+
+class PostalCodeInfo(BaseModel):
+    postal_code: str
+    city: Optional[str] = None
+    district: Optional[str] = None
+    state: Optional[str] = None
+    enabled: bool  # Can gloves be listed here?
+
+
+# ==================== Postaal Coins ====================
+
+class CoinBalance(BaseModel):
+    email: str
+    balance: int
+
+
+# ==================== Alerts ====================
+
+class GloveAlertCreate(BaseModel):
+    """Saved search: get an email when a matching glove is listed"""
+    email: EmailStr
+    postal_codes: List[str] = Field(..., min_length=1)
+    brand: Optional[str] = Field(None, max_length=100)
+    color: Optional[str] = Field(None, max_length=100)
+    size: Optional[GloveSize] = None
+    side: Optional[GloveSide] = None
+    
+    @field_validator("postal_codes")
+    @classmethod
+    def validate_postal_codes(cls, v):
+        return [validate_postal_code(code) for code in v]
+
+
+class GloveAlertResponse(BaseModel):
+    id: int
+    email: str
+    postal_codes: List[str]
+    brand: Optional[str]
+    color: Optional[str]
+    size: Optional[GloveSize]
+    side: Optional[GloveSide]
+    is_active: bool
+    created_at: datetime
+    
+    @field_validator("postal_codes", mode="before")
+    @classmethod
+    def split_postal_codes(cls, v):
+        return v.split(",") if isinstance(v, str) else v
+    
+    class Config:
+        from_attributes = True
+
+
 # ==================== Report ====================
 
 class ReportReason(str, Enum):
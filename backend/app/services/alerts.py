@@ -0,0 +1,267 @@
+"""
+Saved lost-glove alerts.
+
+An alert is a saved search (postal codes plus optional brand, color, size,
+side) that is matched against each listing when it becomes active.
+Matching never scans alerts: every alert is expanded into terms in
+glove_alert_terms, scoped by postal code, e.g.
+    10115:*  10115:size:m  10115:side:left
+A listing in 10115 looks up only the terms it satisfies within 10115, and an
+alert is a candidate when all of its terms for that postal code were hit
+(COUNT = required_terms). Cost per upload therefore depends on the number of
+alerts for one postal code, not on the total number of alerts.
+
+Brand and color are checked on those candidates with the same
+case-insensitive substring match (ILIKE '%value%') search_gloves uses, so an
+alert for "blue" matches a "dark-blue" glove exactly when a search would.
+Matches are emailed in batches by the digest worker.
+"""
+import asyncio
+import logging
+import secrets
+from collections import defaultdict
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import String, func, insert, literal, or_, select, update
+from sqlalchemy.orm import Session
+
+from ..config import get_settings
+from ..database import get_session
+from ..models import GloveAlert, GloveAlertMatch, GloveAlertTerm, GloveListing, ListingStatus
+from ..sharding import get_shard_router
+from .email_service import email_service
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+INDEXED_FILTERS = ("size", "side")  # Filters expanded into terms; brand and color are patterns
+
+stats = {"matched": 0, "digests_sent": 0, "digest_matches": 0}
+
+
+def normalize(value: Optional[str]) -> str:
+    return " ".join((value or "").lower().split())
+
+
+def alert_filters(brand: Optional[str], color: Optional[str], size: Optional[str], side: Optional[str]) -> dict:
+    """Normalized attribute filters an alert actually constrains"""
+    # Brand and color are search patterns, kept as typed (trimmed); size and side are enum values
+    filters = {
+        "brand": (brand or "").strip().lower(),
+        "color": (color or "").strip().lower(),
+        "size": normalize(size),
+        "side": normalize(side),
+    }
+    return {
+        field: value for field, value in filters.items()
+        if value and not (field in INDEXED_FILTERS and value == "unknown")
+    }
+
+
+def alert_terms(postal_codes: list, filters: dict) -> list:
+    terms = []
+    for code in postal_codes:
+        terms.append(f"{code}:*")
+        terms.extend(f"{code}:{field}:{filters[field]}" for field in INDEXED_FILTERS if field in filters)
+    return terms
+
+
+def listing_terms(postal_code: str, size, side) -> list:
+    terms = [f"{postal_code}:*"]
+    for field, value in (("size", size), ("side", side)):
+        value = normalize(getattr(value, "value", value))
+        if value and value != "unknown":
+            terms.append(f"{postal_code}:{field}:{value}")
+    return terms
+
+
+def create_alert(
+    db: Session,
+    email: str,
+    postal_codes: list,
+    brand: Optional[str] = None,
+    color: Optional[str] = None,
+    size: Optional[str] = None,
+    side: Optional[str] = None,
+) -> GloveAlert:
+    """Store an alert and its index terms. Caller commits."""
+    codes = sorted({code.strip() for code in postal_codes})
+    filters = alert_filters(brand, color, size, side)
+    alert = GloveAlert(
+        email=email.strip().lower(),
+        postal_codes=",".join(codes),
+        brand=filters.get("brand"),
+        color=filters.get("color"),
+        size=filters.get("size"),
+        side=filters.get("side"),
+        required_terms=1 + sum(field in filters for field in INDEXED_FILTERS),
+        unsubscribe_token=secrets.token_urlsafe(24),
+    )
+    db.add(alert)
+    db.flush()
+    db.execute(insert(GloveAlertTerm), [
+        {"term": term, "alert_id": alert.id} for term in alert_terms(codes, filters)
+    ])
+    return alert
+
+
+def deactivate_alert(db: Session, alert: GloveAlert) -> None:
+    """Turn an alert off and drop its index terms. Caller commits."""
+    alert.is_active = False
+    db.query(GloveAlertTerm).filter(GloveAlertTerm.alert_id == alert.id).delete(synchronize_session=False)
+
+
+def match_listing(db: Session, listing: GloveListing) -> int:
+    """
+    Record a match for every active alert the listing satisfies, in one
+    INSERT ... SELECT over the listing's posting lists. Caller commits.
+    """
+    terms = listing_terms(listing.postal_code, listing.size, listing.side)
+    hits = (
+        select(GloveAlertTerm.alert_id, func.count().label("hits"))
+        .where(GloveAlertTerm.term.in_(terms))
+        .group_by(GloveAlertTerm.alert_id)
+        .subquery()
+    )
+    matching = (
+        select(GloveAlert.id, literal(listing.id))
+        .join(hits, hits.c.alert_id == GloveAlert.id)
+        .where(
+            hits.c.hits == GloveAlert.required_terms,
+            GloveAlert.is_active.is_(True),
+            GloveAlert.email != listing.finder_email.lower(),
+            # NULL listing values never match a set filter, as in search
+            or_(GloveAlert.brand.is_(None), literal(listing.brand, String).ilike("%" + GloveAlert.brand + "%")),
+            or_(GloveAlert.color.is_(None), literal(listing.color, String).ilike("%" + GloveAlert.color + "%")),
+        )
+    )
+    result = db.execute(
+        insert(GloveAlertMatch).from_select(["alert_id", "listing_id"], matching)
+    )
+    matched = max(result.rowcount, 0)
+    stats["matched"] += matched
+    return matched
+
+
+def match_listing_safely(db: Session, listing: GloveListing) -> None:
+    """Match and commit; a failure here must never fail the upload that triggered it"""
+    try:
+        match_listing(db, listing)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Alert matching failed for listing {listing.id}: {e}")
+
+
+def load_listings(db: Session, listing_ids: set) -> dict:
+    """Listings by id, each read from the region shard that holds it"""
+    router = get_shard_router()
+    listings = {}
+    for shard, ids in router.group_by_shard(listing_ids).items():
+        with router.shard_session(shard, db) as shard_db:
+            for listing in shard_db.query(GloveListing).filter(GloveListing.id.in_(ids)):
+                listings[listing.id] = listing
+    return listings
+
+
+async def send_alert_digests() -> int:
+    """
+    Email each owner one digest of their pending matches. Returns matches handled.
+    The batch is marked notified before anything is sent, so a failure part-way
+    never emails the same digest twice; an owner whose send fails gets their
+    matches back for the next run.
+    """
+    db = get_session()
+    try:
+        rows = db.execute(
+            select(GloveAlertMatch.id, GloveAlertMatch.listing_id, GloveAlert)
+            .join(GloveAlert, GloveAlert.id == GloveAlertMatch.alert_id)
+            .where(GloveAlertMatch.notified_at.is_(None))
+            .order_by(GloveAlertMatch.id)
+            .limit(settings.alert_digest_batch_size)
+            # Several API workers run this loop; each takes a disjoint batch
+            .with_for_update(skip_locked=True, of=GloveAlertMatch)
+        ).all()
+        if not rows:
+            return 0
+
+        listings = load_listings(db, {listing_id for _, listing_id, _ in rows})
+        digests = defaultdict(list)
+        for match_id, listing_id, alert in rows:
+            listing = listings.get(listing_id)
+            # Alerts switched off or listings gone since the match are just marked done
+            if alert.is_active and listing is not None and listing.status == ListingStatus.ACTIVE:
+                digests[alert.email].append((match_id, alert, listing))
+
+        # Everything the emails need, read before the claim commit expires the objects
+        messages = [
+            {
+                "email": email,
+                "listings": [
+                    {
+                        "id": listing.id,
+                        "description": f"{listing.color} {listing.brand or ''} glove ({listing.side} hand, size {listing.size})",
+                        "postal_code": listing.postal_code,
+                        "url": f"{settings.app_base_url}/glove/{listing.id}",
+                    }
+                    for _, _, listing in matches
+                ],
+                "unsubscribe_urls": sorted({
+                    f"{settings.api_base_url}/api/alerts/unsubscribe?token={alert.unsubscribe_token}"
+                    for _, alert, _ in matches
+                }),
+                "alert_ids": {alert.id for _, alert, _ in matches},
+                "match_ids": [match_id for match_id, _, _ in matches],
+            }
+            for email, matches in digests.items()
+        ]
+
+        now = datetime.utcnow()
+        db.execute(
+            update(GloveAlertMatch)
+            .where(GloveAlertMatch.id.in_([match_id for match_id, _, _ in rows]))
+            .values(notified_at=now)
+        )
+        db.commit()
+
+        handled, sent = len(rows), 0
+        for message in messages:
+            try:
+                await email_service.send_alert_digest(
+                    email=message["email"],
+                    listings=message["listings"],
+                    unsubscribe_urls=message["unsubscribe_urls"],
+                )
+            except Exception as e:
+                logger.error(f"Alert digest to {message['email']} failed, retrying next run: {e}")
+                db.execute(
+                    update(GloveAlertMatch)
+                    .where(GloveAlertMatch.id.in_(message["match_ids"]))
+                    .values(notified_at=None)
+                )
+                db.commit()
+                handled -= len(message["match_ids"])
+                continue
+            db.execute(update(GloveAlert).where(GloveAlert.id.in_(message["alert_ids"])).values(last_notified_at=now))
+            db.commit()
+            sent += 1
+        stats["digests_sent"] += sent
+        stats["digest_matches"] += handled
+        return handled
+    finally:
+        db.close()
+
+
+async def run_digest_worker(interval_seconds: float) -> None:
+    """Background loop started from the app lifespan"""
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            handled = await send_alert_digests()
+            if handled:
+                logger.info(f"Sent alert digests for {handled} match(es)")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Alert digest run failed: {e}")
@@ -1,41 +1,36 @@
 import anthropic
-import json
-import base64
+import time
 from typing import Optional
+from pydantic import ValidationError
 from ..config import get_settings
 from ..schemas import GloveAnalysisResponse, GloveSize, GloveSide
+from .resilience import CircuitBreaker, RetryBudget, ServiceUnavailableError, call_with_retries
 
 settings = get_settings()
 
+# Transient failures worth retrying; anything else (e.g. 400 bad image) is final
+RETRYABLE_ERRORS = (
+    anthropic.APIConnectionError,  # includes APITimeoutError
+    anthropic.RateLimitError,
+    anthropic.InternalServerError,  # 5xx and 529 overloaded
+)
 
-class ClaudeService:
-    def __init__(self):
-        self.client = anthropic.Anthropic(api_key=settings.anthropic_api_key)
-        self.model = "claude-sonnet-4-20250514"
-    
-    async def analyze_glove_image(self, image_base64: str, media_type: str = "image/jpeg") -> GloveAnalysisResponse:
-        """
-        Analyze a glove image using Claude Vision.
-        Returns brand, color, size, side, material, and suggested price.
-        Also performs content moderation.
-        """
-        
-        prompt = """You are analyzing an image that should contain a single glove (the kind worn on hands).
-
-Please analyze this image and provide a JSON response with the following fields:
-
-{
-    "is_valid_glove": true/false,  // Is this actually a glove image?
-    "brand": "string or null",      // Brand name if visible (e.g., "Nike", "North Face", "Unknown")
-    "color": "string",              // Primary color(s) of the glove
-    "size": "xs|s|m|l|xl|unknown",  // Estimated size based on proportions
-    "side": "left|right|unknown",   // Which hand is this glove for?
-    "material": "string or null",   // Material if identifiable (leather, wool, synthetic, etc.)
-    "suggested_price_eur": number or null,  // Estimated value in EUR based on brand/condition
-    "description": "string",        // Brief description of the glove (2-3 sentences)
-    "moderation_passed": true/false,  // Does this image pass content moderation?
-    "moderation_notes": "string or null"  // If moderation failed, explain why
-}
+# Static instructions live in the system prompt. Tools + system stay well under the
+# models' minimum cacheable prompt length, so they are not marked for prompt caching.
+GLOVE_ANALYSIS_SYSTEM_PROMPT = """You analyze photos uploaded to PostalCodeWorx, a lost-and-found site for gloves in Berlin.
+Each image should contain a single glove (the kind worn on hands).
+
+Record your analysis with the record_glove_analysis tool:
+- is_valid_glove: is this actually a glove image?
+- brand: brand name if a logo or label is visible (e.g. "Nike", "North Face"), otherwise null
+- color: primary color(s) of the glove
+- size: estimated size from the glove's proportions (xs, s, m, l, xl), or unknown
+- side: which hand the glove is for (left, right), or unknown
+- material: leather, wool, synthetic, etc. if identifiable, otherwise null
+- suggested_price_eur: estimated value in EUR based on brand and condition, or null
+- description: brief description of the glove (2-3 sentences)
+- moderation_passed: does this image pass content moderation?
+- moderation_notes: if moderation failed, explain why; otherwise null
 
 Moderation rules - FAIL if any of these:
 - Image contains inappropriate/adult content
@@ -45,88 +40,232 @@ Moderation rules - FAIL if any of these:
 - Image quality is too poor to identify anything
 
 Be helpful and try to identify as much as possible. If you can see a brand logo, identify it.
-If you can estimate the size based on the glove's proportions, do so.
+If you can estimate the size based on the glove's proportions, do so."""
 
-Respond ONLY with valid JSON, no other text."""
+MODERATION_SYSTEM_PROMPT = """You moderate short messages that people send to glove finders on PostalCodeWorx.
 
-        try:
-            message = self.client.messages.create(
-                model=self.model,
-                max_tokens=1024,
-                messages=[
-                    {
-                        "role": "user",
-                        "content": [
-                            {
-                                "type": "image",
-                                "source": {
-                                    "type": "base64",
-                                    "media_type": media_type,
-                                    "data": image_base64,
-                                },
+Check the message for:
+1. Spam or advertising
+2. Hate speech or offensive content
+3. Personal attacks or harassment
+4. Inappropriate language
+
+Record the result with the record_moderation_result tool. Give a reason only if the message fails."""
+
+# Tool schemas map one-to-one onto GloveAnalysisResponse / (passed, reason)
+GLOVE_ANALYSIS_TOOL = {
+    "name": "record_glove_analysis",
+    "description": "Record the analysis and moderation result for a glove photo.",
+    "input_schema": {
+        "type": "object",
+        "properties": {
+            "is_valid_glove": {"type": "boolean"},
+            "brand": {"type": ["string", "null"]},
+            "color": {"type": "string"},
+            "size": {"type": "string", "enum": [s.value for s in GloveSize]},
+            "side": {"type": "string", "enum": [s.value for s in GloveSide]},
+            "material": {"type": ["string", "null"]},
+            "suggested_price_eur": {"type": ["number", "null"]},
+            "description": {"type": "string"},
+            "moderation_passed": {"type": "boolean"},
+            "moderation_notes": {"type": ["string", "null"]},
+        },
+        "required": ["is_valid_glove", "color", "size", "side", "description", "moderation_passed"],
+    },
+}
+
+# The fast tier also reports how sure it is, which drives escalation
+GLOVE_SCREEN_TOOL = {
+    **GLOVE_ANALYSIS_TOOL,
+    "input_schema": {
+        **GLOVE_ANALYSIS_TOOL["input_schema"],
+        "properties": {
+            **GLOVE_ANALYSIS_TOOL["input_schema"]["properties"],
+            "confidence": {
+                "type": "number",
+                "minimum": 0,
+                "maximum": 1,
+                "description": "How sure you are about is_valid_glove and moderation_passed (0-1).",
+            },
+        },
+        "required": GLOVE_ANALYSIS_TOOL["input_schema"]["required"] + ["confidence"],
+    },
+}
+
+MODERATION_TOOL = {
+    "name": "record_moderation_result",
+    "description": "Record whether the message passes moderation.",
+    "input_schema": {
+        "type": "object",
+        "properties": {
+            "passed": {"type": "boolean"},
+            "reason": {"type": ["string", "null"]},
+        },
+        "required": ["passed"],
+    },
+}
+
+
+def tool_input(message, tool_name: str) -> Optional[dict]:
+    """Return the arguments of the named tool call, if Claude made one"""
+    for block in message.content:
+        if block.type == "tool_use" and block.name == tool_name:
+            return block.input
+    return None
+
+
+class ClaudeService:
+    def __init__(self):
+        # Retries and timeouts are handled by call_with_retries, not the SDK
+        self.client = anthropic.AsyncAnthropic(
+            api_key=settings.anthropic_api_key,
+            timeout=settings.claude_request_deadline_seconds,
+            max_retries=0,
+        )
+        # Tiered routing: the fast model screens, the large model handles uncertain / detailed work
+        self.model = settings.claude_model_large
+        self.fast_model = settings.claude_model_fast
+        self.moderation_model = settings.claude_model_moderation or settings.claude_model_fast
+        self.breaker = CircuitBreaker(
+            "claude",
+            failure_threshold=settings.claude_breaker_failure_threshold,
+            reset_timeout=settings.claude_breaker_reset_seconds,
+        )
+        self.retry_budget = RetryBudget(ratio=settings.claude_retry_budget_ratio)
+        self.usage: dict[str, dict] = {}
+        self.routing: dict[str, int] = {}
+
+    async def _create_message(self, operation: str, model: str, deadline: Optional[float] = None, **kwargs):
+        """
+        Call the Messages API with retries, a per-request deadline and the circuit breaker.
+        `deadline` (time.monotonic()) is shared by every call made for one request;
+        without it the call gets the full claude_request_deadline_seconds.
+        Raises ServiceUnavailableError when Claude can't be reached in time.
+        """
+        if deadline is None:
+            deadline = time.monotonic() + settings.claude_request_deadline_seconds
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            # Spent by earlier tiers; not the service's fault, so the breaker isn't told
+            raise ServiceUnavailableError(f"No time left for {operation} within the request deadline")
+        start = time.perf_counter()
+        message = await call_with_retries(
+            lambda: self.client.messages.create(model=model, **kwargs),
+            breaker=self.breaker,
+            budget=self.retry_budget,
+            retryable=RETRYABLE_ERRORS,
+            deadline_seconds=remaining,
+            max_attempts=settings.claude_max_attempts,
+            base_delay=settings.claude_retry_base_delay,
+        )
+        self._record_usage(operation, message, time.perf_counter() - start)
+        return message
+
+    def _record_usage(self, operation: str, message, elapsed: float) -> None:
+        """Accumulate token and latency counts per operation"""
+        stats = self.usage.setdefault(operation, {
+            "calls": 0,
+            "input_tokens": 0,
+            "output_tokens": 0,
+            "total_latency_ms": 0.0,
+        })
+        usage = message.usage
+        stats["calls"] += 1
+        stats["input_tokens"] += usage.input_tokens
+        stats["output_tokens"] += usage.output_tokens
+        stats["total_latency_ms"] += elapsed * 1000
+
+    def _route_decision(self, screen: dict, detailed: bool) -> str:
+        """Decide whether the fast tier's answer stands or the large model must run"""
+        if not screen:
+            return "escalated_invalid_output"
+        confidence = screen.get("confidence")
+        if not isinstance(confidence, (int, float)) or confidence < settings.claude_escalation_confidence:
+            return "escalated_low_confidence"
+        # Rejections are final; accepted images only need the large model for detailed extraction
+        if detailed and screen.get("moderation_passed"):
+            return "escalated_detailed"
+        return "fast_final"
+
+    def _record_route(self, decision: str) -> None:
+        self.routing[decision] = self.routing.get(decision, 0) + 1
+
+    def stats(self) -> dict:
+        usage = {
+            operation: {**stats, "avg_latency_ms": round(stats["total_latency_ms"] / stats["calls"], 1)}
+            for operation, stats in self.usage.items()
+        }
+        return {
+            "breaker": self.breaker.stats(),
+            "retry_budget": self.retry_budget.stats(),
+            "models": {"fast": self.fast_model, "large": self.model, "moderation": self.moderation_model},
+            "routing": self.routing,
+            "usage": usage,
+        }
+
+    async def _analyze_with(
+        self, model: str, tier: str, tool: dict, image_base64: str, media_type: str, deadline: float
+    ) -> dict:
+        """One vision call on the given tier; returns the tool arguments (empty if none)"""
+        message = await self._create_message(
+            f"analyze_image:{tier}",
+            model=model,
+            deadline=deadline,
+            max_tokens=settings.claude_analysis_max_tokens,
+            system=GLOVE_ANALYSIS_SYSTEM_PROMPT,
+            tools=[tool],
+            tool_choice={"type": "tool", "name": tool["name"]},
+            messages=[
+                {
+                    "role": "user",
+                    "content": [
+                        {
+                            "type": "image",
+                            "source": {
+                                "type": "base64",
+                                "media_type": media_type,
+                                "data": image_base64,
                             },
-                            {
-                                "type": "text",
-                                "text": prompt
-                            }
-                        ],
-                    }
-                ],
-            )
-            
-            # Parse the JSON response
-            response_text = message.content[0].text
-            
-            # Try to extract JSON from the response
-            try:
-                # Handle case where Claude might wrap in markdown code blocks
-                if "```json" in response_text:
-                    response_text = response_text.split("```json")[1].split("```")[0]
-                elif "```" in response_text:
-                    response_text = response_text.split("```")[1].split("```")[0]
-                
-                data = json.loads(response_text.strip())
-            except json.JSONDecodeError:
-                # Fallback if JSON parsing fails
-                return GloveAnalysisResponse(
-                    is_valid_glove=False,
-                    color="unknown",
-                    description="Failed to analyze image",
-                    moderation_passed=False,
-                    moderation_notes="Image analysis failed - please try again"
+                        },
+                    ],
+                }
+            ],
+        )
+        return tool_input(message, tool["name"]) or {}
+
+    async def analyze_glove_image(
+        self, image_base64: str, media_type: str = "image/jpeg", detailed: bool = True
+    ) -> GloveAnalysisResponse:
+        """
+        Analyze a glove image using Claude Vision.
+        Returns brand, color, size, side, material, and suggested price.
+        Also performs content moderation.
+        
+        The fast model screens every image first. Its answer is final when it is
+        confident and either no detailed extraction was asked for or the image is
+        rejected; otherwise the large model re-runs the full analysis. Both tiers
+        share one claude_request_deadline_seconds deadline.
+        Raises ServiceUnavailableError if Claude is down or too slow.
+        """
+        deadline = time.monotonic() + settings.claude_request_deadline_seconds
+        try:
+            data, model = None, self.model
+            if settings.claude_cascade_enabled:
+                screen = await self._analyze_with(
+                    self.fast_model, "fast", GLOVE_SCREEN_TOOL, image_base64, media_type, deadline
+                )
+                decision = self._route_decision(screen, detailed)
+                if decision == "fast_final":
+                    data, model = screen, self.fast_model
+            else:
+                decision = "large_only"
+            self._record_route(decision)
+            if data is None:
+                data = await self._analyze_with(
+                    self.model, "large", GLOVE_ANALYSIS_TOOL, image_base64, media_type, deadline
                 )
-            
-            # Map size string to enum
-            size_map = {
-                "xs": GloveSize.XS,
-                "s": GloveSize.S,
-                "m": GloveSize.M,
-                "l": GloveSize.L,
-                "xl": GloveSize.XL,
-            }
-            size = size_map.get(data.get("size", "").lower(), GloveSize.UNKNOWN)
-            
-            # Map side string to enum
-            side_map = {
-                "left": GloveSide.LEFT,
-                "right": GloveSide.RIGHT,
-            }
-            side = side_map.get(data.get("side", "").lower(), GloveSide.UNKNOWN)
-            
-            return GloveAnalysisResponse(
-                brand=data.get("brand"),
-                color=data.get("color", "unknown"),
-                size=size,
-                side=side,
-                material=data.get("material"),
-                suggested_price_eur=data.get("suggested_price_eur"),
-                description=data.get("description", ""),
-                is_valid_glove=data.get("is_valid_glove", False),
-                moderation_passed=data.get("moderation_passed", False),
-                moderation_notes=data.get("moderation_notes")
-            )
-            
         except anthropic.APIError as e:
+            # Non-retryable API error (e.g. unreadable image): treat as a failed analysis
             return GloveAnalysisResponse(
                 is_valid_glove=False,
                 color="unknown",
@@ -134,58 +273,47 @@ Respond ONLY with valid JSON, no other text."""
                 moderation_passed=False,
                 moderation_notes=f"API error occurred: {str(e)}"
             )
-    
+
+        try:
+            if not data:
+                raise ValueError("No tool call in response")
+            # Tolerate casing drift on the enum fields
+            for field in ("size", "side"):
+                if isinstance(data.get(field), str):
+                    data[field] = data[field].lower()
+            return GloveAnalysisResponse.model_validate({**data, "model_version": model})
+        except (ValueError, ValidationError):
+            # Fallback if the output doesn't match the schema
+            return GloveAnalysisResponse(
+                is_valid_glove=False,
+                color="unknown",
+                description="Failed to analyze image",
+                moderation_passed=False,
+                moderation_notes="Image analysis failed - please try again"
+            )
+
     async def moderate_content(self, text: str) -> tuple[bool, Optional[str]]:
         """
         Moderate text content for spam, hate speech, etc.
         Returns (passed, notes)
         """
-        prompt = f"""Analyze the following text for content moderation.
-        
-Text to analyze:
-"{text}"
-
-Check for:
-1. Spam or advertising
-2. Hate speech or offensive content
-3. Personal attacks or harassment
-4. Inappropriate language
-
-Respond with JSON:
-{{
-    "passed": true/false,
-    "reason": "explanation if failed, null if passed"
-}}
-
-Respond ONLY with valid JSON."""
-
         try:
-            message = self.client.messages.create(
-                model=self.model,
-                max_tokens=256,
+            message = await self._create_message(
+                "moderate_text",
+                model=self.moderation_model,
+                max_tokens=settings.claude_moderation_max_tokens,
+                system=MODERATION_SYSTEM_PROMPT,
+                tools=[MODERATION_TOOL],
+                tool_choice={"type": "tool", "name": MODERATION_TOOL["name"]},
                 messages=[
-                    {"role": "user", "content": prompt}
+                    {"role": "user", "content": text}
                 ],
             )
-            
-            response_text = message.content[0].text
-            
-            # Handle markdown code blocks
-            if "```json" in response_text:
-                response_text = response_text.split("```json")[1].split("```")[0]
-            elif "```" in response_text:
-                response_text = response_text.split("```")[1].split("```")[0]
-            
-            data = json.loads(response_text.strip())
+
+            data = tool_input(message, MODERATION_TOOL["name"]) or {}
             return data.get("passed", True), data.get("reason")
-            
+
         except Exception:
             # Default to passing if moderation fails
             return True, None
 
-
-# Singleton instance
-claude_service = ClaudeService()
-
-
-
@@ -0,0 +1,192 @@
+"""
+Postaal coin ledger.
+
+Balances are never stored in a mutable counter. Every movement is appended to
+coin_transactions, and a balance is the account's compacted snapshot plus the
+ledger rows written after it. A transfer is a single INSERT ... SELECT that
+only writes its debit/credit pair if the sender can afford it, so there is no
+read-modify-write in Python and credits never contend with each other.
+On Postgres the sender is serialized with a transaction-scoped advisory lock
+(one lock per transfer, so transfers can't deadlock).
+
+Starting coins are granted on an account's first transfer. Balances are read
+through links signed with coin_balance_secret, sent to the account's email,
+so only the owner of an address can see its balance.
+"""
+import asyncio
+import hashlib
+import hmac
+import logging
+from typing import Optional
+from urllib.parse import urlencode
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from ..config import get_settings
+from ..database import get_session
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+
+class InsufficientCoinsError(Exception):
+    pass
+
+
+# Snapshot balance + ledger delta after the snapshot, for :account
+BALANCE_SQL = """
+    SELECT COALESCE(s.balance, 0) + COALESCE((
+        SELECT SUM(t.amount) FROM coin_transactions t
+        WHERE t.account_email = a.account_email
+          AND t.id > COALESCE(s.last_transaction_id, 0)
+    ), 0) AS available
+    FROM (SELECT CAST(:account AS VARCHAR(255)) AS account_email) a
+    LEFT JOIN coin_balance_snapshots s ON s.account_email = a.account_email
+"""
+
+TRANSFER_SQL = text(f"""
+    INSERT INTO coin_transactions
+        (transfer_key, account_email, counterparty_email, amount, kind, listing_id, created_at)
+    SELECT :key, :account, :recipient, -:amount, 'transfer', CAST(:listing_id AS INTEGER), CURRENT_TIMESTAMP
+    FROM ({BALANCE_SQL}) b WHERE b.available >= :amount
+    UNION ALL
+    SELECT :key, :recipient, :account, :amount, 'transfer', CAST(:listing_id AS INTEGER), CURRENT_TIMESTAMP
+    FROM ({BALANCE_SQL}) b WHERE b.available >= :amount
+    ON CONFLICT (transfer_key, account_email) DO NOTHING
+""")
+
+GRANT_SQL = text("""
+    INSERT INTO coin_transactions (transfer_key, account_email, amount, kind, created_at)
+    VALUES (:key, :account, :amount, 'grant', CURRENT_TIMESTAMP)
+    ON CONFLICT (transfer_key, account_email) DO NOTHING
+""")
+
+# Fold ledger rows up to :upto into the snapshots. Rows newer than the safety margin
+# are left for the next run so late-committing transactions (out-of-order ids) aren't skipped.
+COMPACT_SQL = text("""
+    INSERT INTO coin_balance_snapshots (account_email, balance, last_transaction_id, updated_at)
+    SELECT t.account_email, COALESCE(MAX(s.balance), 0) + SUM(t.amount), :upto, CURRENT_TIMESTAMP
+    FROM coin_transactions t
+    LEFT JOIN coin_balance_snapshots s ON s.account_email = t.account_email
+    WHERE t.id > COALESCE(s.last_transaction_id, 0) AND t.id <= :upto
+    GROUP BY t.account_email
+    ON CONFLICT (account_email) DO UPDATE SET
+        balance = excluded.balance,
+        last_transaction_id = excluded.last_transaction_id,
+        updated_at = excluded.updated_at
+""")
+
+
+def _lock_account(db: Session, account: str) -> None:
+    if db.get_bind().dialect.name == "postgresql":
+        db.execute(text("SELECT pg_advisory_xact_lock(hashtext(:account))"), {"account": account})
+
+
+def get_balance(db: Session, account: str) -> int:
+    return int(db.execute(text(BALANCE_SQL), {"account": account}).scalar() or 0)
+
+
+def has_signup_grant(db: Session, account: str) -> bool:
+    return db.execute(
+        text("SELECT 1 FROM coin_transactions WHERE transfer_key = 'signup' AND account_email = :account"),
+        {"account": account},
+    ).first() is not None
+
+
+def balance_token(account: str) -> str:
+    return hmac.new(settings.coin_balance_secret.encode(), account.encode(), hashlib.sha256).hexdigest()
+
+
+def valid_balance_token(account: str, token: str) -> bool:
+    return bool(settings.coin_balance_secret) and hmac.compare_digest(balance_token(account), token)
+
+
+def balance_url(account: str) -> Optional[str]:
+    """Signed link to the account's balance, for emails sent to that account (None when disabled)"""
+    if not settings.coin_balance_secret:
+        return None
+    return f"{settings.api_base_url}/api/coins/balance?{urlencode({'email': account, 'token': balance_token(account)})}"
+
+
+def grant_signup_coins(db: Session, account: str) -> bool:
+    """Give a new account its starting coins (once per account). Caller commits."""
+    result = db.execute(GRANT_SQL, {
+        "key": "signup",
+        "account": account,
+        "amount": settings.initial_postaal_coins,
+    })
+    return result.rowcount > 0
+
+
+def transfer(
+    db: Session,
+    key: str,
+    sender: str,
+    recipient: str,
+    amount: int,
+    listing_id: Optional[int] = None,
+) -> bool:
+    """
+    Move coins from sender to recipient inside the caller's transaction.
+    Returns True if applied now, False if this key was already applied.
+    Raises InsufficientCoinsError if the sender can't cover it.
+    """
+    if amount <= 0:
+        raise ValueError("Transfer amount must be positive")
+    if sender == recipient:
+        raise ValueError("Cannot transfer coins to the same account")
+
+    _lock_account(db, sender)
+    result = db.execute(TRANSFER_SQL, {
+        "key": key,
+        "account": sender,
+        "recipient": recipient,
+        "amount": amount,
+        "listing_id": listing_id,
+    })
+    if result.rowcount == 2:
+        return True
+
+    already_applied = db.execute(
+        text("SELECT 1 FROM coin_transactions WHERE transfer_key = :key AND account_email = :account"),
+        {"key": key, "account": sender},
+    ).first()
+    if already_applied:
+        return False
+    raise InsufficientCoinsError(f"Not enough Postaal coins to pay {amount}")
+
+
+def compact_balances(safety_margin_seconds: int = 60) -> int:
+    """Fold settled ledger rows into balance snapshots. Returns accounts updated."""
+    db = get_session()
+    try:
+        if db.get_bind().dialect.name == "postgresql":
+            cutoff = "now() - make_interval(secs => :margin)"
+        else:
+            cutoff = "datetime('now', '-' || :margin || ' seconds')"
+        upto = db.execute(
+            text(f"SELECT MAX(id) FROM coin_transactions WHERE created_at < {cutoff}"),
+            {"margin": safety_margin_seconds},
+        ).scalar()
+        if upto is None:
+            return 0
+        result = db.execute(COMPACT_SQL, {"upto": upto})
+        db.commit()
+        return result.rowcount
+    finally:
+        db.close()
+
+
+async def run_compaction_worker(interval_seconds: float) -> None:
+    """Background loop started from the app lifespan"""
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            compacted = await asyncio.to_thread(compact_balances)
+            if compacted:
+                logger.info(f"Compacted coin balances for {compacted} account(s)")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Coin balance compaction failed: {e}")
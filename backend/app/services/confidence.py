@@ -0,0 +1,250 @@
+"""
+Batch recomputation of listing confidence scores.
+
+The score is the weighted signal mix from PLAN.md, each signal in [0, 1]
+with 0.5 meaning "no evidence either way":
+- AI validity     Claude's verdict that the photo shows a real glove
+- GPS match       photo EXIF location vs. the claimed postal code
+- weather         no data source yet, always neutral
+- user history    the finder's returned (claimed) vs. removed listings
+- community       no votes yet, always neutral
+- spam            AI moderation verdict
+The mix fades with listing age (towards confidence_age_floor of itself) and
+every report still costs confidence_report_penalty, as in report_listing.
+
+A rescore streams every active listing with its signals in one query per
+region shard (server-side cursor, column batches of
+confidence_rescore_batch_size), scores each batch with NumPy and writes only
+changed rows back with one UPDATE ... FROM (VALUES ...) per batch. Listings
+falling below confidence_removal_threshold are removed in the same statement.
+Off Postgres (SQLite) the batches are read as keyset pages instead, since the
+database can't be written while a streamed read is open.
+"""
+import asyncio
+import logging
+import time
+from datetime import datetime
+from typing import Iterator
+
+from sqlalchemy import DateTime, bindparam, func, text, update
+from sqlalchemy.orm import Session
+
+from ..config import get_settings
+from ..models import GloveListing, ListingStatus
+from ..sharding import get_shard_router
+from .listing_lifecycle import maintenance_lock
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+RESCORE_LOCK_KEY = 7_301_002  # pg advisory lock id for this task
+NEUTRAL = 0.5
+MIN_CHANGE = 0.001  # Smaller score changes are not written back
+
+stats = {"runs": 0, "skipped_locked": 0, "scored": 0, "updated": 0, "removed": 0, "last_run_seconds": None}
+
+SIGNALS_QUERY = """
+    SELECT s.id, s.confidence_score, s.ai_is_valid_glove, s.ai_moderation_passed,
+           s.postal_code, s.gps_postal_code, s.created_at,
+           s.finder_claimed, s.finder_removed, COALESCE(r.reports, 0) AS reports
+    FROM (
+        SELECT id, status, confidence_score, ai_is_valid_glove, ai_moderation_passed,
+               postal_code, gps_postal_code, created_at,
+               SUM(CASE WHEN status = :claimed THEN 1 ELSE 0 END)
+                   OVER (PARTITION BY LOWER(finder_email)) AS finder_claimed,
+               SUM(CASE WHEN status = :removed THEN 1 ELSE 0 END)
+                   OVER (PARTITION BY LOWER(finder_email)) AS finder_removed
+        FROM glove_listings
+    ) s
+    LEFT JOIN (
+        SELECT listing_id, COUNT(*) AS reports FROM glove_reports GROUP BY listing_id
+    ) r ON r.listing_id = s.id
+    WHERE s.status = :active
+"""
+SIGNALS_SQL = text(SIGNALS_QUERY).columns(created_at=DateTime)
+# Keyset pages for databases that can't write while a streamed read is open (SQLite)
+SIGNALS_PAGE_SQL = text(SIGNALS_QUERY + " AND s.id > :after ORDER BY s.id LIMIT :limit").columns(created_at=DateTime)
+
+UPDATE_SQL = """
+    UPDATE glove_listings AS l
+    SET confidence_score = v.score,
+        status = CASE WHEN v.remove THEN 'REMOVED'::listingstatus ELSE l.status END,
+        updated_at = now()
+    FROM (VALUES %s) AS v(id, score, remove)
+    WHERE l.id = v.id AND l.status = 'ACTIVE'
+"""
+
+
+def compute_scores(columns: dict, now: datetime):
+    """
+    Scores for one batch of listings given as column lists (keys as in
+    SIGNALS_SQL). Returns (scores, remove) NumPy arrays.
+    """
+    import numpy as np
+
+    def signal(values):
+        # True/False -> 1/0, None (unknown) -> neutral
+        array = np.array(values, dtype=np.float64)
+        return np.where(np.isnan(array), NEUTRAL, array)
+
+    ai_valid = signal(columns["ai_is_valid_glove"])
+    spam_free = signal(columns["ai_moderation_passed"])
+
+    gps_codes = np.array(columns["gps_postal_code"], dtype=object)
+    gps_match = np.where(
+        np.not_equal(gps_codes, None),
+        (gps_codes == np.array(columns["postal_code"], dtype=object)).astype(np.float64),
+        NEUTRAL,
+    )
+
+    claimed = np.array(columns["finder_claimed"], dtype=np.float64)
+    removed = np.array(columns["finder_removed"], dtype=np.float64)
+    history = np.clip(NEUTRAL + NEUTRAL * (1 - 0.5 ** claimed) - 0.25 * removed, 0.0, 1.0)
+
+    weights = (
+        settings.confidence_weight_ai,
+        settings.confidence_weight_gps,
+        settings.confidence_weight_weather,
+        settings.confidence_weight_history,
+        settings.confidence_weight_community,
+        settings.confidence_weight_spam,
+    )
+    mix = (
+        weights[0] * ai_valid
+        + weights[1] * gps_match
+        + weights[2] * NEUTRAL
+        + weights[3] * history
+        + weights[4] * NEUTRAL
+        + weights[5] * spam_free
+    ) / sum(weights)
+
+    created = np.array(columns["created_at"], dtype="datetime64[us]")
+    age_days = np.maximum((np.datetime64(now, "us") - created) / np.timedelta64(1, "D"), 0.0)
+    floor = settings.confidence_age_floor
+    decay = floor + (1 - floor) * 0.5 ** (age_days / settings.confidence_age_half_life_days)
+
+    reports = np.array(columns["reports"], dtype=np.float64)
+    scores = np.round(np.clip(mix * decay - settings.confidence_report_penalty * reports, 0.0, 1.0), 4)
+    return scores, scores < settings.confidence_removal_threshold
+
+
+def _write_postgres(db: Session, ids: list, scores: list, remove: list) -> None:
+    from psycopg2.extras import execute_values
+
+    cursor = db.connection().connection.cursor()
+    try:
+        execute_values(cursor, UPDATE_SQL, list(zip(ids, scores, remove)), page_size=len(ids))
+    finally:
+        cursor.close()
+
+
+def _write_orm(db: Session, ids: list, scores: list, remove: list) -> None:
+    # Same guard as UPDATE_SQL: a listing whose status changed since it was read keeps its status
+    table = GloveListing.__table__
+    for removing in (False, True):
+        rows = [
+            {"listing_id": listing_id, "score": score}
+            for listing_id, score, removed in zip(ids, scores, remove)
+            if removed == removing
+        ]
+        if not rows:
+            continue
+        values = {"confidence_score": bindparam("score"), "updated_at": func.now()}
+        if removing:
+            values["status"] = ListingStatus.REMOVED
+        db.execute(
+            update(table)
+            .where(table.c.id == bindparam("listing_id"), table.c.status == ListingStatus.ACTIVE)
+            .values(**values),
+            rows,
+        )
+
+
+def signal_batches(engine, batch_size: int, params: dict) -> Iterator[tuple[list, list]]:
+    """(column names, rows) per batch of active listings with their signals"""
+    if engine.dialect.name == "postgresql":
+        with engine.connect() as reader:
+            rows = reader.execution_options(stream_results=True, yield_per=batch_size).execute(SIGNALS_SQL, params)
+            names = list(rows.keys())
+            for batch in rows.partitions():
+                yield names, batch
+        return
+    after = 0
+    while True:
+        with engine.connect() as reader:
+            rows = reader.execute(SIGNALS_PAGE_SQL, {**params, "after": after, "limit": batch_size})
+            names, batch = list(rows.keys()), rows.all()
+        if not batch:
+            return
+        yield names, batch
+        after = batch[-1].id
+
+
+def rescore_shard(shard: str, batch_size: int, now: datetime, result: dict) -> None:
+    import numpy as np
+
+    router = get_shard_router()
+    engine = router.engine(shard)
+    write = _write_postgres if engine.dialect.name == "postgresql" else _write_orm
+    params = {
+        "active": ListingStatus.ACTIVE.name,
+        "claimed": ListingStatus.CLAIMED.name,
+        "removed": ListingStatus.REMOVED.name,
+    }
+    db = router.session(shard)
+    try:
+        for names, batch in signal_batches(engine, batch_size, params):
+            columns = dict(zip(names, zip(*batch)))
+            scores, remove = compute_scores(columns, now)
+            current = np.array(columns["confidence_score"], dtype=np.float64)
+            changed = remove | ~(np.abs(scores - np.nan_to_num(current, nan=-1.0)) < MIN_CHANGE)
+            if changed.any():
+                ids = np.array(columns["id"])[changed].tolist()
+                write(db, ids, scores[changed].tolist(), remove[changed].tolist())
+                db.commit()
+            result["scored"] += len(batch)
+            result["updated"] += int(changed.sum())
+            result["removed"] += int(remove.sum())
+    finally:
+        db.close()
+
+
+def rescore_listings(batch_size: int) -> dict:
+    """Recompute every active listing's score on every shard. Blocking; call from a thread or a script."""
+    started = time.monotonic()
+    now = datetime.utcnow()
+    result = {"scored": 0, "updated": 0, "removed": 0}
+    for shard in get_shard_router().names:
+        rescore_shard(shard, batch_size, now, result)
+    stats["runs"] += 1
+    stats["scored"] += result["scored"]
+    stats["updated"] += result["updated"]
+    stats["removed"] += result["removed"]
+    stats["last_run_seconds"] = round(time.monotonic() - started, 3)
+    return result
+
+
+def run_rescore() -> dict:
+    """One rescore pass, unless another worker is already running it"""
+    with maintenance_lock(RESCORE_LOCK_KEY) as acquired:
+        if not acquired:
+            stats["skipped_locked"] += 1
+            return {"scored": 0, "updated": 0, "removed": 0}
+        return rescore_listings(settings.confidence_rescore_batch_size)
+
+
+async def run_rescore_worker(interval_seconds: float) -> None:
+    """Background loop started from the app lifespan"""
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            result = await asyncio.to_thread(run_rescore)
+            if result["scored"]:
+                logger.info(
+                    f"Confidence rescore: {result['scored']} scored, {result['updated']} updated, "
+                    f"{result['removed']} removed in {stats['last_run_seconds']}s"
+                )
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Confidence rescore failed: {e}")
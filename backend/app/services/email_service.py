@@ -71,10 +71,12 @@ BODY:
         amount: float,
         currency: str,
         platform_fee: float,
-        listing_id: int
+        listing_id: int,
+        balance_url: Optional[str] = None,
     ) -> bool:
         """
         Send payment confirmation to the person contacting the finder.
+        Coin payments include a link to the requester's balance.
         """
         subject = f"🧤 PostalCodeWorx: Payment Confirmation (Listing #{listing_id})"
         
@@ -82,7 +84,7 @@ BODY:
             fee_text = f"Platform fee (20%): €{platform_fee:.2f}"
             total_text = f"Total paid: €{amount:.2f}"
         else:
-            fee_text = ""
+            fee_text = f"Your coin balance: {balance_url}" if balance_url else ""
             total_text = f"Postaal coins used: {int(amount)}"
         
         body = f"""
@@ -112,6 +114,51 @@ BODY:
         """)
         
         return True
+    
+    async def send_alert_digest(
+        self,
+        email: str,
+        listings: list,
+        unsubscribe_urls: list,
+    ) -> bool:
+        """
+        Send a saved-search owner the new listings that matched their alerts.
+        """
+        count = len(listings)
+        subject = f"🧤 PostalCodeWorx: {count} new glove{'s' if count != 1 else ''} matching your alert"
+        
+        listing_lines = "\n".join(
+            f"- {listing['description']} in {listing['postal_code']}: {listing['url']}"
+            for listing in listings
+        )
+        unsubscribe_lines = "\n".join(unsubscribe_urls)
+        
+        body = f"""
+Hello,
+
+New gloves matching your saved search were just listed on PostalCodeWorx:
+
+{listing_lines}
+
+Is one of them yours? Open the listing to contact the finder.
+
+Best,
+The PostalCodeWorx Team
+
+Stop these alerts:
+{unsubscribe_lines}
+        """.strip()
+        
+        logger.info(f"""
+========== EMAIL ==========
+TO: {email}
+SUBJECT: {subject}
+BODY:
+{body}
+===========================
+        """)
+        
+        return True
 
 
 # Singleton instance
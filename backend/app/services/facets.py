@@ -0,0 +1,181 @@
+"""
+Facet counts for the search filters (GET /api/gloves/facets).
+
+Each facet (size, side, color family, brand, postal code) is counted the way
+the search UI needs it: every other selected filter applies, its own does
+not, so a user who picked "size m" still sees how many gloves there are in
+"l". On Postgres all facets and the total come from one GROUPING SETS
+query per shard; elsewhere (SQLite) from one UNION ALL statement.
+
+Results are cached per worker, keyed by the filters and tagged with the
+shards' data versions (max updated_at), like the search ETag. Until a listing
+changes, repeated facet requests cost only the version query.
+
+Colors are free text ("dunkelblau", "navy with white stripes"), so they are
+grouped into families by keyword, in SQL for the facet query and the
+color_family search filter, and in Python (color_family()) for everything
+else.
+"""
+import time
+from collections import OrderedDict
+from enum import Enum
+from typing import Optional
+
+from sqlalchemy import String, case, cast, func, literal, or_, select, text, union_all
+from sqlalchemy.orm import Session
+
+from ..config import get_settings
+from ..models import GloveSide, GloveSize
+
+settings = get_settings()
+
+FACETS = ("size", "side", "color_family", "brand", "postal_code")
+ENUM_FACETS = {"size": GloveSize, "side": GloveSide}
+OTHER_COLOR = "other"
+
+# First match wins, so "multicolored" is multi, not red
+COLOR_FAMILIES = {
+    "multi": ("multi", "mehrfarbig", "bunt", "striped", "gestreift", "checked", "kariert", "pattern"),
+    "black": ("black", "schwarz"),
+    "white": ("white", "weiß", "weiss", "cream", "ivory"),
+    "grey": ("grey", "gray", "grau", "silver", "charcoal", "anthra"),
+    "beige": ("beige", "sand"),
+    "brown": ("brown", "braun", "camel", "cognac", "tan"),
+    "pink": ("pink", "rosa", "magenta"),
+    "purple": ("purple", "lila", "violet", "lilac"),
+    "red": ("red", "rot", "burgundy", "bordeaux", "maroon"),
+    "orange": ("orange",),
+    "yellow": ("yellow", "gelb", "mustard"),
+    "green": ("green", "grün", "olive", "khaki", "mint"),
+    "blue": ("blue", "blau", "navy", "teal", "turquoise", "türkis"),
+}
+COLOR_FAMILY_NAMES = (*COLOR_FAMILIES, OTHER_COLOR)
+
+
+def color_family(color: Optional[str]) -> str:
+    value = (color or "").lower()
+    for family, keywords in COLOR_FAMILIES.items():
+        if any(keyword in value for keyword in keywords):
+            return family
+    return OTHER_COLOR
+
+
+def color_family_column(column):
+    """SQL expression with the same result as color_family(column)"""
+    lowered = func.lower(column)
+    return case(
+        *(
+            (or_(*(lowered.like(f"%{keyword}%") for keyword in keywords)), family)
+            for family, keywords in COLOR_FAMILIES.items()
+        ),
+        else_=OTHER_COLOR,
+    )
+
+
+def facet_query(source, base_filters: list, facet_filters: dict, dialect: str):
+    """
+    Facet counts over `source` (the listings table): rows of (facet, value,
+    count), facet None for the total. `facet_filters` maps a facet to the
+    condition selected on it.
+    """
+    dimensions = {
+        "size": source.c.size,
+        "side": source.c.side,
+        "color_family": color_family_column(source.c.color),
+        "brand": func.lower(func.trim(source.c.brand)),
+        "postal_code": source.c.postal_code,
+    }
+    rows = select(
+        *(column.label(facet) for facet, column in dimensions.items()),
+        *(case((condition, 1), else_=0).label(f"match_{facet}") for facet, condition in facet_filters.items()),
+    ).where(*base_filters).subquery()
+
+    def selected(exclude: Optional[str] = None):
+        # 1 when the row passes every facet filter except the one on `exclude`
+        product = literal(1)
+        for facet in facet_filters:
+            if facet != exclude:
+                product = product * rows.c[f"match_{facet}"]
+        return product
+
+    if dialect == "postgresql":
+        count = case(
+            *((func.grouping(rows.c[facet]) == 0, selected(facet)) for facet in FACETS),
+            else_=selected(),
+        )
+        return select(
+            *(func.grouping(rows.c[facet]).label(f"grouping_{facet}") for facet in FACETS),
+            *(rows.c[facet] for facet in FACETS),
+            func.sum(count).label("count"),
+        ).select_from(rows).group_by(func.grouping_sets(*(rows.c[facet] for facet in FACETS), text("()")))
+
+    # No GROUPING SETS: one branch per facet, still a single statement
+    return union_all(
+        select(literal(None, String).label("facet"), literal(None, String).label("value"), func.sum(selected()).label("count"))
+        .select_from(rows),
+        *(
+            select(literal(facet).label("facet"), cast(rows.c[facet], String).label("value"), func.sum(selected(facet)).label("count"))
+            .select_from(rows)
+            .group_by(rows.c[facet])
+            for facet in FACETS
+        ),
+    )
+
+
+def _facet_value(facet: str, value):
+    if isinstance(value, Enum):
+        return value.value
+    if facet in ENUM_FACETS:
+        # The UNION ALL fallback returns the stored enum name
+        return ENUM_FACETS[facet][value].value
+    return value
+
+
+def count_facets(db: Session, source, base_filters: list, facet_filters: dict) -> tuple[int, dict]:
+    """(total, {facet: {value: count}}) for one shard; values with no matches are left out"""
+    dialect = db.get_bind().dialect.name
+    total, counts = 0, {facet: {} for facet in FACETS}
+    for row in db.execute(facet_query(source, base_filters, facet_filters, dialect)):
+        if dialect == "postgresql":
+            mapping = row._mapping
+            grouped = [facet for facet in FACETS if mapping[f"grouping_{facet}"] == 0]
+            facet = grouped[0] if grouped else None
+            value = mapping[facet] if facet else None
+        else:
+            facet, value = row.facet, row.value
+        if facet is None:
+            total = int(row.count or 0)
+        elif value is not None and row.count:
+            counts[facet][_facet_value(facet, value)] = int(row.count)
+    return total, counts
+
+
+class FacetCache:
+    """Facet responses per filter set, valid while the shards' data versions are unchanged"""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[tuple, tuple]" = OrderedDict()
+        self.stats = {"hits": 0, "misses": 0}
+
+    def get(self, key: tuple, version: tuple) -> Optional[bytes]:
+        entry = self._entries.get(key)
+        if entry is None or entry[0] != version or entry[1] < time.monotonic():
+            self.stats["misses"] += 1
+            return None
+        self._entries.move_to_end(key)
+        self.stats["hits"] += 1
+        return entry[2]
+
+    def put(self, key: tuple, version: tuple, body: bytes) -> None:
+        self._entries.pop(key, None)
+        self._entries[key] = (version, time.monotonic() + settings.facet_cache_ttl_seconds, body)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+# Singleton instance
+facet_cache = FacetCache(settings.facet_cache_max_entries)
@@ -0,0 +1,256 @@
+"""
+Idempotency-Key support for POST endpoints that do expensive or
+non-repeatable work (Claude calls, photo writes, paid contact requests).
+
+The first request with a key claims it with an in_progress row in
+idempotency_keys. When it finishes, its response is stored on the row:
+- a retry with the same key and request gets that response replayed,
+- a duplicate arriving while the first is still running waits for it,
+- reusing a key for a different request is rejected with 422.
+If the first request fails with a retryable error the claim is released so
+the next retry runs normally. Expired rows are purged by listing maintenance.
+"""
+import asyncio
+import hashlib
+import logging
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+from typing import Optional
+
+from fastapi import HTTPException
+from fastapi.responses import ORJSONResponse
+from sqlalchemy import delete, select, tuple_, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from ..config import get_settings
+from ..database import get_session
+from ..models import IdempotencyKey
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+IN_PROGRESS = "in_progress"
+COMPLETED = "completed"
+REPLAYED_HEADER = "Idempotency-Replayed"
+MAX_KEY_LENGTH = 255
+POLL_INTERVAL_SECONDS = 0.5
+# Client errors are the final answer for a request, except these (worth retrying)
+RETRYABLE_CLIENT_ERRORS = {409, 429}
+
+stats = {"claimed": 0, "replayed": 0, "waited": 0, "taken_over": 0, "conflicts": 0, "purged": 0}
+
+# Duplicates on the same worker wake as soon as the owner finishes; other workers poll
+_in_flight: dict[tuple[str, str], asyncio.Event] = {}
+
+
+def request_fingerprint(*parts) -> str:
+    """sha256 over the request parts (bytes, str or anything with a stable repr)"""
+    digest = hashlib.sha256()
+    for part in parts:
+        if part is None:
+            part = b""
+        elif isinstance(part, str):
+            part = part.encode("utf-8")
+        elif not isinstance(part, bytes):
+            part = repr(part).encode("utf-8")
+        # Hash each part separately so ("ab", "c") and ("a", "bc") differ
+        digest.update(hashlib.sha256(part).digest())
+    return digest.hexdigest()
+
+
+class IdempotentRequest:
+    def __init__(self, scope: str, key: Optional[str], fingerprint: str):
+        self.scope = scope
+        self.key = key
+        self.fingerprint = fingerprint
+        self.owner = False
+        self.replay: Optional[ORJSONResponse] = None
+        self._finished = False
+
+    def _where(self):
+        return (IdempotencyKey.scope == self.scope, IdempotencyKey.key == self.key)
+
+    def _claim(self, db: Session) -> bool:
+        now = datetime.utcnow()
+        db.add(IdempotencyKey(
+            scope=self.scope,
+            key=self.key,
+            fingerprint=self.fingerprint,
+            state=IN_PROGRESS,
+            locked_at=now,
+            expires_at=now + timedelta(hours=settings.idempotency_ttl_hours),
+        ))
+        try:
+            db.commit()
+            return True
+        except IntegrityError:
+            db.rollback()
+            return False
+
+    def _take_over(self, db: Session, locked_at: datetime) -> bool:
+        """Claim an in_progress row whose owner apparently died (the compare makes this race-safe)"""
+        result = db.execute(
+            update(IdempotencyKey)
+            .where(*self._where(), IdempotencyKey.state == IN_PROGRESS, IdempotencyKey.locked_at == locked_at)
+            .values(locked_at=datetime.utcnow())
+        )
+        db.commit()
+        return result.rowcount == 1
+
+    async def acquire(self) -> None:
+        """Become the owner of the key, or load the stored response, or fail with 409/422"""
+        deadline = time.monotonic() + settings.idempotency_wait_seconds
+        waited = False
+        while True:
+            db = get_session()
+            try:
+                if self._claim(db):
+                    stats["claimed"] += 1
+                    self.owner = True
+                    return
+                row = db.execute(select(IdempotencyKey).where(*self._where())).scalar_one_or_none()
+                if row is None:
+                    continue  # Released between our insert and read; try again
+                now = datetime.utcnow()
+                if row.expires_at < now:
+                    db.execute(delete(IdempotencyKey).where(*self._where(), IdempotencyKey.expires_at < now))
+                    db.commit()
+                    continue
+                if row.fingerprint != self.fingerprint:
+                    raise HTTPException(
+                        status_code=422,
+                        detail="This Idempotency-Key was already used for a different request",
+                    )
+                if row.state == COMPLETED:
+                    stats["replayed"] += 1
+                    self.replay = ORJSONResponse(
+                        content=row.response_body,
+                        status_code=row.response_status,
+                        headers={REPLAYED_HEADER: "true"},
+                    )
+                    return
+                stale = now - row.locked_at > timedelta(seconds=settings.idempotency_lock_timeout_seconds)
+                if stale and self._take_over(db, row.locked_at):
+                    stats["taken_over"] += 1
+                    logger.warning(f"Took over stale idempotency key {self.scope}:{self.key}")
+                    self.owner = True
+                    return
+            finally:
+                db.close()
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                stats["conflicts"] += 1
+                raise HTTPException(
+                    status_code=409,
+                    detail="A request with this Idempotency-Key is still being processed",
+                    headers={"Retry-After": "5"},
+                )
+            if not waited:
+                stats["waited"] += 1
+                waited = True
+            event = _in_flight.get((self.scope, self.key))
+            if event is not None:
+                try:
+                    await asyncio.wait_for(event.wait(), timeout=remaining)
+                except asyncio.TimeoutError:
+                    pass
+            else:
+                await asyncio.sleep(min(remaining, POLL_INTERVAL_SECONDS))
+
+    def complete(self, status_code: int, body) -> None:
+        """Store the JSON response that retries with this key should get"""
+        if not self.owner or self._finished:
+            return
+        db = get_session()
+        try:
+            db.execute(
+                update(IdempotencyKey)
+                .where(*self._where())
+                .values(state=COMPLETED, response_status=status_code, response_body=body)
+            )
+            db.commit()
+        finally:
+            db.close()
+        self._finished = True
+
+    def release(self) -> None:
+        """Drop the claim so the next retry runs the request again"""
+        if not self.owner or self._finished:
+            return
+        db = get_session()
+        try:
+            db.execute(delete(IdempotencyKey).where(*self._where(), IdempotencyKey.state == IN_PROGRESS))
+            db.commit()
+        finally:
+            db.close()
+        self._finished = True
+
+
+@asynccontextmanager
+async def idempotent(scope: str, key: Optional[str], fingerprint: str):
+    """
+    Guard a handler body with an optional Idempotency-Key.
+
+        async with idempotent("upload", key, fp) as idem:
+            if idem.replay:
+                return idem.replay
+            ...
+            idem.complete(200, body)
+
+    Final client errors (HTTPException 4xx) are stored and replayed too, so a
+    rejected upload isn't re-analyzed; anything else releases the key.
+    """
+    idem = IdempotentRequest(scope, key.strip() if key else None, fingerprint)
+    if not idem.key:
+        yield idem
+        return
+    if len(idem.key) > MAX_KEY_LENGTH:
+        raise HTTPException(status_code=400, detail=f"Idempotency-Key must be at most {MAX_KEY_LENGTH} characters")
+
+    await idem.acquire()
+    if not idem.owner:
+        yield idem
+        return
+
+    event = _in_flight.setdefault((scope, idem.key), asyncio.Event())
+    try:
+        yield idem
+    except HTTPException as e:
+        if 400 <= e.status_code < 500 and e.status_code not in RETRYABLE_CLIENT_ERRORS:
+            idem.complete(e.status_code, {"detail": e.detail})
+        else:
+            idem.release()
+        raise
+    except BaseException:
+        idem.release()
+        raise
+    else:
+        # Handler returned without storing a result: nothing to replay
+        idem.release()
+    finally:
+        if _in_flight.get((scope, idem.key)) is event:
+            del _in_flight[(scope, idem.key)]
+        event.set()
+
+
+def purge_expired_keys(db: Session, now: datetime, batch_size: int) -> int:
+    """Delete expired idempotency rows in batches. Returns rows deleted."""
+    total = 0
+    while True:
+        batch = (
+            select(IdempotencyKey.scope, IdempotencyKey.key)
+            .where(IdempotencyKey.expires_at < now)
+            .limit(batch_size)
+        )
+        result = db.execute(
+            delete(IdempotencyKey).where(tuple_(IdempotencyKey.scope, IdempotencyKey.key).in_(batch))
+        )
+        db.commit()
+        total += result.rowcount
+        if result.rowcount < batch_size:
+            break
+    stats["purged"] += total
+    return total
@@ -0,0 +1,98 @@
+"""
+Local image quality pre-screen, run before any Claude call.
+
+Blank, pitch-dark, blurred, tiny and screenshot photos are rejected by
+moderation anyway, each after a full vision call. These checks catch the
+obvious ones in a few milliseconds with Pillow and NumPy, on a grayscale copy
+at most PRESCREEN_SIZE pixels wide (JPEGs are decoded at reduced scale):
+- resolution      shortest side below image_min_side_px
+- exposure        mean brightness, or nearly all pixels black / white
+- uniform frame   luminance standard deviation below image_min_contrast
+- blur            variance of the Laplacian below image_blur_threshold
+- screenshot      no camera EXIF and a few flat colors covering most pixels
+Thresholds are deliberately loose: a false reject costs a user, a miss only
+costs the call we would have made anyway. Checks run on a small dedicated
+thread pool (Pillow and NumPy release the GIL), so they never queue behind
+storage or database work.
+"""
+import asyncio
+import io
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from ..config import get_settings
+
+settings = get_settings()
+
+PRESCREEN_SIZE = 512
+DARK_LEVEL = 16
+BRIGHT_LEVEL = 240
+CLIPPED_SHARE = 0.97  # Share of pixels at the extremes that makes a frame black / white
+CAMERA_EXIF_TAGS = (0x010F, 0x0110)  # Make, Model
+
+stats = {"checked": 0, "passed": 0, "claude_calls_avoided": 0, "rejected": {}}
+
+_executor: Optional[ThreadPoolExecutor] = None
+
+
+def _reject(reason: str, message: str) -> str:
+    stats["rejected"][reason] = stats["rejected"].get(reason, 0) + 1
+    stats["claude_calls_avoided"] += 1
+    return message
+
+
+def check_image(contents: bytes) -> Optional[str]:
+    """A user-facing reason to retake the photo, or None if it is worth analyzing. Blocking."""
+    import numpy as np
+    from PIL import Image, UnidentifiedImageError
+
+    stats["checked"] += 1
+    try:
+        image = Image.open(io.BytesIO(contents))
+        width, height = image.size
+        has_camera_exif = any(image.getexif().get(tag) for tag in CAMERA_EXIF_TAGS)
+        image.draft("L", (PRESCREEN_SIZE, PRESCREEN_SIZE))
+        gray = image.convert("L")
+        gray.thumbnail((PRESCREEN_SIZE, PRESCREEN_SIZE))
+    except (UnidentifiedImageError, OSError, ValueError, Image.DecompressionBombError):
+        return _reject("unreadable", "We couldn't read this image. Please upload a JPEG, PNG or WebP photo.")
+
+    if min(width, height) < settings.image_min_side_px:
+        return _reject(
+            "too_small",
+            f"The photo is too small ({width}x{height}). Please upload one at least "
+            f"{settings.image_min_side_px} pixels on the shorter side.",
+        )
+
+    pixels = np.asarray(gray, dtype=np.float32)
+    histogram = np.bincount(np.asarray(gray, dtype=np.uint8).ravel(), minlength=256) / pixels.size
+    mean = float(pixels.mean())
+    if mean < settings.image_min_brightness or histogram[:DARK_LEVEL].sum() > CLIPPED_SHARE:
+        return _reject("too_dark", "The photo is too dark to see the glove. Please retake it with more light or the flash on.")
+    if mean > 255 - settings.image_min_brightness or histogram[BRIGHT_LEVEL:].sum() > CLIPPED_SHARE:
+        return _reject("overexposed", "The photo is washed out. Please retake it out of direct light.")
+
+    if float(pixels.std()) < settings.image_min_contrast:
+        return _reject("uniform", "The photo looks blank. Please make sure the glove is in the picture.")
+
+    laplacian = (
+        pixels[:-2, 1:-1] + pixels[2:, 1:-1] + pixels[1:-1, :-2] + pixels[1:-1, 2:] - 4 * pixels[1:-1, 1:-1]
+    )
+    if float(laplacian.var()) < settings.image_blur_threshold:
+        return _reject("blurry", "The photo is too blurry. Please hold still and tap the glove to focus.")
+
+    if not has_camera_exif and np.sort(histogram)[-8:].sum() > settings.image_screenshot_flat_share:
+        return _reject("screenshot", "This looks like a screenshot. Please upload the original photo of the glove.")
+
+    stats["passed"] += 1
+    return None
+
+
+async def prescreen(contents: bytes) -> Optional[str]:
+    """check_image on the pre-screen pool; None when the pre-screen is off or the photo passes"""
+    global _executor
+    if not settings.image_prescreen_enabled:
+        return None
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=settings.image_prescreen_workers, thread_name_prefix="prescreen")
+    return await asyncio.get_running_loop().run_in_executor(_executor, check_image, contents)
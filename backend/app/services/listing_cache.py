@@ -0,0 +1,111 @@
+"""
+Per-worker cache of listing detail responses (GET /api/gloves/{id}).
+
+Shared links make a few listings far hotter than the rest. An entry holds
+the listing's detail JSON, already serialized in its locked and unlocked
+variants, plus the set of requesters who paid to unlock it (8-byte email
+digests), so a view needs neither the listing query nor a contact_requests
+lookup.
+- Entries are tagged with the listing's updated_at, which the route reads
+  anyway for its ETag. A write on any worker bumps it, so a stale entry is
+  reloaded on the next view.
+- Concurrent misses for one listing share a single load (no stampede).
+- Entries expire after detail_cache_ttl_seconds; beyond
+  detail_cache_max_entries the least recently used go first.
+- Writes on this worker go through put() / invalidate() right away.
+"""
+import asyncio
+import hashlib
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Callable, Iterable, Optional
+
+import orjson
+
+from ..config import get_settings
+
+settings = get_settings()
+
+
+def requester_digest(email: str) -> bytes:
+    return hashlib.blake2b(email.encode("utf-8"), digest_size=8).digest()
+
+
+class CachedDetail:
+    __slots__ = ("version", "locked_body", "unlocked_body", "unlocked", "expires_at")
+
+    def __init__(self, version: Optional[datetime], public: dict, finder_email: str, unlocked: Iterable[str]):
+        self.version = version
+        self.locked_body = orjson.dumps({**public, "finder_email": None, "contact_unlocked": False})
+        self.unlocked_body = orjson.dumps({**public, "finder_email": finder_email, "contact_unlocked": True})
+        self.unlocked = frozenset(requester_digest(email) for email in unlocked)
+        self.expires_at = time.monotonic() + settings.detail_cache_ttl_seconds
+
+    def body_for(self, requester_email: Optional[str]) -> bytes:
+        if requester_email and requester_digest(requester_email) in self.unlocked:
+            return self.unlocked_body
+        return self.locked_body
+
+
+class ListingDetailCache:
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[int, CachedDetail]" = OrderedDict()
+        self._loading: dict[int, asyncio.Future] = {}
+        self.stats = {"hits": 0, "misses": 0, "coalesced": 0, "invalidations": 0}
+
+    def _fresh(self, listing_id: int, version) -> Optional[CachedDetail]:
+        entry = self._entries.get(listing_id)
+        if entry is None or entry.version != version or entry.expires_at < time.monotonic():
+            return None
+        self._entries.move_to_end(listing_id)
+        return entry
+
+    def put(self, listing_id: int, entry: CachedDetail) -> None:
+        self._entries.pop(listing_id, None)
+        self._entries[listing_id] = entry
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, listing_id: int) -> None:
+        if self._entries.pop(listing_id, None) is not None:
+            self.stats["invalidations"] += 1
+
+    async def get(self, listing_id: int, version, load: Callable[[], Optional[CachedDetail]]) -> Optional[CachedDetail]:
+        """Cached entry for this version, else the result of `load` (run in a thread, once per listing)"""
+        entry = self._fresh(listing_id, version)
+        if entry is not None:
+            self.stats["hits"] += 1
+            return entry
+
+        pending = self._loading.get(listing_id)
+        if pending is not None:
+            self.stats["coalesced"] += 1
+            await asyncio.wait({pending})
+            if not pending.cancelled():
+                return pending.result()
+            # The load we waited on failed; fall through and try ourselves
+
+        self.stats["misses"] += 1
+        future = asyncio.get_running_loop().create_future()
+        self._loading[listing_id] = future
+        try:
+            entry = await asyncio.to_thread(load)
+        except BaseException:
+            future.cancel()
+            raise
+        finally:
+            if self._loading.get(listing_id) is future:
+                del self._loading[listing_id]
+        if entry is not None:
+            self.put(listing_id, entry)
+        future.set_result(entry)
+        return entry
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+# Singleton instance
+detail_cache = ListingDetailCache(settings.detail_cache_max_entries)
@@ -0,0 +1,149 @@
+"""
+Listing lifecycle maintenance.
+
+1. Expire: active listings older than listing_expiry_days become expired.
+2. Archive: claimed, removed and expired listings untouched for
+   listing_archive_after_days move to glove_listings_archive, so the hot table
+   (and every search / stats query over it) only carries live listings.
+3. Purge expired Idempotency-Key results.
+
+Steps 1 and 2 run on every region shard. All steps work in bounded batches,
+one short transaction each, and skip rows locked by concurrent requests. A
+Postgres advisory lock keeps multiple workers from running maintenance at the
+same time.
+"""
+import asyncio
+import logging
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, insert, select, text, update
+from sqlalchemy.orm import Session
+
+from ..config import get_settings
+from ..database import get_engine
+from ..models import GloveListing, GloveListingArchive, ListingStatus
+from ..sharding import DEFAULT_SHARD, get_shard_router
+from .idempotency import purge_expired_keys
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+ARCHIVED_STATUSES = (ListingStatus.CLAIMED, ListingStatus.REMOVED, ListingStatus.EXPIRED)
+ARCHIVE_COLUMNS = [c.name for c in GloveListingArchive.__table__.columns if c.name != "archived_at"]
+MAINTENANCE_LOCK_KEY = 7_301_001  # pg advisory lock id for this task
+
+stats = {"runs": 0, "skipped_locked": 0, "expired": 0, "archived": 0, "last_run_at": None}
+
+
+def expire_stale_listings(db: Session, older_than: datetime, batch_size: int) -> int:
+    """Mark active listings created before `older_than` as expired. Returns rows changed."""
+    total = 0
+    while True:
+        batch = (
+            select(GloveListing.id)
+            .where(GloveListing.status == ListingStatus.ACTIVE, GloveListing.created_at < older_than)
+            .order_by(GloveListing.id)
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
+            .scalar_subquery()
+        )
+        result = db.execute(
+            update(GloveListing)
+            .where(GloveListing.id.in_(batch))
+            .values(status=ListingStatus.EXPIRED)  # updated_at bumps via onupdate
+            .execution_options(synchronize_session=False)
+        )
+        db.commit()
+        total += result.rowcount
+        if result.rowcount < batch_size:
+            return total
+
+
+def archive_finished_listings(db: Session, older_than: datetime, batch_size: int) -> int:
+    """Move finished listings last updated before `older_than` into the archive table"""
+    listings = GloveListing.__table__
+    source_columns = [listings.c[name] for name in ARCHIVE_COLUMNS]
+    total = 0
+    while True:
+        ids = db.scalars(
+            select(listings.c.id)
+            .where(listings.c.status.in_(ARCHIVED_STATUSES), listings.c.updated_at < older_than)
+            .order_by(listings.c.id)
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
+        ).all()
+        if not ids:
+            return total
+        db.execute(
+            insert(GloveListingArchive.__table__).from_select(
+                ARCHIVE_COLUMNS, select(*source_columns).where(listings.c.id.in_(ids))
+            )
+        )
+        db.execute(delete(listings).where(listings.c.id.in_(ids)))
+        db.commit()
+        total += len(ids)
+        if len(ids) < batch_size:
+            return total
+
+
+@contextmanager
+def maintenance_lock(key: int = MAINTENANCE_LOCK_KEY):
+    """Yield True if this process may run the task guarded by `key` (always True off Postgres)"""
+    engine = get_engine()
+    if engine.dialect.name != "postgresql":
+        yield True
+        return
+    with engine.connect() as conn:
+        acquired = conn.execute(text("SELECT pg_try_advisory_lock(:key)"), {"key": key}).scalar()
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": key})
+
+
+def run_maintenance() -> dict:
+    """Run one expiry + archive pass. Blocking; call from a thread or a script."""
+    now = datetime.utcnow()
+    result = {"expired": 0, "archived": 0, "idempotency_purged": 0}
+    with maintenance_lock() as acquired:
+        if not acquired:
+            stats["skipped_locked"] += 1
+            return result
+        router = get_shard_router()
+        for shard in router.names:
+            db = router.session(shard)
+            try:
+                result["expired"] += expire_stale_listings(
+                    db, now - timedelta(days=settings.listing_expiry_days), settings.maintenance_batch_size
+                )
+                result["archived"] += archive_finished_listings(
+                    db, now - timedelta(days=settings.listing_archive_after_days), settings.maintenance_batch_size
+                )
+                if shard == DEFAULT_SHARD:
+                    result["idempotency_purged"] = purge_expired_keys(db, now, settings.maintenance_batch_size)
+            finally:
+                db.close()
+    stats["runs"] += 1
+    stats["expired"] += result["expired"]
+    stats["archived"] += result["archived"]
+    stats["last_run_at"] = now.isoformat()
+    return result
+
+
+async def run_maintenance_worker(interval_seconds: float) -> None:
+    """Background loop started from the app lifespan"""
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            result = await asyncio.to_thread(run_maintenance)
+            if any(result.values()):
+                logger.info(
+                    f"Listing maintenance: {result['expired']} expired, {result['archived']} archived, "
+                    f"{result['idempotency_purged']} idempotency keys purged"
+                )
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Listing maintenance failed: {e}")
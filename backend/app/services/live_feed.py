@@ -0,0 +1,209 @@
+"""
+Live feed of newly active listings, streamed to browsers as Server-Sent Events.
+
+Publishing: when a listing becomes active we send
+pg_notify('glove_listings', <listing json>), so every API worker hears about
+it, whichever worker took the upload.
+Fan-out: each worker holds ONE LISTEN connection (opened when the first
+client subscribes). Each event is encoded once and handed to the subscribers
+of its postal code through in-memory channels. Every subscriber has a bounded
+queue; a client that falls behind is dropped instead of buffering without
+limit, and the browser's EventSource reconnects.
+Without Postgres (local SQLite) events go straight to this worker's hub.
+"""
+import asyncio
+import logging
+from collections import defaultdict
+from typing import Optional
+
+import orjson
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from ..config import get_settings
+from ..database import get_engine
+from ..models import GloveListing
+from ..schemas import GloveListingResponse
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+CHANNEL = "glove_listings"
+ALL_POSTAL_CODES = "*"
+MAX_PAYLOAD_BYTES = 7900  # NOTIFY payloads are capped at 8000 bytes
+LISTENER_KEEPALIVE_SECONDS = 60.0
+
+
+class HubFullError(Exception):
+    pass
+
+
+class Subscriber:
+    __slots__ = ("channels", "queue", "dropped")
+
+    def __init__(self, channels: list, queue_size: int):
+        self.channels = channels
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.dropped = False
+
+
+class ListingHub:
+    def __init__(self, queue_size: int, max_subscribers: int):
+        self.queue_size = queue_size
+        self.max_subscribers = max_subscribers
+        self.channels: dict[str, set] = defaultdict(set)
+        self.subscribers = 0
+        self.stats = {
+            "events": 0,
+            "delivered": 0,
+            "dropped_slow": 0,
+            "rejected_full": 0,
+            "listener_reconnects": 0,
+        }
+        self._listener: Optional[asyncio.Task] = None
+
+    def subscribe(self, postal_codes: list) -> Subscriber:
+        if self.subscribers >= self.max_subscribers:
+            self.stats["rejected_full"] += 1
+            raise HubFullError("Too many live feed subscribers on this worker")
+        subscriber = Subscriber(postal_codes or [ALL_POSTAL_CODES], self.queue_size)
+        for channel in subscriber.channels:
+            self.channels[channel].add(subscriber)
+        self.subscribers += 1
+        self._ensure_listener()
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber) -> None:
+        for channel in subscriber.channels:
+            members = self.channels.get(channel)
+            if members is not None:
+                members.discard(subscriber)
+                if not members:
+                    del self.channels[channel]
+        self.subscribers -= 1
+
+    def dispatch(self, payload: str) -> None:
+        """Fan one listing event out to the matching subscribers (never blocks)"""
+        event = orjson.loads(payload)
+        self.stats["events"] += 1
+        frame = f"event: listing\nid: {event['id']}\ndata: {payload}\n\n".encode("utf-8")
+        targets = self.channels.get(event.get("postal_code"), set()) | self.channels.get(ALL_POSTAL_CODES, set())
+        for subscriber in targets:
+            if subscriber.dropped:
+                continue
+            try:
+                subscriber.queue.put_nowait(frame)
+                self.stats["delivered"] += 1
+            except asyncio.QueueFull:
+                # Backpressure: a client this far behind gets disconnected and reconnects
+                subscriber.dropped = True
+                self.stats["dropped_slow"] += 1
+
+    def _ensure_listener(self) -> None:
+        if get_engine().dialect.name != "postgresql":
+            return
+        if self._listener is None or self._listener.done():
+            self._listener = asyncio.create_task(self._listen())
+
+    def stop(self) -> None:
+        if self._listener is not None:
+            self._listener.cancel()
+
+    def _connect(self):
+        """Dedicated autocommit DBAPI connection, outside the pool (it is held forever)"""
+        engine = get_engine()
+        cargs, cparams = engine.dialect.create_connect_args(engine.url)
+        conn = engine.dialect.dbapi.connect(*cargs, **cparams)
+        conn.autocommit = True
+        with conn.cursor() as cursor:
+            cursor.execute(f"LISTEN {CHANNEL}")
+        return conn
+
+    async def _listen(self) -> None:
+        loop = asyncio.get_running_loop()
+        backoff = 1.0
+        while True:
+            conn = None
+            try:
+                conn = await asyncio.to_thread(self._connect)
+                readable = asyncio.Event()
+                loop.add_reader(conn.fileno(), readable.set)
+                backoff = 1.0
+                try:
+                    while True:
+                        try:
+                            await asyncio.wait_for(readable.wait(), timeout=LISTENER_KEEPALIVE_SECONDS)
+                        except asyncio.TimeoutError:
+                            # Quiet for a while: make sure the connection is still alive
+                            await asyncio.to_thread(self._ping, conn)
+                        readable.clear()
+                        conn.poll()
+                        while conn.notifies:
+                            self.dispatch(conn.notifies.pop(0).payload)
+                finally:
+                    loop.remove_reader(conn.fileno())
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.stats["listener_reconnects"] += 1
+                logger.warning(f"Live feed listener failed, reconnecting in {backoff:.0f}s: {e}")
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, 30.0)
+            finally:
+                if conn is not None:
+                    conn.close()
+
+    @staticmethod
+    def _ping(conn) -> None:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT 1")
+
+
+def listing_event(listing: GloveListing) -> str:
+    data = GloveListingResponse.model_validate(listing).model_dump(mode="json")
+    payload = orjson.dumps(data)
+    if len(payload) > MAX_PAYLOAD_BYTES:
+        data["description"] = (data["description"] or "")[:200]
+        payload = orjson.dumps(data)
+    return payload.decode("utf-8")
+
+
+def publish_listing(db: Session, listing: GloveListing) -> None:
+    """Announce a newly active listing to live feed subscribers on every worker. Caller commits."""
+    payload = listing_event(listing)
+    if db.get_bind().dialect.name == "postgresql":
+        # Delivered to listeners when the transaction commits
+        db.execute(text("SELECT pg_notify(:channel, :payload)"), {"channel": CHANNEL, "payload": payload})
+    else:
+        hub.dispatch(payload)
+
+
+def publish_listing_safely(db: Session, listing: GloveListing) -> None:
+    """Publish and commit; a failure here must never fail the write that triggered it"""
+    try:
+        publish_listing(db, listing)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Live feed publish failed for listing {listing.id}: {e}")
+
+
+async def event_stream(subscriber: Subscriber):
+    """SSE body for one client: listing events, keepalive comments, and a final notice if dropped"""
+    try:
+        yield f"retry: {settings.stream_retry_ms}\n\n".encode("utf-8")
+        while not subscriber.dropped:
+            try:
+                frame = await asyncio.wait_for(subscriber.queue.get(), timeout=settings.stream_heartbeat_seconds)
+            except asyncio.TimeoutError:
+                # Keeps proxies from closing idle connections
+                yield b": keepalive\n\n"
+                continue
+            yield frame
+        yield b"event: dropped\ndata: {}\n\n"
+    finally:
+        hub.unsubscribe(subscriber)
+
+
+# Singleton instance (no connections until the first subscriber)
+hub = ListingHub(settings.stream_queue_size, settings.stream_max_subscribers)
@@ -0,0 +1,115 @@
+"""
+Deferred moderation for listings accepted while Claude was unavailable.
+Uploads taken in degraded mode are stored as PENDING_MODERATION; this worker
+re-runs the image analysis once the circuit breaker lets calls through again.
+Runs are serialized across workers with an advisory lock, so each pending
+listing is analyzed once.
+"""
+import asyncio
+import base64
+import logging
+import mimetypes
+
+from ..config import get_settings
+from ..database import get_session
+from ..dependencies import get_claude_service, get_storage_service
+from ..models import GloveListing, ListingStatus, analysis_indexed_fields
+from ..sharding import DEFAULT_SHARD, get_shard_router
+from . import alerts, listing_cache, live_feed, search_index
+from .listing_lifecycle import maintenance_lock
+from .resilience import ServiceUnavailableError
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+MODERATION_LOCK_KEY = 7_301_004  # pg advisory lock id for this task
+
+stats = {"degraded_uploads": 0, "approved": 0, "rejected": 0, "load_errors": 0, "skipped_locked": 0}
+
+
+async def process_pending_listings(limit: int = 20) -> int:
+    """Moderate up to `limit` pending listings per shard, oldest first. Returns how many were decided."""
+    decided = 0
+    with maintenance_lock(MODERATION_LOCK_KEY) as acquired:
+        if not acquired:
+            stats["skipped_locked"] += 1
+            return 0
+        for shard in get_shard_router().names:
+            decided += await process_shard(shard, limit)
+    return decided
+
+
+async def process_shard(shard: str, limit: int) -> int:
+    claude_service = get_claude_service()
+    storage_service = get_storage_service()
+    db = get_shard_router().session(shard)
+    # Alerts and the live feed live on the main database
+    main_db = db if shard == DEFAULT_SHARD else get_session()
+    decided = 0
+    try:
+        listings = (
+            db.query(GloveListing)
+            .filter(GloveListing.status == ListingStatus.PENDING_MODERATION)
+            .order_by(GloveListing.created_at)
+            .limit(limit)
+            .all()
+        )
+        for listing in listings:
+            if not claude_service.breaker.is_available():
+                break
+            
+            try:
+                contents = await storage_service.load(listing.photo_filename)
+            except Exception as e:
+                # Leave it pending; one unreadable photo shouldn't hold up the rest
+                stats["load_errors"] += 1
+                logger.warning(f"Could not load photo of pending listing {listing.id}: {e}")
+                continue
+            media_type = mimetypes.guess_type(listing.photo_filename)[0] or "image/jpeg"
+            image_base64 = base64.b64encode(contents).decode("utf-8")
+            try:
+                analysis = await claude_service.analyze_glove_image(image_base64, media_type, detailed=False)
+            except ServiceUnavailableError:
+                break
+            
+            analysis_data = analysis.model_dump(mode="json")
+            listing.ai_analysis = analysis_data
+            for key, value in analysis_indexed_fields(analysis_data).items():
+                setattr(listing, key, value)
+            listing.ai_moderation_passed = analysis.moderation_passed
+            listing.ai_moderation_notes = analysis.moderation_notes
+            
+            if analysis.moderation_passed:
+                listing.status = ListingStatus.ACTIVE
+                stats["approved"] += 1
+            else:
+                listing.status = ListingStatus.REMOVED
+                stats["rejected"] += 1
+                await storage_service.delete(listing.photo_filename)
+            db.commit()
+            listing_cache.detail_cache.invalidate(listing.id)
+            search_index.apply_safely(shard, listing)
+            if listing.status == ListingStatus.ACTIVE:
+                alerts.match_listing_safely(main_db, listing)
+                live_feed.publish_listing_safely(main_db, listing)
+            decided += 1
+    finally:
+        db.close()
+        if main_db is not db:
+            main_db.close()
+    return decided
+
+
+async def run_moderation_worker(interval_seconds: float) -> None:
+    """Background loop started from the app lifespan"""
+    while True:
+        # Sleep first so worker startup never waits on the database or Claude
+        await asyncio.sleep(interval_seconds)
+        try:
+            decided = await process_pending_listings()
+            if decided:
+                logger.info(f"Moderated {decided} pending listing(s)")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Pending moderation run failed: {e}")
@@ -0,0 +1,178 @@
+"""
+Garbage collection of photo files.
+
+Two kinds of files waste storage:
+- orphans: no listing references them (an upload that failed after the
+  photo was saved, a crash mid-write leaving a .tmp file, ...),
+- dead photos: every listing using them is REMOVED or EXPIRED, live or
+  archived.
+
+A pass streams the storage keys (StorageBackend.iter_objects) and the
+photo_filename column of glove_listings and glove_listings_archive on every
+shard, both in ascending key order, and merge-joins the two streams. Memory
+stays constant however many photos there are: one server-side cursor per
+shard read in batches of photo_gc_batch_size, plus one directory at a time
+(local) or one listing page (S3).
+
+Orphans are deleted once older than photo_gc_orphan_grace_hours, so an
+upload whose listing is not committed yet is never touched. Dead photos are
+deleted photo_gc_dead_retention_days after the listing last changed. A pass
+stops after photo_gc_max_deletes deletions, and aborts if either stream
+comes out of order, rather than deleting files that are still in use.
+"""
+import asyncio
+import heapq
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+from itertools import groupby
+from typing import Iterator, Optional
+
+from sqlalchemy import func, select, union_all
+
+from ..config import get_settings
+from ..models import GloveListing, GloveListingArchive, ListingStatus
+from ..sharding import get_shard_router
+from .listing_lifecycle import maintenance_lock
+from .storage_service import StorageBackend, create_storage
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+PHOTO_GC_LOCK_KEY = 7_301_003  # pg advisory lock id for this task
+DEAD_STATUSES = frozenset({ListingStatus.REMOVED, ListingStatus.EXPIRED})
+
+stats = {
+    "runs": 0,
+    "skipped_locked": 0,
+    "scanned": 0,
+    "orphans_deleted": 0,
+    "dead_deleted": 0,
+    "bytes_freed": 0,
+    "last_run_seconds": None,
+}
+
+
+def _empty_result() -> dict:
+    return {"scanned": 0, "referenced": 0, "missing": 0, "orphans_deleted": 0, "dead_deleted": 0, "bytes_freed": 0}
+
+
+def _in_order(rows: Iterator, key, source: str) -> Iterator:
+    """Pass rows through, raising if their keys are not ascending (a merge-join on them would be wrong)"""
+    previous = None
+    for row in rows:
+        current = key(row)
+        if previous is not None and current < previous:
+            raise RuntimeError(f"{source} is not sorted: {current!r} after {previous!r}")
+        previous = current
+        yield row
+
+
+def shard_references(shard: str, batch_size: int) -> Iterator[tuple]:
+    """(photo_filename, status, last change) of every live and archived listing on a shard, by filename"""
+    engine = get_shard_router().engine(shard)
+    references = union_all(*(
+        select(
+            table.c.photo_filename.label("key"),
+            table.c.status,
+            func.coalesce(table.c.updated_at, table.c.created_at).label("changed_at"),
+        )
+        for table in (GloveListing.__table__, GloveListingArchive.__table__)
+    )).subquery()
+    order = references.c.key
+    if engine.dialect.name == "postgresql":
+        order = order.collate("C")  # Code point order, like the storage listings (SQLite compares bytes anyway)
+    with engine.connect() as conn:
+        rows = conn.execution_options(stream_results=True, yield_per=batch_size).execute(
+            select(references.c.key, references.c.status, references.c.changed_at).order_by(order)
+        )
+        for batch in rows.partitions():
+            yield from batch
+
+
+def references(batch_size: int) -> Iterator[tuple[str, list]]:
+    """(key, [(status, changed_at), ...]) for every referenced key, merged across shards in key order"""
+    streams = [
+        _in_order(shard_references(shard, batch_size), lambda row: row[0], f"photo_filename on shard {shard}")
+        for shard in get_shard_router().names
+    ]
+    merged = heapq.merge(*streams, key=lambda row: row[0])
+    for key, rows in groupby(merged, key=lambda row: row[0]):
+        yield key, [(row[1], row[2]) for row in rows]
+
+
+def collect(storage: StorageBackend, now: datetime, dry_run: bool = False) -> dict:
+    """One merge-join pass over storage and the listing tables. Blocking; call from a thread or a script."""
+    result = _empty_result()
+    # File times are epoch seconds; `now` is naive UTC like the listing timestamps
+    orphan_before = (now - timedelta(hours=settings.photo_gc_orphan_grace_hours)).replace(tzinfo=timezone.utc).timestamp()
+    dead_before = now - timedelta(days=settings.photo_gc_dead_retention_days)
+    refs = references(settings.photo_gc_batch_size)
+    ref: Optional[tuple[str, list]] = next(refs, None)
+
+    for obj in _in_order(storage.iter_objects(), lambda obj: obj.key, "Photo storage listing"):
+        result["scanned"] += 1
+        while ref is not None and ref[0] < obj.key:
+            result["missing"] += 1  # Listing whose file is already gone
+            ref = next(refs, None)
+
+        if ref is not None and ref[0] == obj.key:
+            result["referenced"] += 1
+            uses = ref[1]
+            ref = next(refs, None)
+            dead = all(status in DEAD_STATUSES and changed_at is not None and changed_at < dead_before
+                       for status, changed_at in uses)
+            if not dead:
+                continue
+            kind = "dead_deleted"
+        elif obj.modified < orphan_before:
+            kind = "orphans_deleted"
+        else:
+            continue  # Fresh file, its listing may not be committed yet
+
+        if result["orphans_deleted"] + result["dead_deleted"] >= settings.photo_gc_max_deletes:
+            logger.warning(f"Photo GC stopped after {settings.photo_gc_max_deletes} deletions")
+            break
+        if not dry_run:
+            storage.delete_blocking(obj.key)
+        result[kind] += 1
+        result["bytes_freed"] += obj.size
+
+    return result
+
+
+def collect_photos(dry_run: bool = False) -> dict:
+    started = time.monotonic()
+    result = collect(create_storage(), datetime.utcnow(), dry_run=dry_run)
+    if not dry_run:
+        stats["runs"] += 1
+        for name in ("scanned", "orphans_deleted", "dead_deleted", "bytes_freed"):
+            stats[name] += result[name]
+        stats["last_run_seconds"] = round(time.monotonic() - started, 3)
+    return result
+
+
+def run_photo_gc(dry_run: bool = False) -> dict:
+    """One GC pass, unless another worker is already running it"""
+    with maintenance_lock(PHOTO_GC_LOCK_KEY) as acquired:
+        if not acquired:
+            stats["skipped_locked"] += 1
+            return _empty_result()
+        return collect_photos(dry_run=dry_run)
+
+
+async def run_photo_gc_worker(interval_seconds: float) -> None:
+    """Background loop started from the app lifespan"""
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            result = await asyncio.to_thread(run_photo_gc)
+            if result["orphans_deleted"] or result["dead_deleted"]:
+                logger.info(
+                    f"Photo GC: scanned {result['scanned']}, deleted {result['orphans_deleted']} orphaned "
+                    f"and {result['dead_deleted']} dead photos, freed {result['bytes_freed'] / 1024 / 1024:.1f} MiB"
+                )
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Photo GC failed: {e}")
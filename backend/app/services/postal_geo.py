@@ -0,0 +1,226 @@
+"""
+Photo location checks: GPS from EXIF, resolved to a postal code in-process.
+
+Postal code areas are loaded once from a GeoJSON file of PLZ boundary
+polygons (settings.plz_boundaries_path; build it with
+scripts/build_plz_boundaries.py). Lookups go through a uniform grid over
+the areas' bounding box:
+- cells that lie entirely inside one area (no boundary edge touches them)
+  answer directly,
+- boundary cells keep the few candidate polygons, tested by ray casting.
+No external geocoding service is involved. Without a boundary file the
+lookup is disabled and uploads behave as before.
+
+Loading the file and building the grid takes seconds for all of Germany, so
+the app lifespan starts it in a thread (preload_postal_code_index) and
+requests only ever touch EXIF and the index through locate_photo, off the
+event loop.
+"""
+import asyncio
+import io
+import json
+import logging
+import os
+import threading
+from functools import lru_cache
+from typing import Optional
+
+from ..config import get_settings
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+GPS_IFD = 0x8825
+GPS_LATITUDE_REF, GPS_LATITUDE, GPS_LONGITUDE_REF, GPS_LONGITUDE = 1, 2, 3, 4
+POSTAL_CODE_PROPERTIES = ("plz", "postal_code", "postcode")
+DEFAULT_BOUNDARIES_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "berlin_plz.geojson")
+
+_index_lock = threading.Lock()
+
+
+def extract_gps(contents: bytes) -> Optional[tuple[float, float]]:
+    """(latitude, longitude) from the photo's EXIF GPS tags, if present"""
+    from PIL import Image
+
+    try:
+        gps = Image.open(io.BytesIO(contents)).getexif().get_ifd(GPS_IFD)
+        if not gps or GPS_LATITUDE not in gps or GPS_LONGITUDE not in gps:
+            return None
+        lat = _degrees(gps[GPS_LATITUDE], gps.get(GPS_LATITUDE_REF, "N"), "S")
+        lon = _degrees(gps[GPS_LONGITUDE], gps.get(GPS_LONGITUDE_REF, "E"), "W")
+    except Exception:
+        # Missing, truncated or malformed EXIF is common; it just means "no location"
+        return None
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180) or (lat == 0 and lon == 0):
+        return None
+    return lat, lon
+
+
+def _degrees(dms, ref, negative_ref: str) -> float:
+    degrees, minutes, seconds = (float(part) for part in dms)
+    value = degrees + minutes / 60 + seconds / 3600
+    if isinstance(ref, bytes):
+        ref = ref.decode("ascii", "ignore")
+    return -value if str(ref).strip().upper() == negative_ref else value
+
+
+def _point_in_ring(x: float, y: float, xs: list, ys: list) -> bool:
+    inside = False
+    j = len(xs) - 1
+    for i in range(len(xs)):
+        yi, yj = ys[i], ys[j]
+        if (yi > y) != (yj > y) and x < (xs[j] - xs[i]) * (y - yi) / (yj - yi) + xs[i]:
+            inside = not inside
+        j = i
+    return inside
+
+
+class PostalArea:
+    """One polygon of a postal code area, with its rings split into coordinate lists"""
+    __slots__ = ("postal_code", "bbox", "outer", "holes")
+
+    def __init__(self, postal_code: str, rings: list):
+        self.postal_code = postal_code
+        self.outer = ([p[0] for p in rings[0]], [p[1] for p in rings[0]])
+        self.holes = [([p[0] for p in ring], [p[1] for p in ring]) for ring in rings[1:]]
+        xs, ys = self.outer
+        self.bbox = (min(xs), min(ys), max(xs), max(ys))
+
+    def contains(self, x: float, y: float) -> bool:
+        min_x, min_y, max_x, max_y = self.bbox
+        if not (min_x <= x <= max_x and min_y <= y <= max_y):
+            return False
+        if not _point_in_ring(x, y, *self.outer):
+            return False
+        return not any(_point_in_ring(x, y, *hole) for hole in self.holes)
+
+    def rings(self):
+        yield self.outer
+        yield from self.holes
+
+
+class PostalCodeIndex:
+    def __init__(self, areas: list, cell_degrees: float):
+        self.areas = areas
+        self.cell = cell_degrees
+        self.min_x = min(a.bbox[0] for a in areas)
+        self.min_y = min(a.bbox[1] for a in areas)
+        self.max_x = max(a.bbox[2] for a in areas)
+        self.max_y = max(a.bbox[3] for a in areas)
+        self.interior: dict[tuple[int, int], str] = {}
+        self.candidates: dict[tuple[int, int], list] = {}
+        self._build()
+
+    def _cell_of(self, x: float, y: float) -> tuple[int, int]:
+        return int((x - self.min_x) / self.cell), int((y - self.min_y) / self.cell)
+
+    def _build(self) -> None:
+        for area in self.areas:
+            # Cells touched by any boundary edge (conservatively: by the edge's bbox)
+            boundary = set()
+            for xs, ys in area.rings():
+                for i in range(len(xs)):
+                    x0, y0 = self._cell_of(xs[i - 1], ys[i - 1])
+                    x1, y1 = self._cell_of(xs[i], ys[i])
+                    for cx in range(min(x0, x1), max(x0, x1) + 1):
+                        for cy in range(min(y0, y1), max(y0, y1) + 1):
+                            boundary.add((cx, cy))
+            for cell in boundary:
+                self.candidates.setdefault(cell, []).append(area)
+
+            # Remaining cells in the bbox are either fully inside or fully outside
+            bx0, by0 = self._cell_of(area.bbox[0], area.bbox[1])
+            bx1, by1 = self._cell_of(area.bbox[2], area.bbox[3])
+            for cx in range(bx0, bx1 + 1):
+                for cy in range(by0, by1 + 1):
+                    if (cx, cy) in boundary:
+                        continue
+                    center_x = self.min_x + (cx + 0.5) * self.cell
+                    center_y = self.min_y + (cy + 0.5) * self.cell
+                    if area.contains(center_x, center_y):
+                        self.interior[(cx, cy)] = area.postal_code
+
+    def lookup(self, lat: float, lon: float) -> Optional[str]:
+        """Postal code whose area contains the point, or None"""
+        if not (self.min_x <= lon <= self.max_x and self.min_y <= lat <= self.max_y):
+            return None
+        cell = self._cell_of(lon, lat)
+        code = self.interior.get(cell)
+        if code is not None:
+            return code
+        for area in self.candidates.get(cell, ()):
+            if area.contains(lon, lat):
+                return area.postal_code
+        return None
+
+    @classmethod
+    def from_geojson(cls, data: dict, cell_degrees: float) -> "PostalCodeIndex":
+        areas = []
+        for feature in data.get("features", []):
+            properties = feature.get("properties") or {}
+            code = next((str(properties[k]) for k in POSTAL_CODE_PROPERTIES if properties.get(k)), None)
+            geometry = feature.get("geometry") or {}
+            if not code:
+                continue
+            if geometry.get("type") == "Polygon":
+                polygons = [geometry["coordinates"]]
+            elif geometry.get("type") == "MultiPolygon":
+                polygons = geometry["coordinates"]
+            else:
+                continue
+            areas.extend(PostalArea(code, rings) for rings in polygons if rings and rings[0])
+        if not areas:
+            raise ValueError("No postal code polygons found")
+        return cls(areas, cell_degrees)
+
+
+def get_postal_code_index() -> Optional[PostalCodeIndex]:
+    """Load the boundary file once per worker; None if it isn't installed. Blocking."""
+    # One load per worker even when the preload and the first uploads race for it
+    with _index_lock:
+        return _load_postal_code_index()
+
+
+@lru_cache()
+def _load_postal_code_index() -> Optional[PostalCodeIndex]:
+    path = settings.plz_boundaries_path or DEFAULT_BOUNDARIES_PATH
+    if not os.path.exists(path):
+        logger.warning(f"No postal code boundaries at {path}; GPS postal code checks are disabled")
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        index = PostalCodeIndex.from_geojson(json.load(f), settings.plz_grid_cell_degrees)
+    logger.info(f"Loaded {len(index.areas)} postal code polygons from {path}")
+    return index
+
+
+def postal_code_from_photo(contents: bytes) -> Optional[str]:
+    """Postal code where the photo was taken, from EXIF GPS (None if unknown)"""
+    location = extract_gps(contents)
+    index = get_postal_code_index()
+    if location is None or index is None:
+        return None
+    return index.lookup(*location)
+
+
+async def locate_photo(contents: bytes) -> Optional[str]:
+    """postal_code_from_photo in a thread"""
+    return await asyncio.to_thread(postal_code_from_photo, contents)
+
+
+async def preload_postal_code_index() -> None:
+    """Build the index in a thread at startup, so no request waits for it on the event loop"""
+    try:
+        await asyncio.to_thread(get_postal_code_index)
+    except Exception as e:
+        logger.error(f"Loading postal code boundaries failed: {e}")
+
+
+def initial_confidence(postal_code: str, gps_postal_code: Optional[str]) -> float:
+    """Starting confidence score, adjusted by whether the photo's GPS agrees with the claimed postal code"""
+    score = settings.initial_confidence_score
+    if gps_postal_code is not None:
+        if gps_postal_code == postal_code:
+            score += settings.gps_match_confidence_bonus
+        else:
+            score -= settings.gps_mismatch_confidence_penalty
+    return min(1.0, max(0.0, score))
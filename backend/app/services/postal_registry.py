@@ -0,0 +1,141 @@
+"""
+German postal code (PLZ) registry and the enabled-regions check.
+
+The registry is a read-only binary file (app/data/postal_codes.bin, built by
+scripts/build_postal_registry.py) that is memory-mapped on first use:
+
+    header   b"PLZR", version, record count, string count      (16 bytes)
+    slots    100000 x uint16: record number + 1 for each code, 0 = no such PLZ
+    records  count x (city, district, state) string ids: uint16, uint16, uint16
+    strings  (string count + 1) x uint32 offsets, then the UTF-8 blob
+
+Validation and metadata lookups are a direct slot read, O(1), and the pages are
+shared between workers. Without the file, validation falls back to each
+enabled region's PLZ range (still stricter than the old "starts with 1").
+"""
+import logging
+import mmap
+import os
+import struct
+from functools import lru_cache
+from typing import NamedTuple, Optional
+
+from ..config import get_settings
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+MAGIC = b"PLZR"
+VERSION = 1
+HEADER = struct.Struct("<4sHxxII")
+SLOT = struct.Struct("<H")
+RECORD = struct.Struct("<HHH")
+OFFSET = struct.Struct("<I")
+SLOT_COUNT = 100_000
+DEFAULT_REGISTRY_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "postal_codes.bin")
+
+
+class PostalCodeInfo(NamedTuple):
+    postal_code: str
+    city: str
+    district: Optional[str]
+    state: str
+
+
+class Region(NamedTuple):
+    label: str
+    states: frozenset = frozenset()
+    cities: frozenset = frozenset()
+    fallback_ranges: tuple = ()  # Inclusive PLZ ranges used when the registry file is missing
+
+    def contains(self, info: PostalCodeInfo) -> bool:
+        if not self.states and not self.cities:
+            return True
+        return info.state in self.states or info.city in self.cities
+
+    def in_fallback_range(self, code: int) -> bool:
+        return any(low <= code <= high for low, high in self.fallback_ranges)
+
+
+REGIONS = {
+    "berlin": Region("Berlin", states=frozenset({"Berlin"}), fallback_ranges=((10115, 14199),)),
+    "hamburg": Region("Hamburg", states=frozenset({"Hamburg"}), fallback_ranges=((20095, 22769),)),
+    "munich": Region("Munich", cities=frozenset({"München"}), fallback_ranges=((80331, 81929),)),
+    "germany": Region("Germany", fallback_ranges=((1001, 99998),)),
+}
+
+
+class PostalRegistry:
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.count, string_count = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} postal code registry")
+        self._records_at = HEADER.size + SLOT_COUNT * SLOT.size
+        self._offsets_at = self._records_at + self.count * RECORD.size
+        self._blob_at = self._offsets_at + (string_count + 1) * OFFSET.size
+
+    def _string(self, string_id: int) -> str:
+        start, end = struct.unpack_from("<II", self._mm, self._offsets_at + string_id * OFFSET.size)
+        return self._mm[self._blob_at + start:self._blob_at + end].decode("utf-8")
+
+    def lookup(self, postal_code: str) -> Optional[PostalCodeInfo]:
+        if len(postal_code) != 5 or not postal_code.isdigit():
+            return None
+        (slot,) = SLOT.unpack_from(self._mm, HEADER.size + int(postal_code) * SLOT.size)
+        if slot == 0:
+            return None
+        city, district, state = RECORD.unpack_from(self._mm, self._records_at + (slot - 1) * RECORD.size)
+        return PostalCodeInfo(postal_code, self._string(city), self._string(district) or None, self._string(state))
+
+    def __len__(self) -> int:
+        return self.count
+
+
+@lru_cache()
+def get_registry() -> Optional[PostalRegistry]:
+    path = settings.postal_registry_path or DEFAULT_REGISTRY_PATH
+    if not os.path.exists(path):
+        logger.warning(f"No postal code registry at {path}; validating against region PLZ ranges only")
+        return None
+    registry = PostalRegistry(path)
+    logger.info(f"Mapped postal code registry with {len(registry)} codes from {path}")
+    return registry
+
+
+@lru_cache()
+def enabled_regions() -> tuple:
+    names = [name.strip().lower() for name in settings.enabled_regions.split(",") if name.strip()]
+    unknown = [name for name in names if name not in REGIONS]
+    if unknown:
+        raise ValueError(f"Unknown region(s) in ENABLED_REGIONS: {', '.join(unknown)}")
+    return tuple(REGIONS[name] for name in names)
+
+
+def lookup(postal_code: str) -> Optional[PostalCodeInfo]:
+    """Metadata for a postal code (None if unknown or no registry is installed)"""
+    registry = get_registry()
+    return registry.lookup(postal_code) if registry is not None else None
+
+
+def is_enabled(postal_code: str) -> bool:
+    """Does this postal code exist and lie in one of the enabled regions?"""
+    if len(postal_code) != 5 or not postal_code.isdigit():
+        return False
+    registry = get_registry()
+    if registry is None:
+        return any(region.in_fallback_range(int(postal_code)) for region in enabled_regions())
+    info = registry.lookup(postal_code)
+    return info is not None and any(region.contains(info) for region in enabled_regions())
+
+
+def validate_postal_code(value: str) -> str:
+    """Normalize and check a postal code; raises ValueError with a user-facing message"""
+    if not value:
+        raise ValueError("Postal code is required")
+    code = value.strip()
+    if not is_enabled(code):
+        regions = " or ".join(region.label for region in enabled_regions())
+        raise ValueError(f"Must be a valid postal code in {regions}")
+    return code
@@ -0,0 +1,214 @@
+"""
+On-demand CPU and memory profiling of single requests, for production.
+
+A request runs under the profiler when it carries X-Profile: <PROFILING_TOKEN>
+or is picked by PROFILING_SAMPLE_RATE. While it runs:
+- a sampling thread records every thread's Python stack each
+  profiling_interval_ms (the event loop thread shows the handler, the
+  worker threads show storage and DB calls made through to_thread),
+- tracemalloc traces allocations.
+Two files are written to PROFILING_DIR:
+    <id>.folded       collapsed stacks, one "frame;frame;frame count" per line,
+                      ready for flamegraph.pl, speedscope or inferno
+    <id>.alloc.txt    the top allocation sites, net of what existed before
+The directory is a ring buffer of profiling_max_files files; the oldest go
+first. One request is profiled at a time per worker; the response carries
+X-Profile-Id.
+
+With memory_sampler_interval_seconds > 0 tracemalloc stays on and a
+background loop writes the allocation sites that grew since the previous
+snapshot (<id>.growth.txt), to catch slow leaks.
+"""
+import asyncio
+import hmac
+import logging
+import os
+import random
+import sys
+import threading
+import time
+import tracemalloc
+import uuid
+from collections import Counter
+from typing import Optional
+
+from ..config import get_settings
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+PROFILE_HEADER = "X-Profile"
+PROFILE_ID_HEADER = "X-Profile-Id"
+TRACEMALLOC_FRAMES = 10
+
+stats = {"profiled": 0, "skipped_busy": 0, "rejected_token": 0, "memory_snapshots": 0}
+
+_active = threading.Lock()  # One profiled request per worker keeps the samples readable
+
+
+class StackSampler:
+    """Samples the Python stacks of all other threads into collapsed-stack counts"""
+
+    def __init__(self, interval_seconds: float):
+        self.interval = interval_seconds
+        self.counts: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                stack.append(names.get(ident, str(ident)))
+                self.counts[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def folded(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.counts.most_common())
+
+
+def format_statistics(title: str, statistics: list, limit: int) -> str:
+    lines = [title, ""]
+    for stat in statistics[:limit]:
+        frames = list(stat.traceback)[::-1]  # Allocation site first, then its callers
+        site = frames[0]
+        lines.append(f"{stat.size_diff / 1024:+10.1f} KiB {stat.count_diff:+8d} blocks  {site.filename}:{site.lineno}")
+        for caller in frames[1:4]:
+            lines.append(f"{'':34}from {caller.filename}:{caller.lineno}")
+    return "\n".join(lines) + "\n"
+
+
+def write_files(files: dict[str, str]) -> None:
+    """Write profile files and trim the directory to the newest profiling_max_files"""
+    os.makedirs(settings.profiling_dir, exist_ok=True)
+    for name, content in files.items():
+        with open(os.path.join(settings.profiling_dir, name), "w", encoding="utf-8") as f:
+            f.write(content)
+    entries = sorted(
+        (entry for entry in os.scandir(settings.profiling_dir) if entry.is_file()),
+        key=lambda entry: entry.stat().st_mtime,
+    )
+    for entry in entries[:max(0, len(entries) - settings.profiling_max_files)]:
+        try:
+            os.remove(entry.path)
+        except OSError:
+            pass
+
+
+def profile_id(label: str) -> str:
+    slug = "".join(c if c.isalnum() else "-" for c in label.strip("/"))[:60]
+    return f"{time.strftime('%Y%m%dT%H%M%S')}-{slug}-{uuid.uuid4().hex[:6]}"
+
+
+def wants_profile(header: Optional[str]) -> bool:
+    """Admin header with the right token, or a random pick at PROFILING_SAMPLE_RATE"""
+    if header is not None:
+        if settings.profiling_token and hmac.compare_digest(header, settings.profiling_token):
+            return True
+        stats["rejected_token"] += 1
+        return False
+    return settings.profiling_sample_rate > 0 and random.random() < settings.profiling_sample_rate
+
+
+class RequestProfile:
+    def __init__(self, label: str):
+        self.id = profile_id(label)
+        self.label = label
+        self.sampler = StackSampler(settings.profiling_interval_ms / 1000)
+        self._started_tracing = False
+        self._baseline = None
+        self._started = 0.0
+
+    def start(self) -> None:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+            self._started_tracing = True
+        self._baseline = tracemalloc.take_snapshot()
+        self._started = time.perf_counter()
+        self.sampler.start()
+
+    def stop(self) -> dict[str, str]:
+        """Stop sampling and tracing; returns the files to write"""
+        self.sampler.stop()
+        elapsed = time.perf_counter() - self._started
+        snapshot = tracemalloc.take_snapshot()
+        if self._started_tracing:
+            tracemalloc.stop()
+        allocations = snapshot.compare_to(self._baseline, "traceback")
+        title = f"{self.label}: {elapsed * 1000:.1f} ms, {self.sampler.samples} CPU samples"
+        return {
+            f"{self.id}.folded": self.sampler.folded(),
+            f"{self.id}.alloc.txt": format_statistics(title, allocations, settings.profiling_top_allocations),
+        }
+
+
+def try_begin(label: str) -> Optional[RequestProfile]:
+    """Start profiling this request, or None if another one is being profiled"""
+    if not _active.acquire(blocking=False):
+        stats["skipped_busy"] += 1
+        return None
+    profile = RequestProfile(label)
+    try:
+        profile.start()
+    except BaseException:
+        _active.release()
+        raise
+    return profile
+
+
+async def finish(profile: RequestProfile) -> None:
+    try:
+        files = profile.stop()
+    finally:
+        _active.release()
+    await asyncio.to_thread(write_files, files)
+    stats["profiled"] += 1
+    logger.info(f"Saved profile {profile.id} to {settings.profiling_dir}")
+
+
+def take_memory_snapshot(previous):
+    """Write allocation growth since `previous`; returns the new snapshot"""
+    snapshot = tracemalloc.take_snapshot()
+    if previous is not None:
+        growth = [stat for stat in snapshot.compare_to(previous, "traceback") if stat.size_diff > 0]
+        write_files({
+            f"{profile_id('memory')}.growth.txt": format_statistics(
+                f"Allocation growth over {settings.memory_sampler_interval_seconds:.0f}s, "
+                f"traced now {tracemalloc.get_traced_memory()[0] / 1024 / 1024:.1f} MiB",
+                growth,
+                settings.profiling_top_allocations,
+            ),
+        })
+        stats["memory_snapshots"] += 1
+    return snapshot
+
+
+async def run_memory_sampler(interval_seconds: float) -> None:
+    """Background loop started from the app lifespan when memory_sampler_interval_seconds > 0"""
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(TRACEMALLOC_FRAMES)
+    previous = None
+    while True:
+        try:
+            previous = await asyncio.to_thread(take_memory_snapshot, previous)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Memory snapshot failed: {e}")
+        await asyncio.sleep(interval_seconds)
@@ -0,0 +1,207 @@
+"""
+Admission control for the Claude-backed endpoints.
+
+- Token buckets keyed on client IP and email, with a budget per route
+  (state in memory, or in Redis when RATE_LIMIT_REDIS_URL is set so all
+  workers share it).
+- A cap on concurrent Claude calls per worker: requests wait briefly for a
+  slot, then get a fast 503 instead of piling up behind the API.
+"""
+import asyncio
+import logging
+import math
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Optional
+
+from fastapi import HTTPException, Request
+
+from ..config import get_settings
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+
+
+def parse_budget(budget: str) -> tuple[float, float]:
+    """Parse "10/minute" into (capacity, refill tokens per second)"""
+    count, _, period = budget.partition("/")
+    capacity = float(count)
+    seconds = PERIODS.get(period.strip() or "minute")
+    if seconds is None:
+        raise ValueError(f"Unknown rate limit period: {budget}")
+    return capacity, capacity / seconds
+
+
+def client_ip(request: Request) -> Optional[str]:
+    """
+    Client address, honoring X-Forwarded-For when running behind a proxy (Render).
+    Each proxy appends the address it saw, so only the last trusted_proxy_hops
+    entries are trustworthy; anything left of them is whatever the client sent.
+    """
+    if settings.trust_proxy_headers and settings.trusted_proxy_hops > 0:
+        forwarded = [entry.strip() for entry in request.headers.get("x-forwarded-for", "").split(",") if entry.strip()]
+        if len(forwarded) >= settings.trusted_proxy_hops:
+            return forwarded[-settings.trusted_proxy_hops]
+    return request.client.host if request.client else None
+
+
+class MemoryBucketStore:
+    """Per-worker token buckets, LRU-bounded so unique clients can't grow memory forever"""
+
+    def __init__(self, max_keys: int = 100_000):
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, tuple[float, float]]" = OrderedDict()
+
+    async def take(self, keys: list[str], capacity: float, refill_rate: float, cost: float = 1.0) -> tuple[bool, float]:
+        """Take `cost` from every bucket, or from none if any of them is short"""
+        # No awaits below, so this is atomic within the event loop
+        now = time.monotonic()
+        levels = {}
+        for key in keys:
+            tokens, updated = self._buckets.pop(key, (capacity, now))
+            levels[key] = min(capacity, tokens + (now - updated) * refill_rate)
+        lowest = min(levels.values(), default=capacity)
+        allowed = lowest >= cost
+        for key, tokens in levels.items():
+            self._buckets[key] = (tokens - cost if allowed else tokens, now)
+        while len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+        return allowed, 0.0 if allowed else (cost - lowest) / refill_rate
+
+
+class RedisBucketStore:
+    """Token buckets shared by all workers, updated atomically by a Lua script"""
+
+    SCRIPT = """
+    local capacity = tonumber(ARGV[1])
+    local rate = tonumber(ARGV[2])
+    local cost = tonumber(ARGV[3])
+    local t = redis.call('TIME')
+    local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+    local levels = {}
+    local lowest = capacity
+    for i, key in ipairs(KEYS) do
+        local state = redis.call('HMGET', key, 'tokens', 'ts')
+        local tokens = tonumber(state[1]) or capacity
+        local ts = tonumber(state[2]) or now
+        tokens = math.min(capacity, tokens + (now - ts) * rate)
+        levels[i] = tokens
+        lowest = math.min(lowest, tokens)
+    end
+    local allowed = 0
+    local retry = 0
+    if lowest >= cost then
+        allowed = 1
+    else
+        retry = (cost - lowest) / rate
+    end
+    for i, key in ipairs(KEYS) do
+        local tokens = levels[i]
+        if allowed == 1 then
+            tokens = tokens - cost
+        end
+        redis.call('HSET', key, 'tokens', tokens, 'ts', now)
+        redis.call('PEXPIRE', key, math.ceil(capacity / rate * 1000) + 1000)
+    end
+    return {allowed, tostring(retry)}
+    """
+
+    def __init__(self, url: str, key_prefix: str = "ratelimit:"):
+        # redis is only needed when a shared backend is configured
+        import redis.asyncio as redis
+
+        self.client = redis.from_url(url)
+        self.key_prefix = key_prefix
+        self._script = self.client.register_script(self.SCRIPT)
+
+    async def take(self, keys: list[str], capacity: float, refill_rate: float, cost: float = 1.0) -> tuple[bool, float]:
+        """Take `cost` from every bucket, or from none if any of them is short"""
+        allowed, retry = await self._script(keys=[self.key_prefix + key for key in keys], args=[capacity, refill_rate, cost])
+        return bool(allowed), float(retry)
+
+
+class RateLimiter:
+    def __init__(self, store, budgets: dict[str, str], enabled: bool = True):
+        self.store = store
+        self.enabled = enabled
+        self.budgets = {route: parse_budget(budget) for route, budget in budgets.items()}
+        self.rejections: dict[str, int] = {route: 0 for route in budgets}
+
+    async def enforce(self, route: str, request: Request, email: Optional[str] = None) -> None:
+        """Consume one token for each client identity; raise 429 (spending nothing) if any bucket is empty"""
+        if not self.enabled or route not in self.budgets:
+            return
+        capacity, refill_rate = self.budgets[route]
+        identities = [("ip", client_ip(request)), ("email", email.strip().lower() if email else None)]
+        keys = [f"{route}:{kind}:{value}" for kind, value in identities if value]
+        if not keys:
+            return
+        try:
+            # Checked together, so a request rejected on the email bucket doesn't drain the IP bucket
+            allowed, retry_after = await self.store.take(keys, capacity, refill_rate)
+        except Exception as e:
+            # Never take the API down because the shared limiter backend is unreachable
+            logger.warning(f"Rate limiter backend error, allowing request: {e}")
+            return
+        if not allowed:
+            self.rejections[route] += 1
+            raise HTTPException(
+                status_code=429,
+                detail="Too many requests. Please slow down and try again shortly.",
+                headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+            )
+
+
+class ClaudeAdmission:
+    """Caps in-flight Claude calls per worker; excess requests fail fast with 503"""
+
+    def __init__(self, max_in_flight: int, wait_seconds: float, retry_after: int = 5):
+        self.max_in_flight = max_in_flight
+        self.wait_seconds = wait_seconds
+        self.retry_after = retry_after
+        self.in_flight = 0
+        self.rejected = 0
+        self._semaphore = asyncio.Semaphore(max_in_flight)
+
+    @asynccontextmanager
+    async def slot(self):
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout=self.wait_seconds)
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=503,
+                detail="Our image analysis is busy right now. Please try again in a few seconds.",
+                headers={"Retry-After": str(self.retry_after)},
+            )
+        self.in_flight += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            self._semaphore.release()
+
+
+def create_rate_limiter() -> RateLimiter:
+    if settings.rate_limit_redis_url:
+        store = RedisBucketStore(settings.rate_limit_redis_url)
+    else:
+        store = MemoryBucketStore()
+    return RateLimiter(
+        store,
+        budgets={
+            "analyze": settings.rate_limit_analyze,
+            "upload": settings.rate_limit_upload,
+            "contact": settings.rate_limit_contact,
+            "alert": settings.rate_limit_alert,
+        },
+        enabled=settings.rate_limit_enabled,
+    )
+
+
+# Singleton instances
+rate_limiter = create_rate_limiter()
+claude_admission = ClaudeAdmission(settings.claude_max_in_flight, settings.claude_admission_wait_seconds)
@@ -0,0 +1,178 @@
+"""
+Resilience primitives for calls to external APIs (Claude).
+
+- CircuitBreaker: opens after N consecutive failures, lets a single probe
+  through after a cool-down (half-open), closes again on success.
+- RetryBudget: caps retries to a fraction of first attempts so an outage
+  doesn't multiply our own traffic.
+- call_with_retries: jittered exponential backoff inside a per-request deadline.
+"""
+import asyncio
+import logging
+import random
+import time
+from typing import Awaitable, Callable, Optional, Tuple, Type, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class ServiceUnavailableError(Exception):
+    """The upstream service can't be used right now (breaker open, retries or deadline exhausted)"""
+
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.trips = 0
+        self.total_failures = 0
+        self.total_successes = 0
+        self.opened_at: Optional[float] = None
+        self.last_failure: Optional[str] = None
+        self._probe_in_flight = False
+
+    def retry_after(self) -> float:
+        if self.state != self.OPEN or self.opened_at is None:
+            return 0.0
+        return max(0.0, self.opened_at + self.reset_timeout - time.monotonic())
+
+    def is_available(self) -> bool:
+        """Would a call be let through right now? (Doesn't claim the half-open probe)"""
+        if self.state == self.CLOSED:
+            return True
+        return self.retry_after() <= 0 and not self._probe_in_flight
+
+    def allow_request(self) -> bool:
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.OPEN and self.retry_after() > 0:
+            return False
+        # Cool-down elapsed: let exactly one probe through
+        if self._probe_in_flight:
+            return False
+        self.state = self.HALF_OPEN
+        self._probe_in_flight = True
+        return True
+
+    def release_probe(self) -> None:
+        """The half-open probe ended without telling us anything about the service"""
+        self._probe_in_flight = False
+
+    def record_success(self) -> None:
+        if self.state != self.CLOSED:
+            logger.info(f"Circuit breaker '{self.name}' closed")
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.total_successes += 1
+        self._probe_in_flight = False
+
+    def record_failure(self, error: Exception) -> None:
+        self.consecutive_failures += 1
+        self.total_failures += 1
+        self.last_failure = f"{type(error).__name__}: {error}"
+        self._probe_in_flight = False
+        if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                self.trips += 1
+                logger.warning(
+                    f"Circuit breaker '{self.name}' opened after {self.consecutive_failures} "
+                    f"consecutive failures: {self.last_failure}"
+                )
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+
+    def stats(self) -> dict:
+        return {
+            "name": self.name,
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "trips": self.trips,
+            "total_failures": self.total_failures,
+            "total_successes": self.total_successes,
+            "retry_after_seconds": round(self.retry_after(), 1),
+            "last_failure": self.last_failure,
+        }
+
+
+class RetryBudget:
+    """Each first attempt earns `ratio` retry tokens; each retry spends one"""
+
+    def __init__(self, ratio: float = 0.2, min_tokens: float = 3.0, max_tokens: float = 50.0):
+        self.ratio = ratio
+        self.max_tokens = max_tokens
+        self.tokens = min_tokens
+        self.retries = 0
+        self.denied = 0
+
+    def record_attempt(self) -> None:
+        self.tokens = min(self.max_tokens, self.tokens + self.ratio)
+
+    def try_spend(self) -> bool:
+        if self.tokens >= 1.0:
+            self.tokens -= 1.0
+            self.retries += 1
+            return True
+        self.denied += 1
+        return False
+
+    def stats(self) -> dict:
+        return {"tokens": round(self.tokens, 2), "retries": self.retries, "denied": self.denied}
+
+
+async def call_with_retries(
+    fn: Callable[[], Awaitable[T]],
+    breaker: CircuitBreaker,
+    budget: RetryBudget,
+    retryable: Tuple[Type[BaseException], ...],
+    deadline_seconds: float,
+    max_attempts: int = 3,
+    base_delay: float = 0.5,
+    max_delay: float = 8.0,
+) -> T:
+    """
+    Run fn through the breaker, retrying retryable errors with full-jitter backoff
+    until max_attempts, the retry budget or the deadline runs out.
+    Non-retryable errors propagate unchanged and don't count against the breaker.
+    """
+    deadline = time.monotonic() + deadline_seconds
+    budget.record_attempt()
+    attempt = 0
+    while True:
+        if not breaker.allow_request():
+            raise ServiceUnavailableError(
+                f"{breaker.name} is temporarily unavailable", retry_after=breaker.retry_after()
+            )
+        attempt += 1
+        remaining = deadline - time.monotonic()
+        try:
+            result = await asyncio.wait_for(fn(), timeout=max(remaining, 0.001))
+        except (asyncio.TimeoutError, *retryable) as e:
+            breaker.record_failure(e)
+            delay = random.uniform(0, min(max_delay, base_delay * 2 ** (attempt - 1)))
+            out_of_time = time.monotonic() + delay >= deadline
+            if attempt >= max_attempts or out_of_time or not budget.try_spend():
+                raise ServiceUnavailableError(
+                    f"{breaker.name} failed after {attempt} attempt(s): {e}",
+                    retry_after=breaker.retry_after() or None,
+                ) from e
+            await asyncio.sleep(delay)
+        except BaseException:
+            # Caller error (bad request, cancellation): the service itself is healthy
+            breaker.release_probe()
+            raise
+        else:
+            breaker.record_success()
+            return result
@@ -0,0 +1,301 @@
+"""
+In-process columnar index of active listings for /api/gloves/search.
+
+Enabled with SEARCH_INDEX_ENABLED. Every worker keeps its active listings
+(all shards) as NumPy columns, one row per listing:
+    ids, shard          int64, int8 (shard name dictionary)
+    postal code         int32 (dictionary of codes)
+    size, side          int8 enum codes
+    found_date          int64 microseconds since the epoch
+    color, brand        int32 (dictionaries of lower-cased values, brand -1 = none)
+    confidence          float32
+Filters are vectorized masks (text filters are matched once against the
+small dictionaries, with the ILIKE semantics of the SQL search), the total
+is the mask's sum, and the page is a partial sort on found_date. The route then loads the page rows from the database by
+primary key, so the database stays the source of truth for what is shown.
+
+Keeping up to date:
+- a full load at startup and every search_index_rebuild_seconds,
+- a change feed: every search_index_refresh_seconds each shard is asked for
+  rows with updated_at at or after the newest one seen (minus
+  search_index_feed_overlap_seconds, for transactions that commit late).
+  Uploads, status changes and rescores all bump updated_at, and applying a
+  row twice is harmless,
+- writes on this worker (upload, report, moderation) go through apply() right away.
+"""
+import asyncio
+import logging
+import re
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Optional
+
+from sqlalchemy import func, select
+
+from ..config import get_settings
+from ..models import GloveListing, GloveSide, GloveSize, ListingStatus
+from ..sharding import get_shard_router
+from . import facets
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+EPOCH = datetime(1970, 1, 1)
+# Keyed by value: ORM objects may hold the enum or the plain string
+SIZE_CODES = {size.value: code for code, size in enumerate(GloveSize)}
+SIDE_CODES = {side.value: code for code, side in enumerate(GloveSide)}
+INITIAL_CAPACITY = 1024
+
+INDEX_COLUMNS = (
+    GloveListing.id,
+    GloveListing.status,
+    GloveListing.postal_code,
+    GloveListing.size,
+    GloveListing.side,
+    GloveListing.found_date,
+    GloveListing.color,
+    GloveListing.brand,
+    GloveListing.confidence_score,
+    GloveListing.updated_at,
+)
+
+stats = {"searches": 0, "fallbacks": 0, "changes_applied": 0, "rebuilds": 0, "last_rebuild_seconds": None}
+
+
+def to_micros(value: datetime) -> int:
+    """Naive UTC (or aware) datetime -> int64 microseconds since the epoch"""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return (value - EPOCH) // timedelta(microseconds=1)
+
+
+def enum_code(codes: dict, value) -> int:
+    return codes.get(getattr(value, "value", value), codes["unknown"])
+
+
+def contains_like(needle: str) -> Callable[[str], bool]:
+    """Predicate matching like `column ILIKE '%needle%'`: % and _ in the needle are wildcards"""
+    pattern = "".join(".*" if char == "%" else "." if char == "_" else re.escape(char) for char in needle)
+    regex = re.compile(pattern, re.IGNORECASE | re.DOTALL)
+    return lambda value: regex.search(value) is not None
+
+
+class Dictionary:
+    """Dictionary encoding of a string column: value <-> dense int code"""
+
+    def __init__(self):
+        self.codes: dict[str, int] = {}
+        self.values: list[str] = []
+
+    def encode(self, value: str) -> int:
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+    def matching(self, predicate: Callable[[str], bool]) -> list[int]:
+        return [code for code, value in enumerate(self.values) if predicate(value)]
+
+
+class ListingSearchIndex:
+    def __init__(self, capacity: int = INITIAL_CAPACITY):
+        import numpy as np
+
+        self.ids = np.zeros(capacity, np.int64)
+        self.shards = np.zeros(capacity, np.int8)
+        self.postal_codes = np.zeros(capacity, np.int32)
+        self.sizes = np.zeros(capacity, np.int8)
+        self.sides = np.zeros(capacity, np.int8)
+        self.found_dates = np.zeros(capacity, np.int64)
+        self.colors = np.zeros(capacity, np.int32)
+        self.brands = np.full(capacity, -1, np.int32)
+        self.confidence = np.zeros(capacity, np.float32)
+        self.alive = np.zeros(capacity, bool)
+        self.rows = 0  # Slots in use, alive or freed
+        self.slots: dict[int, int] = {}  # Listing id -> slot
+        self.free: list[int] = []
+        self.shard_names = Dictionary()
+        self.postal_code_names = Dictionary()
+        self.color_names = Dictionary()
+        self.brand_names = Dictionary()
+        self.versions: dict[str, Optional[datetime]] = {}  # Newest updated_at seen per shard
+
+    def __len__(self) -> int:
+        return len(self.slots)
+
+    def _grow(self) -> None:
+        import numpy as np
+
+        for name in ("ids", "shards", "postal_codes", "sizes", "sides", "found_dates", "colors", "brands", "confidence", "alive"):
+            column = getattr(self, name)
+            grown = np.full(len(column) * 2, -1 if name == "brands" else 0, column.dtype)
+            grown[:len(column)] = column
+            setattr(self, name, grown)
+
+    def apply(self, shard: str, listing) -> None:
+        """Insert, update or drop one listing (an ORM object or a row with the INDEX_COLUMNS fields)"""
+        slot = self.slots.get(listing.id)
+        if listing.status != ListingStatus.ACTIVE:
+            if slot is not None:
+                self.alive[slot] = False
+                del self.slots[listing.id]
+                self.free.append(slot)
+            return
+        if slot is None:
+            if self.free:
+                slot = self.free.pop()
+            else:
+                if self.rows == len(self.ids):
+                    self._grow()
+                slot = self.rows
+                self.rows += 1
+            self.slots[listing.id] = slot
+        self.ids[slot] = listing.id
+        self.shards[slot] = self.shard_names.encode(shard)
+        self.postal_codes[slot] = self.postal_code_names.encode(listing.postal_code)
+        self.sizes[slot] = enum_code(SIZE_CODES, listing.size)
+        self.sides[slot] = enum_code(SIDE_CODES, listing.side)
+        self.found_dates[slot] = to_micros(listing.found_date)
+        self.colors[slot] = self.color_names.encode((listing.color or "").lower())
+        # As stored, spaces included, like the SQL filter sees it; only NULL never matches
+        self.brands[slot] = self.brand_names.encode(listing.brand.lower()) if listing.brand is not None else -1
+        self.confidence[slot] = listing.confidence_score if listing.confidence_score is not None else 0.0
+        self.alive[slot] = True
+
+    def search(
+        self,
+        postal_codes: Optional[list] = None,
+        brand: Optional[str] = None,
+        color: Optional[str] = None,
+        size: Optional[str] = None,
+        side: Optional[str] = None,
+        date_from: Optional[datetime] = None,
+        date_to: Optional[datetime] = None,
+        color_family: Optional[str] = None,
+        offset: int = 0,
+        limit: int = 20,
+    ) -> tuple[int, list[tuple[str, int]]]:
+        """Same filters and order as the SQL search: (total, [(shard, listing id), ...] for the page)"""
+        import numpy as np
+
+        n = self.rows
+        mask = self.alive[:n] & (self.confidence[:n] >= np.float32(settings.confidence_removal_threshold))
+        if postal_codes:
+            codes = [self.postal_code_names.codes[code] for code in postal_codes if code in self.postal_code_names.codes]
+            mask &= np.isin(self.postal_codes[:n], codes)
+        if brand:
+            mask &= np.isin(self.brands[:n], self.brand_names.matching(contains_like(brand)))
+        if color:
+            mask &= np.isin(self.colors[:n], self.color_names.matching(contains_like(color)))
+        if color_family:
+            mask &= np.isin(self.colors[:n], self.color_names.matching(lambda value: facets.color_family(value) == color_family))
+        if size and size != "unknown":
+            mask &= self.sizes[:n] == SIZE_CODES.get(size, -1)
+        if side and side != "unknown":
+            mask &= self.sides[:n] == SIDE_CODES.get(side, -1)
+        if date_from is not None:
+            mask &= self.found_dates[:n] >= to_micros(date_from)
+        if date_to is not None:
+            mask &= self.found_dates[:n] <= to_micros(date_to)
+
+        matches = np.flatnonzero(mask)
+        total = len(matches)
+        wanted = min(offset + limit, total)
+        if wanted == 0:
+            return total, []
+        if wanted < total:
+            # Only the first offset + limit rows by found_date (and their ties) need sorting
+            dates = self.found_dates[matches]
+            cutoff = np.partition(dates, total - wanted)[total - wanted]
+            matches = matches[dates >= cutoff]
+        order = np.lexsort((-self.ids[matches], -self.found_dates[matches]))
+        page = matches[order][offset:offset + limit]
+        return total, [(self.shard_names.values[self.shards[slot]], int(self.ids[slot])) for slot in page]
+
+    def feed_versions(self, shards: list) -> tuple:
+        """The feed versions of these shards, part of the search ETag when results come from here"""
+        return tuple(self.versions.get(shard) for shard in shards)
+
+
+def shard_version(shard: str) -> Optional[datetime]:
+    with get_shard_router().engine(shard).connect() as conn:
+        return conn.execute(select(func.max(GloveListing.updated_at))).scalar()
+
+
+def load_index() -> ListingSearchIndex:
+    """Build a new index from every shard. Blocking; call from a thread."""
+    started = time.monotonic()
+    index = ListingSearchIndex()
+    for shard in get_shard_router().names:
+        # Taken before the load: later changes are picked up by the feed
+        index.versions[shard] = shard_version(shard)
+        with get_shard_router().engine(shard).connect() as conn:
+            rows = conn.execution_options(stream_results=True, yield_per=settings.search_index_batch_size).execute(
+                select(*INDEX_COLUMNS).where(GloveListing.status == ListingStatus.ACTIVE)
+            )
+            for row in rows:
+                index.apply(shard, row)
+    stats["rebuilds"] += 1
+    stats["last_rebuild_seconds"] = round(time.monotonic() - started, 3)
+    return index
+
+
+def read_changes(shard: str, since: Optional[datetime]) -> list:
+    """Rows changed on a shard since `since` (minus the overlap). Blocking; call from a thread."""
+    query = select(*INDEX_COLUMNS)
+    if since is not None:
+        query = query.where(GloveListing.updated_at >= since - timedelta(seconds=settings.search_index_feed_overlap_seconds))
+    with get_shard_router().engine(shard).connect() as conn:
+        return conn.execute(query).all()
+
+
+async def refresh(index: ListingSearchIndex) -> int:
+    """Apply the change feed of every shard; returns the number of rows applied"""
+    applied = 0
+    for shard in get_shard_router().names:
+        since = index.versions.get(shard)
+        rows = await asyncio.to_thread(read_changes, shard, since)
+        # Applied on the event loop, where searches run, so no search sees a half-applied batch
+        for row in rows:
+            index.apply(shard, row)
+            if row.updated_at is not None and (index.versions.get(shard) is None or row.updated_at > index.versions[shard]):
+                index.versions[shard] = row.updated_at
+        applied += len(rows)
+    stats["changes_applied"] += applied
+    return applied
+
+
+# Set once the first load finishes and replaced on every rebuild; look it up as search_index.listing_index
+listing_index: Optional[ListingSearchIndex] = None
+
+
+def apply_safely(shard: str, listing) -> None:
+    """Write-through for changes made on this worker"""
+    if listing_index is None:
+        return
+    try:
+        listing_index.apply(shard, listing)
+    except Exception as e:
+        logger.warning(f"Search index update failed for listing {listing.id}: {e}")
+
+
+async def run_search_index_worker(interval_seconds: float) -> None:
+    """Background loop started from the app lifespan when SEARCH_INDEX_ENABLED is set"""
+    global listing_index
+    rebuilt_at: Optional[float] = None
+    while True:
+        try:
+            if rebuilt_at is None or time.monotonic() - rebuilt_at >= settings.search_index_rebuild_seconds:
+                index = await asyncio.to_thread(load_index)
+                await refresh(index)  # Whatever changed during the load
+                listing_index = index
+                rebuilt_at = time.monotonic()
+                logger.info(f"Search index loaded {len(index)} active listings in {stats['last_rebuild_seconds']}s")
+            else:
+                await refresh(listing_index)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Search index refresh failed: {e}")
+        await asyncio.sleep(interval_seconds)
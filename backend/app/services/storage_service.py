@@ -0,0 +1,239 @@
+"""
+Photo storage backends.
+Local disk (sharded directories) for development and Render, or any S3-compatible
+object store (AWS S3, MinIO, R2) in production.
+"""
+import asyncio
+import hashlib
+import io
+import logging
+import os
+from typing import Iterator, NamedTuple, Optional
+
+from ..config import get_settings
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+
+class StoredObject(NamedTuple):
+    key: str
+    size: int
+    modified: float  # Epoch seconds
+
+
+class StorageBackend:
+    """Interface every photo storage driver implements. Keys are relative paths."""
+
+    def make_key(self, filename: str) -> str:
+        return filename
+
+    async def save(self, key: str, contents: bytes, content_type: Optional[str] = None) -> None:
+        raise NotImplementedError
+
+    async def load(self, key: str) -> bytes:
+        raise NotImplementedError
+
+    async def delete(self, key: str) -> None:
+        raise NotImplementedError
+
+    def url(self, key: str) -> str:
+        raise NotImplementedError
+
+    def iter_objects(self) -> Iterator[StoredObject]:
+        """Every stored object in ascending key order (code point order), streamed. Blocking."""
+        raise NotImplementedError
+
+    def delete_blocking(self, key: str) -> None:
+        raise NotImplementedError
+
+
+class LocalStorage(StorageBackend):
+    """
+    Stores photos under upload_dir in hash-sharded subdirectories
+    (e.g. uploads/3f/a9/<uuid>.jpg) so no single directory grows unbounded.
+    Disk I/O runs in a worker thread to keep the event loop free.
+    """
+
+    def __init__(self, root: str, shard_depth: int = 2, url_prefix: str = "/uploads"):
+        self.root = root
+        self.shard_depth = shard_depth
+        self.url_prefix = url_prefix.rstrip("/")
+
+    def make_key(self, filename: str) -> str:
+        digest = hashlib.sha1(filename.encode("utf-8")).hexdigest()
+        shards = [digest[i * 2:i * 2 + 2] for i in range(self.shard_depth)]
+        return "/".join(shards + [filename])
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.root, *key.split("/"))
+
+    def _write(self, key: str, contents: bytes) -> None:
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(contents)
+        os.replace(tmp_path, path)
+
+    def _read(self, key: str) -> bytes:
+        with open(self.path(key), "rb") as f:
+            return f.read()
+
+    def _remove(self, key: str) -> None:
+        try:
+            os.remove(self.path(key))
+        except FileNotFoundError:
+            pass
+
+    async def save(self, key: str, contents: bytes, content_type: Optional[str] = None) -> None:
+        await asyncio.to_thread(self._write, key, contents)
+
+    async def load(self, key: str) -> bytes:
+        return await asyncio.to_thread(self._read, key)
+
+    async def delete(self, key: str) -> None:
+        await asyncio.to_thread(self._remove, key)
+
+    def url(self, key: str) -> str:
+        return f"{self.url_prefix}/{key}"
+
+    def iter_objects(self) -> Iterator[StoredObject]:
+        yield from self._walk(self.root, "")
+
+    def _walk(self, directory: str, prefix: str) -> Iterator[StoredObject]:
+        try:
+            with os.scandir(directory) as it:
+                entries = list(it)
+        except FileNotFoundError:
+            return
+        # Sorting "ab/" (directories) against "ab-x" (files) keeps the output in full-key order
+        entries.sort(key=lambda entry: entry.name + "/" if entry.is_dir(follow_symlinks=False) else entry.name)
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                yield from self._walk(entry.path, f"{prefix}{entry.name}/")
+            elif entry.is_file(follow_symlinks=False):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                yield StoredObject(f"{prefix}{entry.name}", stat.st_size, stat.st_mtime)
+
+    def delete_blocking(self, key: str) -> None:
+        self._remove(key)
+
+
+class S3Storage(StorageBackend):
+    """
+    Stores photos in an S3-compatible bucket. Uses a single pooled boto3 client;
+    large uploads go through multipart transfer automatically.
+    Point s3_endpoint_url at MinIO (http://localhost:9000) for local testing.
+    """
+
+    def __init__(
+        self,
+        bucket: str,
+        endpoint_url: Optional[str] = None,
+        region: Optional[str] = None,
+        access_key_id: Optional[str] = None,
+        secret_access_key: Optional[str] = None,
+        public_url: Optional[str] = None,
+        key_prefix: str = "",
+        max_pool_connections: int = 20,
+        multipart_threshold: int = 8 * 1024 * 1024,
+        multipart_chunksize: int = 8 * 1024 * 1024,
+    ):
+        # boto3 is only needed when this driver is configured
+        import boto3
+        from boto3.s3.transfer import TransferConfig
+        from botocore.config import Config
+
+        self.bucket = bucket
+        self.endpoint_url = endpoint_url
+        self.key_prefix = key_prefix.strip("/")
+        self.public_url = public_url.rstrip("/") if public_url else None
+        self.client = boto3.client(
+            "s3",
+            endpoint_url=endpoint_url or None,
+            region_name=region or None,
+            aws_access_key_id=access_key_id or None,
+            aws_secret_access_key=secret_access_key or None,
+            config=Config(
+                max_pool_connections=max_pool_connections,
+                retries={"max_attempts": 3, "mode": "standard"},
+                s3={"addressing_style": "path"} if endpoint_url else None,
+            ),
+        )
+        self.transfer_config = TransferConfig(
+            multipart_threshold=multipart_threshold,
+            multipart_chunksize=multipart_chunksize,
+            max_concurrency=4,
+        )
+
+    def make_key(self, filename: str) -> str:
+        # Spread keys over prefixes so the bucket partitions evenly
+        digest = hashlib.sha1(filename.encode("utf-8")).hexdigest()
+        parts = [p for p in (self.key_prefix, digest[:2], filename) if p]
+        return "/".join(parts)
+
+    def _upload(self, key: str, contents: bytes, content_type: Optional[str]) -> None:
+        extra_args = {"ContentType": content_type} if content_type else None
+        self.client.upload_fileobj(
+            io.BytesIO(contents),
+            self.bucket,
+            key,
+            ExtraArgs=extra_args,
+            Config=self.transfer_config,
+        )
+
+    async def save(self, key: str, contents: bytes, content_type: Optional[str] = None) -> None:
+        await asyncio.to_thread(self._upload, key, contents, content_type)
+
+    def _download(self, key: str) -> bytes:
+        buffer = io.BytesIO()
+        self.client.download_fileobj(self.bucket, key, buffer, Config=self.transfer_config)
+        return buffer.getvalue()
+
+    async def load(self, key: str) -> bytes:
+        return await asyncio.to_thread(self._download, key)
+
+    async def delete(self, key: str) -> None:
+        await asyncio.to_thread(self.client.delete_object, Bucket=self.bucket, Key=key)
+
+    def iter_objects(self) -> Iterator[StoredObject]:
+        # S3 lists keys in UTF-8 byte order, which matches code point order
+        paginator = self.client.get_paginator("list_objects_v2")
+        prefix = f"{self.key_prefix}/" if self.key_prefix else ""
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=prefix):
+            for item in page.get("Contents", []):
+                yield StoredObject(item["Key"], item["Size"], item["LastModified"].timestamp())
+
+    def delete_blocking(self, key: str) -> None:
+        self.client.delete_object(Bucket=self.bucket, Key=key)
+
+    def url(self, key: str) -> str:
+        if self.public_url:
+            return f"{self.public_url}/{key}"
+        if self.endpoint_url:
+            return f"{self.endpoint_url.rstrip('/')}/{self.bucket}/{key}"
+        return f"https://{self.bucket}.s3.amazonaws.com/{key}"
+
+
+def create_storage() -> StorageBackend:
+    """Build the storage driver selected by STORAGE_BACKEND"""
+    if settings.storage_backend == "s3":
+        logger.info(f"Using S3 photo storage: bucket={settings.s3_bucket}")
+        return S3Storage(
+            bucket=settings.s3_bucket,
+            endpoint_url=settings.s3_endpoint_url,
+            region=settings.s3_region,
+            access_key_id=settings.s3_access_key_id,
+            secret_access_key=settings.s3_secret_access_key,
+            public_url=settings.s3_public_url,
+            key_prefix=settings.s3_key_prefix,
+            max_pool_connections=settings.s3_max_pool_connections,
+            multipart_threshold=settings.s3_multipart_threshold,
+            multipart_chunksize=settings.s3_multipart_chunksize,
+        )
+    return LocalStorage(settings.upload_dir, shard_depth=settings.upload_shard_depth)
+
@@ -0,0 +1,214 @@
+"""
+Region sharding of listings.
+
+Listings (with their contact requests and reports) can live on separate
+databases per postal region, so Hamburg or Munich traffic doesn't compete
+with Berlin for one primary:
+
+    SHARD_DATABASE_URLS=hamburg=postgresql://.../pcw_hamburg,munich=postgresql://.../pcw_munich
+    SHARD_ROUTES=2=hamburg,8=munich
+
+Routes map PLZ prefixes to shards (longest prefix wins); every other postal
+code stays on DATABASE_URL, the "default" shard, which also keeps the global
+tables (coins, alerts, idempotency keys). SQLite URLs work for local testing.
+
+Listing ids come from the listing_shards directory on the default database,
+so they are unique across shards, and the directory answers "which shard
+holds listing N" for the /{listing_id} routes. Without SHARD_DATABASE_URLS
+nothing changes: one database, no directory rows.
+"""
+import asyncio
+import logging
+from collections import OrderedDict
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Callable, Iterable, Optional
+
+from sqlalchemy import create_engine, func, insert, select, text
+from sqlalchemy.orm import Session, sessionmaker
+
+from .config import get_settings
+from .database import get_engine, get_session
+from .models import ListingShard
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SHARD = "default"
+
+
+def parse_mapping(value: str) -> list[tuple[str, str]]:
+    """"a=x,b=y" -> [("a", "x"), ("b", "y")] (values may contain "=")"""
+    pairs = []
+    for item in value.split(","):
+        if not item.strip():
+            continue
+        key, sep, target = item.partition("=")
+        if not sep or not key.strip() or not target.strip():
+            raise ValueError(f"Expected name=value, got {item!r}")
+        pairs.append((key.strip(), target.strip()))
+    return pairs
+
+
+class ShardRouter:
+    def __init__(self, shard_urls: dict[str, str], routes: dict[str, str], max_directory_cache: int = 100_000):
+        unknown = sorted({shard for shard in routes.values() if shard != DEFAULT_SHARD and shard not in shard_urls})
+        if unknown:
+            raise ValueError(f"SHARD_ROUTES points at unknown shard(s): {', '.join(unknown)}")
+        self.shard_urls = shard_urls
+        # Longest prefix first, so "10" can override "1"
+        self.routes = sorted(routes.items(), key=lambda item: len(item[0]), reverse=True)
+        self.names = [DEFAULT_SHARD, *shard_urls]
+        self.max_directory_cache = max_directory_cache
+        self._engines: dict = {}
+        self._sessionmakers: dict[str, sessionmaker] = {}
+        self._directory: "OrderedDict[int, str]" = OrderedDict()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.shard_urls)
+
+    def for_postal_code(self, postal_code: str) -> str:
+        for prefix, shard in self.routes:
+            if postal_code.startswith(prefix):
+                return shard
+        return DEFAULT_SHARD
+
+    def for_postal_codes(self, postal_codes: Optional[Iterable[str]]) -> list[str]:
+        """Shards a query over these postal codes must read (all shards when unfiltered)"""
+        if not postal_codes or not self.enabled:
+            return list(self.names)
+        wanted = {self.for_postal_code(code) for code in postal_codes}
+        return [name for name in self.names if name in wanted]
+
+    def engine(self, name: str):
+        """Engine for a shard, created on first use"""
+        if name == DEFAULT_SHARD:
+            return get_engine()
+        engine = self._engines.get(name)
+        if engine is None:
+            engine = self._engines[name] = create_engine(self.shard_urls[name], pool_pre_ping=True)
+            self._sessionmakers[name] = sessionmaker(bind=engine, autocommit=False, autoflush=False)
+        return engine
+
+    def session(self, name: str) -> Session:
+        if name == DEFAULT_SHARD:
+            return get_session()
+        self.engine(name)
+        return self._sessionmakers[name]()
+
+    @contextmanager
+    def shard_session(self, name: str, default_db: Session):
+        """The caller's session on the default shard, else a session on `name` closed on exit"""
+        if name == DEFAULT_SHARD:
+            yield default_db
+            return
+        db = self.session(name)
+        try:
+            yield db
+        finally:
+            db.close()
+
+    def allocate_listing_id(self, shard: str) -> Optional[int]:
+        """New listing id from the directory, recorded as living on `shard` (None when not sharded)"""
+        if not self.enabled:
+            return None
+        with get_engine().begin() as conn:
+            listing_id = conn.execute(
+                insert(ListingShard.__table__).values(shard=shard).returning(ListingShard.listing_id)
+            ).scalar_one()
+        self._remember(listing_id, shard)
+        return listing_id
+
+    def shard_of_listing(self, listing_id: int) -> str:
+        if not self.enabled:
+            return DEFAULT_SHARD
+        shard = self._directory.get(listing_id)
+        if shard is None:
+            with get_engine().connect() as conn:
+                shard = conn.execute(
+                    select(ListingShard.shard).where(ListingShard.listing_id == listing_id)
+                ).scalar()
+            if shard is None:
+                # Not allocated yet (or from before sharding): ask again next time
+                return DEFAULT_SHARD
+            shard = shard if shard in self.shard_urls else DEFAULT_SHARD
+            self._remember(listing_id, shard)
+        return shard
+
+    def group_by_shard(self, listing_ids: Iterable[int]) -> dict[str, list[int]]:
+        """Listing ids grouped by the shard holding them, with one directory query for the uncached ones"""
+        listing_ids = list(listing_ids)
+        if not self.enabled:
+            return {DEFAULT_SHARD: listing_ids} if listing_ids else {}
+        shards = {listing_id: self._directory.get(listing_id) for listing_id in listing_ids}
+        missing = [listing_id for listing_id, shard in shards.items() if shard is None]
+        if missing:
+            with get_engine().connect() as conn:
+                found = dict(conn.execute(
+                    select(ListingShard.listing_id, ListingShard.shard).where(ListingShard.listing_id.in_(missing))
+                ).all())
+            for listing_id in missing:
+                shard = found.get(listing_id)
+                shards[listing_id] = shard if shard in self.shard_urls else DEFAULT_SHARD
+                if shard is not None:
+                    self._remember(listing_id, shards[listing_id])
+        groups: dict[str, list[int]] = {}
+        for listing_id, shard in shards.items():
+            groups.setdefault(shard, []).append(listing_id)
+        return groups
+
+    def _remember(self, listing_id: int, shard: str) -> None:
+        # Only directory hits are cached: a listing never changes shard once allocated,
+        # but an id looked up before another worker allocates it must not stick to the default
+        self._directory[listing_id] = shard
+        if len(self._directory) > self.max_directory_cache:
+            self._directory.popitem(last=False)
+
+    def seed_listing_ids(self) -> int:
+        """Make directory ids start above every listing id already stored on any shard"""
+        highest, highest_shard = 0, DEFAULT_SHARD
+        for name in self.names:
+            with self.engine(name).connect() as conn:
+                for table in ("glove_listings", "glove_listings_archive"):
+                    top = conn.execute(text(f"SELECT COALESCE(MAX(id), 0) FROM {table}")).scalar()
+                    if top > highest:
+                        highest, highest_shard = top, name
+        engine = get_engine()
+        with engine.begin() as conn:
+            allocated = conn.execute(select(func.coalesce(func.max(ListingShard.listing_id), 0))).scalar()
+            if highest <= allocated:
+                return allocated
+            if engine.dialect.name == "postgresql":
+                conn.execute(
+                    text("SELECT setval(pg_get_serial_sequence('listing_shards', 'listing_id'), :value)"),
+                    {"value": highest},
+                )
+            else:
+                # SQLite hands out max(rowid) + 1: record the highest existing listing to move past it
+                conn.execute(insert(ListingShard.__table__).values(listing_id=highest, shard=highest_shard))
+        return highest
+
+    async def scatter(self, names: list[str], fn: Callable[[Session], object], default_db: Optional[Session] = None) -> list:
+        """Run fn(session) on each shard, in parallel threads when there are several; results in `names` order"""
+        def run(name: str):
+            if name == DEFAULT_SHARD and default_db is not None:
+                return fn(default_db)
+            db = self.session(name)
+            try:
+                return fn(db)
+            finally:
+                db.close()
+
+        if len(names) == 1:
+            return [run(names[0])]
+        return list(await asyncio.gather(*(asyncio.to_thread(run, name) for name in names)))
+
+
+@lru_cache()
+def get_shard_router() -> ShardRouter:
+    settings = get_settings()
+    router = ShardRouter(dict(parse_mapping(settings.shard_database_urls)), dict(parse_mapping(settings.shard_routes)))
+    if router.enabled:
+        logger.info(f"Listings sharded by region across: {', '.join(router.names)}")
+    return router
+
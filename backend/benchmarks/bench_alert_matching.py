@@ -0,0 +1,89 @@
+"""
+Benchmark: cost of matching one new listing against saved alerts.
+
+Loads N random alerts (spread over Berlin postal codes, with random
+brand / color / size / side filters) into a database, then times
+alerts.match_listing for random listings. Per-upload cost should stay
+flat as N grows, since only one postal code's posting lists are read.
+Uses an in-memory SQLite database unless --database-url is given
+(point that at a scratch database: the alert tables are created and filled).
+
+Run from backend/:
+    python -m benchmarks.bench_alert_matching [--alerts 100000] [--listings 500]
+"""
+import argparse
+import random
+import time
+from types import SimpleNamespace
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.models import GloveAlert, GloveAlertMatch, GloveAlertTerm
+from app.services import alerts
+
+POSTAL_CODES = [f"1{n:04d}" for n in range(115, 14200, 75)]  # ~190 codes, like Berlin
+BRANDS = ["nike", "the north face", "adidas", "roeckl", "uniqlo", "h&m", "jack wolfskin"]
+COLORS = ["black", "dark blue", "red", "grey", "green", "white", "brown"]
+SIZES = ["xs", "s", "m", "l", "xl"]
+SIDES = ["left", "right"]
+
+
+def maybe(values, p=0.4):
+    return random.choice(values) if random.random() < p else None
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--alerts", type=int, default=100_000)
+    parser.add_argument("--listings", type=int, default=500)
+    parser.add_argument("--database-url", default="sqlite://")
+    args = parser.parse_args()
+
+    engine = create_engine(args.database_url)
+    tables = [GloveAlert.__table__, GloveAlertTerm.__table__, GloveAlertMatch.__table__]
+    GloveAlert.metadata.create_all(engine, tables=tables)
+    db = sessionmaker(bind=engine)()
+
+    start = time.perf_counter()
+    for n in range(args.alerts):
+        alerts.create_alert(
+            db,
+            email=f"owner{n}@example.com",
+            postal_codes=random.sample(POSTAL_CODES, random.randint(1, 3)),
+            brand=maybe(BRANDS),
+            color=maybe(COLORS, 0.7),
+            size=maybe(SIZES),
+            side=maybe(SIDES, 0.6),
+        )
+        if n % 5000 == 4999:
+            db.commit()
+    db.commit()
+    print(f"Loaded {args.alerts} alerts in {time.perf_counter() - start:.1f}s")
+
+    timings, matched = [], 0
+    for n in range(args.listings):
+        listing = SimpleNamespace(
+            id=n + 1,
+            postal_code=random.choice(POSTAL_CODES),
+            brand=random.choice(BRANDS + [None]),
+            color=random.choice(COLORS),
+            size=random.choice(SIZES + ["unknown"]),
+            side=random.choice(SIDES + ["unknown"]),
+            finder_email="finder@example.com",
+        )
+        start = time.perf_counter()
+        matched += alerts.match_listing(db, listing)
+        db.commit()
+        timings.append((time.perf_counter() - start) * 1000)
+
+    timings.sort()
+    print(
+        f"{args.listings} listings: p50 {timings[len(timings) // 2]:.2f} ms | "
+        f"p99 {timings[int(len(timings) * 0.99)]:.2f} ms | "
+        f"{matched / args.listings:.1f} matches per listing"
+    )
+
+
+if __name__ == "__main__":
+    main()
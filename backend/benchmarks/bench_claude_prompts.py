@@ -0,0 +1,84 @@
+"""
+Benchmark: tokens and latency of the glove analysis call, before and after
+moving to a system prompt with tool output.
+
+"legacy" replays the old request shape (instructions resent in the user turn,
+free-text JSON answer, max_tokens=1024); "current" goes through ClaudeService.
+Needs ANTHROPIC_API_KEY and makes real (billed) calls.
+
+Run from backend/:
+    python -m benchmarks.bench_claude_prompts path/to/glove.jpg [--rounds 5]
+"""
+import argparse
+import asyncio
+import base64
+import mimetypes
+import time
+
+from app.services.claude_service import GLOVE_ANALYSIS_SYSTEM_PROMPT, ClaudeService
+
+claude_service = ClaudeService()
+
+LEGACY_INSTRUCTIONS = GLOVE_ANALYSIS_SYSTEM_PROMPT + "\n\nRespond ONLY with valid JSON containing those fields, no other text."
+
+
+async def legacy_call(image_base64: str, media_type: str):
+    return await claude_service.client.messages.create(
+        model=claude_service.model,
+        max_tokens=1024,
+        messages=[{
+            "role": "user",
+            "content": [
+                {"type": "image", "source": {"type": "base64", "media_type": media_type, "data": image_base64}},
+                {"type": "text", "text": LEGACY_INSTRUCTIONS},
+            ],
+        }],
+    )
+
+
+def summarize(label: str, samples: list) -> None:
+    n = len(samples)
+    avg = lambda key: sum(s[key] for s in samples) / n
+    print(
+        f"{label:8s} latency {avg('latency_ms'):7.0f} ms | input {avg('input'):6.0f} "
+        f"| output {avg('output'):5.0f} tokens"
+    )
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("image")
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    media_type = mimetypes.guess_type(args.image)[0] or "image/jpeg"
+    with open(args.image, "rb") as f:
+        image_base64 = base64.b64encode(f.read()).decode("utf-8")
+
+    legacy = []
+    for _ in range(args.rounds):
+        start = time.perf_counter()
+        message = await legacy_call(image_base64, media_type)
+        legacy.append({
+            "latency_ms": (time.perf_counter() - start) * 1000,
+            "input": message.usage.input_tokens,
+            "output": message.usage.output_tokens,
+        })
+
+    for _ in range(args.rounds):
+        await claude_service.analyze_glove_image(image_base64, media_type)
+    # Sum over routing tiers: one analysis may use both the fast and the large model
+    tiers = [s for op, s in claude_service.usage.items() if op.startswith("analyze_image")]
+    total = lambda key: sum(s[key] for s in tiers) / args.rounds
+    current = [{
+        "latency_ms": total("total_latency_ms"),
+        "input": total("input_tokens"),
+        "output": total("output_tokens"),
+    }]
+
+    summarize("legacy", legacy)
+    summarize("current", current)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
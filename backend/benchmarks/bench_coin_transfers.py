@@ -0,0 +1,105 @@
+"""
+Benchmark: throughput of concurrent Postaal coin transfers on the ledger.
+
+Threads move coins between a small pool of accounts (so senders contend)
+against DATABASE_URL, then check that no coins were created or lost.
+Writes bench:* rows to coin_transactions; point it at a scratch database.
+
+Run from backend/:
+    python -m benchmarks.bench_coin_transfers [--threads 16] [--transfers 200] [--accounts 10]
+"""
+import argparse
+import random
+import threading
+import time
+import uuid
+
+from sqlalchemy.exc import OperationalError
+
+from app.database import get_session
+from app.services import coin_ledger
+
+
+def worker(run_id: str, thread_no: int, accounts: list, transfers: int, results: dict, lock: threading.Lock):
+    counts = {"applied": 0, "insufficient": 0, "deadlocks": 0, "errors": 0}
+    db = get_session()
+    try:
+        for i in range(transfers):
+            sender, recipient = random.sample(accounts, 2)
+            try:
+                coin_ledger.transfer(
+                    db,
+                    key=f"bench:{run_id}:{thread_no}:{i}",
+                    sender=sender,
+                    recipient=recipient,
+                    amount=random.randint(1, 3),
+                )
+                db.commit()
+                counts["applied"] += 1
+            except coin_ledger.InsufficientCoinsError:
+                db.rollback()
+                counts["insufficient"] += 1
+            except OperationalError as e:
+                db.rollback()
+                counts["deadlocks" if "deadlock" in str(e).lower() else "errors"] += 1
+            except Exception:
+                db.rollback()
+                counts["errors"] += 1
+    finally:
+        db.close()
+    with lock:
+        for key, value in counts.items():
+            results[key] += value
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--transfers", type=int, default=200, help="per thread")
+    parser.add_argument("--accounts", type=int, default=10)
+    args = parser.parse_args()
+
+    run_id = uuid.uuid4().hex[:8]
+    accounts = [f"bench-{run_id}-{n}@example.com" for n in range(args.accounts)]
+    db = get_session()
+    try:
+        for account in accounts:
+            coin_ledger.grant_signup_coins(db, account)
+        db.commit()
+        before = sum(coin_ledger.get_balance(db, account) for account in accounts)
+    finally:
+        db.close()
+
+    results = {"applied": 0, "insufficient": 0, "deadlocks": 0, "errors": 0}
+    lock = threading.Lock()
+    threads = [
+        threading.Thread(target=worker, args=(run_id, n, accounts, args.transfers, results, lock))
+        for n in range(args.threads)
+    ]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+
+    db = get_session()
+    try:
+        balances = [coin_ledger.get_balance(db, account) for account in accounts]
+    finally:
+        db.close()
+
+    total = args.threads * args.transfers
+    print(f"{total} transfers in {elapsed:.2f}s ({total / elapsed:.0f}/s) across {args.threads} threads")
+    print(
+        f"applied {results['applied']} | insufficient {results['insufficient']} | "
+        f"deadlocks {results['deadlocks']} | errors {results['errors']}"
+    )
+    after = sum(balances)
+    print(f"coins before {before}, after {after} ({'conserved' if before == after else 'MISMATCH'})")
+    if min(balances) < 0:
+        print(f"WARNING: negative balance detected (min {min(balances)})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Benchmark: confidence scoring throughput.
+
+Scores synthetic signal batches with the NumPy scorer and, for comparison,
+a sample with a per-row Python loop. With --database it also runs a full
+rescore against DATABASE_URL (this UPDATEs listings; use a scratch database).
+
+Run from backend/:
+    python -m benchmarks.bench_confidence_rescore [--listings 1000000] [--batch-size 5000] [--database]
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+
+from app.config import get_settings
+from app.services import confidence
+
+
+def synthetic_batch(size: int, now: datetime) -> dict:
+    codes = [f"10{n:03d}" for n in range(115, 215)]
+    postal_codes = [random.choice(codes) for _ in range(size)]
+    return {
+        "ai_is_valid_glove": random.choices([True, False, None], weights=[85, 5, 10], k=size),
+        "ai_moderation_passed": random.choices([True, False, None], weights=[95, 3, 2], k=size),
+        "postal_code": postal_codes,
+        "gps_postal_code": [
+            random.choices([code, random.choice(codes), None], weights=[40, 5, 55])[0] for code in postal_codes
+        ],
+        "finder_claimed": [random.randint(0, 3) for _ in range(size)],
+        "finder_removed": random.choices([0, 1, 2], weights=[95, 4, 1], k=size),
+        "created_at": [now - timedelta(hours=random.randint(0, 24 * 60)) for _ in range(size)],
+        "reports": random.choices([0, 1, 2, 3], weights=[90, 6, 3, 1], k=size),
+    }
+
+
+def score_row(row: dict, now: datetime) -> float:
+    """The same formula one listing at a time, as a baseline"""
+    s = get_settings()
+
+    def signal(value):
+        return confidence.NEUTRAL if value is None else float(value)
+
+    gps = confidence.NEUTRAL if row["gps_postal_code"] is None else float(row["gps_postal_code"] == row["postal_code"])
+    history = min(1.0, max(0.0, 0.5 + 0.5 * (1 - 0.5 ** row["finder_claimed"]) - 0.25 * row["finder_removed"]))
+    weights = (
+        s.confidence_weight_ai, s.confidence_weight_gps, s.confidence_weight_weather,
+        s.confidence_weight_history, s.confidence_weight_community, s.confidence_weight_spam,
+    )
+    mix = (
+        weights[0] * signal(row["ai_is_valid_glove"]) + weights[1] * gps + weights[2] * confidence.NEUTRAL
+        + weights[3] * history + weights[4] * confidence.NEUTRAL + weights[5] * signal(row["ai_moderation_passed"])
+    ) / sum(weights)
+    age_days = max((now - row["created_at"]).total_seconds() / 86400, 0.0)
+    decay = s.confidence_age_floor + (1 - s.confidence_age_floor) * 0.5 ** (age_days / s.confidence_age_half_life_days)
+    return round(min(1.0, max(0.0, mix * decay - s.confidence_report_penalty * row["reports"])), 4)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--listings", type=int, default=1_000_000)
+    parser.add_argument("--batch-size", type=int, default=get_settings().confidence_rescore_batch_size)
+    parser.add_argument("--database", action="store_true", help="also run a full rescore against DATABASE_URL")
+    args = parser.parse_args()
+
+    now = datetime.utcnow()
+    batch = synthetic_batch(args.batch_size, now)
+    batches = -(-args.listings // args.batch_size)
+
+    start = time.perf_counter()
+    for _ in range(batches):
+        scores, remove = confidence.compute_scores(batch, now)
+    vectorized = time.perf_counter() - start
+    print(f"NumPy: {batches * args.batch_size} listings in {vectorized:.2f}s ({remove.mean():.1%} below threshold)")
+
+    rows = [dict(zip(batch, values)) for values in zip(*batch.values())]
+    start = time.perf_counter()
+    looped = [score_row(row, now) for row in rows]
+    per_row = (time.perf_counter() - start) / len(rows)
+    mismatches = sum(1 for a, b in zip(looped, scores.tolist()) if abs(a - b) > 1e-4)
+    print(f"Python loop: ~{per_row * batches * args.batch_size:.2f}s for the same listings | mismatches {mismatches}")
+
+    if args.database:
+        result = confidence.rescore_listings(args.batch_size)
+        print(
+            f"Database rescore: {result['scored']} scored, {result['updated']} updated, "
+            f"{result['removed']} removed in {confidence.stats['last_run_seconds']}s"
+        )
+
+
+if __name__ == "__main__":
+    main()
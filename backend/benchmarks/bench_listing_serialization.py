@@ -0,0 +1,93 @@
+"""
+Benchmark: per-item CPU cost of serializing search results.
+
+Compares the old path (full ORM-shaped objects -> Pydantic from_attributes ->
+FastAPI's default JSON encoding) against the projected-row path (column dicts
+-> orjson bytes) used by search_gloves and get_glove_listing.
+
+Run from backend/:
+    python -m benchmarks.bench_listing_serialization
+"""
+import json
+import time
+from datetime import datetime
+from types import SimpleNamespace
+
+import orjson
+from fastapi.encoders import jsonable_encoder
+
+from app.schemas import (
+    GloveListingResponse,
+    GloveSearchResponse,
+    GloveSize,
+    GloveSide,
+    FeeCurrency,
+    ListingStatus,
+)
+
+N_ITEMS = 100
+ROUNDS = 200
+RESPONSE_FIELDS = list(GloveListingResponse.model_fields)  # == LISTING_RESPONSE_COLUMNS
+
+
+def make_listing(i: int) -> SimpleNamespace:
+    """An ORM-shaped listing including the heavy columns the old path loaded"""
+    return SimpleNamespace(
+        id=i,
+        photo_url=f"/uploads/ab/cd/{i:08d}.jpg",
+        photo_filename=f"ab/cd/{i:08d}.jpg",
+        brand="North Face",
+        color="black",
+        size=GloveSize.M,
+        side=GloveSide.LEFT,
+        material="wool",
+        description="A black wool glove with a small logo on the cuff.",
+        postal_code="10115",
+        found_date=datetime(2024, 12, 1, 9, 30),
+        found_location_description="Near Alexanderplatz U-Bahn",
+        finder_email="finder@example.com",
+        finder_display_name="Finder",
+        fee_amount=5.0,
+        fee_currency=FeeCurrency.POSTAAL,
+        status=ListingStatus.ACTIVE,
+        confidence_score=0.5,
+        ai_moderation_passed=True,
+        ai_moderation_notes="x" * 512,
+        ai_analysis=json.dumps({"description": "y" * 4096}),
+        created_at=datetime(2024, 12, 1, 10, 0),
+        updated_at=datetime(2024, 12, 1, 10, 0),
+    )
+
+
+def old_path(listings) -> bytes:
+    response = GloveSearchResponse(items=listings, total=len(listings), page=1, per_page=N_ITEMS, total_pages=1)
+    return json.dumps(jsonable_encoder(response)).encode("utf-8")
+
+
+def new_path(rows) -> bytes:
+    return orjson.dumps({"items": rows, "total": len(rows), "page": 1, "per_page": N_ITEMS, "total_pages": 1})
+
+
+def timed(fn, arg) -> float:
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        fn(arg)
+    return (time.perf_counter() - start) / (ROUNDS * N_ITEMS)
+
+
+def main():
+    listings = [make_listing(i) for i in range(N_ITEMS)]
+    # What db.query(*LISTING_RESPONSE_COLUMNS) hands back, as mappings
+    rows = [{name: getattr(listing, name) for name in RESPONSE_FIELDS} for listing in listings]
+
+    old = timed(old_path, listings)
+    new = timed(new_path, rows)
+
+    print(f"items per page:       {N_ITEMS}")
+    print(f"old (pydantic+json):    {old * 1e6:8.2f} us/item")
+    print(f"new (projected+orjson): {new * 1e6:8.2f} us/item")
+    print(f"speedup:                {old / new:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
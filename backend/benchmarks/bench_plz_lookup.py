@@ -0,0 +1,51 @@
+"""
+Benchmark: GPS -> postal code lookups against the bundled PLZ boundaries.
+
+Times the grid index against a linear scan of all polygons for random
+points inside the boundaries' bounding box, and reports index build time.
+Needs the boundary file (see scripts/build_plz_boundaries.py).
+
+Run from backend/:
+    python -m benchmarks.bench_plz_lookup [--points 100000]
+"""
+import argparse
+import json
+import random
+import time
+
+from app.config import get_settings
+from app.services.postal_geo import DEFAULT_BOUNDARIES_PATH, PostalCodeIndex
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--points", type=int, default=100_000)
+    parser.add_argument("--path", default=get_settings().plz_boundaries_path or DEFAULT_BOUNDARIES_PATH)
+    args = parser.parse_args()
+
+    with open(args.path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    start = time.perf_counter()
+    index = PostalCodeIndex.from_geojson(data, get_settings().plz_grid_cell_degrees)
+    print(f"Built index over {len(index.areas)} polygons in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    points = [
+        (random.uniform(index.min_y, index.max_y), random.uniform(index.min_x, index.max_x))
+        for _ in range(args.points)
+    ]
+
+    start = time.perf_counter()
+    indexed = [index.lookup(lat, lon) for lat, lon in points]
+    grid_us = (time.perf_counter() - start) / len(points) * 1e6
+
+    sample = points[: max(1, len(points) // 100)]
+    start = time.perf_counter()
+    scanned = [next((a.postal_code for a in index.areas if a.contains(lon, lat)), None) for lat, lon in sample]
+    scan_us = (time.perf_counter() - start) / len(sample) * 1e6
+
+    mismatches = sum(1 for a, b in zip(indexed, scanned) if a != b)
+    print(f"grid index {grid_us:.1f} us/lookup | linear scan {scan_us:.1f} us/lookup | mismatches {mismatches}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Benchmark: search through the in-memory columnar index vs. SQL.
+
+Fills an index with synthetic active listings and times a mix of typical
+searches (count + first page). With --database it loads the index from
+DATABASE_URL (and the shards) instead and runs the same searches both ways,
+through the index and through the SQL filters /search uses, checking that
+totals agree.
+
+Run from backend/:
+    python -m benchmarks.bench_search_index [--listings 200000] [--queries 2000] [--database]
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from app.models import GloveSide, GloveSize, ListingStatus
+from app.services import search_index
+
+POSTAL_CODES = [f"10{n:03d}" for n in range(115, 215)] + [f"12{n:03d}" for n in range(43, 359)]
+COLORS = ["black", "dark blue", "navy", "grey", "red", "brown leather", "pink", "green", "white", "multicolored"]
+BRANDS = [None, None, "Nike", "adidas", "Roeckl", "Uniqlo", "H&M", "The North Face", "Jack Wolfskin"]
+
+
+def synthetic_listings(count: int, now: datetime):
+    for listing_id in range(1, count + 1):
+        yield SimpleNamespace(
+            id=listing_id,
+            status=ListingStatus.ACTIVE,
+            postal_code=random.choice(POSTAL_CODES),
+            size=random.choice(list(GloveSize)),
+            side=random.choice(list(GloveSide)),
+            found_date=now - timedelta(minutes=random.randint(0, 60 * 24 * 60)),
+            color=random.choice(COLORS),
+            brand=random.choice(BRANDS),
+            confidence_score=random.uniform(0.25, 1.0),
+        )
+
+
+def random_query() -> dict:
+    query = {"postal_codes": random.sample(POSTAL_CODES, random.choice([1, 1, 3, 10]))}
+    if random.random() < 0.3:
+        query["color"] = random.choice(["black", "blue", "red"])
+    if random.random() < 0.3:
+        query["size"] = random.choice(["s", "m", "l"])
+    if random.random() < 0.2:
+        query["side"] = random.choice(["left", "right"])
+    if random.random() < 0.1:
+        query["brand"] = random.choice(["nike", "roeckl"])
+    return query
+
+
+def time_index(index, queries: list) -> tuple[float, list]:
+    totals = []
+    start = time.perf_counter()
+    for query in queries:
+        total, _ = index.search(**query, offset=0, limit=20)
+        totals.append(total)
+    return time.perf_counter() - start, totals
+
+
+def time_sql(queries: list) -> tuple[float, list]:
+    from app.models import GloveListing
+    from app.routes.gloves import LISTING_RESPONSE_COLUMNS, build_search_filters
+    from app.sharding import get_shard_router
+
+    router = get_shard_router()
+    totals = []
+    start = time.perf_counter()
+    for query in queries:
+        filters = build_search_filters(
+            ",".join(query["postal_codes"]), query.get("brand"), query.get("color"), query.get("size"), query.get("side"),
+        )
+        total = 0
+        for shard in router.for_postal_codes(query["postal_codes"]):
+            db = router.session(shard)
+            try:
+                total += db.query(GloveListing.id).filter(*filters).count()
+                db.query(*LISTING_RESPONSE_COLUMNS).filter(*filters).order_by(GloveListing.found_date.desc()).limit(20).all()
+            finally:
+                db.close()
+        totals.append(total)
+    return time.perf_counter() - start, totals
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--listings", type=int, default=200_000)
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--database", action="store_true", help="load the index from DATABASE_URL and compare with SQL")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    if args.database:
+        index = search_index.load_index()
+        source = "database"
+    else:
+        index = search_index.ListingSearchIndex()
+        for listing in synthetic_listings(args.listings, datetime.utcnow()):
+            index.apply("default", listing)
+        source = "synthetic"
+    print(f"Loaded {len(index)} {source} listings in {time.perf_counter() - start:.2f}s")
+
+    queries = [random_query() for _ in range(args.queries)]
+    elapsed, index_totals = time_index(index, queries)
+    print(f"Index: {len(queries)} searches in {elapsed:.3f}s ({elapsed / len(queries) * 1000:.3f} ms each)")
+
+    if args.database:
+        elapsed, sql_totals = time_sql(queries)
+        mismatches = sum(1 for a, b in zip(index_totals, sql_totals) if a != b)
+        print(f"SQL:   {len(queries)} searches in {elapsed:.3f}s ({elapsed / len(queries) * 1000:.3f} ms each) | total mismatches {mismatches}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Load test: thousands of idle Server-Sent Events connections on one worker.
+
+Opens N concurrent GET /api/gloves/stream connections (spread over postal
+codes), holds them, and reports connect times, failures, keepalives and
+listing events received, plus the worker's /health/stream counters.
+Upload a glove while it runs to see fan-out. Raise the open-files limit
+first (ulimit -n) and run the API with a single worker:
+    uvicorn app.main:app --workers 1
+
+Run from backend/:
+    python -m benchmarks.bench_sse_connections [--url http://localhost:8000] [--connections 5000] [--hold 60]
+"""
+import argparse
+import asyncio
+import json
+import time
+from urllib.parse import urlsplit
+
+POSTAL_CODES = [f"1{n:04d}" for n in range(115, 14200, 75)]
+
+
+async def open_stream(host: str, port: int, path: str, results: dict, hold_until: float):
+    start = time.perf_counter()
+    try:
+        reader, writer = await asyncio.open_connection(host, port)
+        writer.write(
+            f"GET {path} HTTP/1.1\r\nHost: {host}\r\nAccept: text/event-stream\r\n\r\n".encode()
+        )
+        await writer.drain()
+        status_line = await reader.readline()
+        if b" 200 " not in status_line:
+            results["rejected"] += 1
+            writer.close()
+            return
+        results["connect_ms"].append((time.perf_counter() - start) * 1000)
+        results["open"] += 1
+        while time.monotonic() < hold_until:
+            try:
+                line = await asyncio.wait_for(reader.readline(), timeout=hold_until - time.monotonic())
+            except asyncio.TimeoutError:
+                break
+            if not line:
+                results["closed_by_server"] += 1
+                break
+            if b"keepalive" in line:
+                results["keepalives"] += 1
+            elif line.startswith(b"event: listing"):
+                results["events"] += 1
+            elif line.startswith(b"event: dropped"):
+                results["dropped"] += 1
+        writer.close()
+    except OSError:
+        results["errors"] += 1
+
+
+async def fetch_json(host: str, port: int, path: str) -> dict:
+    reader, writer = await asyncio.open_connection(host, port)
+    writer.write(f"GET {path} HTTP/1.1\r\nHost: {host}\r\nConnection: close\r\n\r\n".encode())
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    return json.loads(response.split(b"\r\n\r\n", 1)[1])
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--connections", type=int, default=5000)
+    parser.add_argument("--hold", type=float, default=60.0, help="seconds to keep connections open")
+    parser.add_argument("--ramp", type=int, default=500, help="new connections per second")
+    args = parser.parse_args()
+
+    url = urlsplit(args.url)
+    host, port = url.hostname, url.port or 80
+    results = {
+        "open": 0, "rejected": 0, "errors": 0, "closed_by_server": 0,
+        "keepalives": 0, "events": 0, "dropped": 0, "connect_ms": [],
+    }
+    hold_until = time.monotonic() + args.connections / args.ramp + args.hold
+    tasks = []
+    for n in range(args.connections):
+        codes = ",".join(POSTAL_CODES[(n + i) % len(POSTAL_CODES)] for i in range(3))
+        tasks.append(asyncio.create_task(
+            open_stream(host, port, f"/api/gloves/stream?postal_codes={codes}", results, hold_until)
+        ))
+        if n % args.ramp == args.ramp - 1:
+            await asyncio.sleep(1)
+
+    await asyncio.sleep(max(0.0, hold_until - time.monotonic() - 1))
+    server = await fetch_json(host, port, "/health/stream")
+    await asyncio.gather(*tasks)
+
+    connect_ms = sorted(results.pop("connect_ms")) or [0.0]
+    print(f"open {results['open']}/{args.connections} | rejected {results['rejected']} | errors {results['errors']}")
+    print(
+        f"connect p50 {connect_ms[len(connect_ms) // 2]:.1f} ms | "
+        f"p99 {connect_ms[int(len(connect_ms) * 0.99)]:.1f} ms"
+    )
+    print(
+        f"keepalives {results['keepalives']} | listing events {results['events']} | "
+        f"dropped {results['dropped']} | closed by server {results['closed_by_server']}"
+    )
+    print(f"server: {server}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,92 @@
+"""
+Backfill ai_analysis JSONB and its extracted columns from ai_analysis_legacy.
+
+Streams rows in id order, one bounded batch per transaction, so it can run
+against the live database without long locks. Safe to re-run: only rows whose
+JSONB column is still empty are touched.
+
+Usage (from backend/, after `alembic upgrade head`):
+    python -m scripts.backfill_ai_analysis [--batch-size 1000] [--drop-legacy]
+"""
+import argparse
+import json
+import logging
+
+from sqlalchemy import bindparam, text
+from sqlalchemy.dialects.postgresql import JSONB
+
+from app.database import get_engine
+from app.models import analysis_indexed_fields
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Every listing created before this migration was analyzed by this model
+LEGACY_MODEL_VERSION = "claude-sonnet-4-20250514"
+
+SELECT_BATCH = text("""
+    SELECT id, ai_analysis_legacy FROM glove_listings
+    WHERE id > :last_id AND ai_analysis IS NULL AND ai_analysis_legacy IS NOT NULL
+    ORDER BY id
+    LIMIT :batch_size
+""")
+
+UPDATE_ROW = text("""
+    UPDATE glove_listings
+    SET ai_analysis = :ai_analysis,
+        ai_suggested_price_eur = :ai_suggested_price_eur,
+        ai_is_valid_glove = :ai_is_valid_glove,
+        ai_model_version = :ai_model_version
+    WHERE id = :id
+""").bindparams(bindparam("ai_analysis", type_=JSONB))
+
+
+def parse_legacy(raw: str) -> dict:
+    try:
+        data = json.loads(raw)
+    except (ValueError, TypeError):
+        return {"unparsed": raw}
+    return data if isinstance(data, dict) else {"value": data}
+
+
+def backfill(batch_size: int) -> int:
+    engine = get_engine()
+    last_id = 0
+    converted = 0
+    while True:
+        with engine.begin() as conn:
+            rows = conn.execute(SELECT_BATCH, {"last_id": last_id, "batch_size": batch_size}).all()
+            if not rows:
+                break
+            params = []
+            for row in rows:
+                data = parse_legacy(row.ai_analysis_legacy)
+                params.append({
+                    "id": row.id,
+                    "ai_analysis": data,
+                    **analysis_indexed_fields(data, LEGACY_MODEL_VERSION),
+                })
+            conn.execute(UPDATE_ROW, params)
+        last_id = rows[-1].id
+        converted += len(rows)
+        logger.info(f"Backfilled {converted} listings (last id {last_id})")
+    return converted
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--drop-legacy", action="store_true", help="Drop ai_analysis_legacy when done")
+    args = parser.parse_args()
+
+    converted = backfill(args.batch_size)
+    logger.info(f"Backfill complete: {converted} listings converted")
+
+    if args.drop_legacy:
+        with get_engine().begin() as conn:
+            conn.execute(text("ALTER TABLE glove_listings DROP COLUMN IF EXISTS ai_analysis_legacy"))
+        logger.info("Dropped ai_analysis_legacy")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Build the bundled postal code boundary file used for GPS checks on upload.
+
+Takes a GeoJSON FeatureCollection of German PLZ areas (e.g. an OpenStreetMap
+derived "plz-5stellig" export), keeps the areas whose postal code starts with
+one of the given prefixes, rounds coordinates to ~1 m and drops repeated
+points, and writes app/data/berlin_plz.geojson (or --output).
+
+Usage (from backend/):
+    python -m scripts.build_plz_boundaries path/to/plz-5stellig.geojson [--prefixes 10,12,13,14]
+"""
+import argparse
+import json
+import logging
+import os
+
+from app.services.postal_geo import DEFAULT_BOUNDARIES_PATH, POSTAL_CODE_PROPERTIES, PostalCodeIndex
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+PRECISION = 5  # decimal places, ~1 m
+
+
+def compact_ring(ring: list) -> list:
+    points = []
+    for lon, lat, *_ in ring:
+        point = [round(lon, PRECISION), round(lat, PRECISION)]
+        if not points or points[-1] != point:
+            points.append(point)
+    return points
+
+
+def compact_geometry(geometry: dict) -> dict:
+    if geometry["type"] == "Polygon":
+        return {"type": "Polygon", "coordinates": [compact_ring(r) for r in geometry["coordinates"]]}
+    return {
+        "type": "MultiPolygon",
+        "coordinates": [[compact_ring(r) for r in polygon] for polygon in geometry["coordinates"]],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("source")
+    parser.add_argument("--prefixes", default="10,12,13,14", help="postal code prefixes to keep")
+    parser.add_argument("--output", default=DEFAULT_BOUNDARIES_PATH)
+    args = parser.parse_args()
+
+    prefixes = tuple(p.strip() for p in args.prefixes.split(",") if p.strip())
+    with open(args.source, "r", encoding="utf-8") as f:
+        source = json.load(f)
+
+    features = []
+    for feature in source.get("features", []):
+        properties = feature.get("properties") or {}
+        code = next((str(properties[k]) for k in POSTAL_CODE_PROPERTIES if properties.get(k)), None)
+        geometry = feature.get("geometry") or {}
+        if not code or not code.startswith(prefixes) or geometry.get("type") not in ("Polygon", "MultiPolygon"):
+            continue
+        features.append({
+            "type": "Feature",
+            "properties": {"plz": code},
+            "geometry": compact_geometry(geometry),
+        })
+
+    output = {"type": "FeatureCollection", "features": features}
+    # Fail here rather than at request time if the result can't be indexed
+    index = PostalCodeIndex.from_geojson(output, 0.005)
+
+    os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(output, f, separators=(",", ":"))
+    logger.info(
+        f"Wrote {len(features)} postal code areas ({len(index.areas)} polygons, "
+        f"{len(index.interior)} interior grid cells) to {args.output}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Build the binary postal code registry (app/data/postal_codes.bin).
+
+Input is a CSV of German postal codes with city / district / state columns,
+e.g. an OpenStreetMap-derived "zuordnung_plz_ort" export. Recognized headers:
+    plz | postal_code,  ort | city,  ortsteil | district | landkreis,  bundesland | state
+When a code maps to several places the first row wins. Run at image build
+time (see the Dockerfile); with --optional a missing CSV is not an error.
+
+Usage (from backend/):
+    python -m scripts.build_postal_registry [data/postal_codes.csv] [--output app/data/postal_codes.bin]
+"""
+import argparse
+import csv
+import logging
+import os
+import sys
+
+from app.services.postal_registry import (
+    DEFAULT_REGISTRY_PATH,
+    HEADER,
+    MAGIC,
+    OFFSET,
+    RECORD,
+    SLOT,
+    SLOT_COUNT,
+    VERSION,
+    PostalRegistry,
+)
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+COLUMNS = {
+    "postal_code": ("plz", "postal_code"),
+    "city": ("ort", "city"),
+    "district": ("ortsteil", "district", "landkreis"),
+    "state": ("bundesland", "state"),
+}
+
+
+def pick(row: dict, field: str) -> str:
+    for name in COLUMNS[field]:
+        if row.get(name):
+            return row[name].strip()
+    return ""
+
+
+def build(rows, output: str) -> int:
+    strings, string_ids = [""], {"": 0}
+    records, slots = [], [0] * SLOT_COUNT
+
+    def intern(value: str) -> int:
+        if value not in string_ids:
+            string_ids[value] = len(strings)
+            strings.append(value)
+        return string_ids[value]
+
+    for row in rows:
+        code = pick(row, "postal_code").zfill(5)
+        if len(code) != 5 or not code.isdigit() or slots[int(code)]:
+            continue
+        records.append((intern(pick(row, "city")), intern(pick(row, "district")), intern(pick(row, "state"))))
+        slots[int(code)] = len(records)
+    if len(strings) > 0xFFFF:
+        raise ValueError("Too many distinct names for 16-bit string ids")
+
+    blob = bytearray()
+    offsets = [0]
+    for value in strings:
+        blob += value.encode("utf-8")
+        offsets.append(len(blob))
+
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, len(records), len(strings)))
+        f.write(b"".join(SLOT.pack(slot) for slot in slots))
+        f.write(b"".join(RECORD.pack(*record) for record in records))
+        f.write(b"".join(OFFSET.pack(offset) for offset in offsets))
+        f.write(blob)
+    return len(records)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("source", nargs="?", default="data/postal_codes.csv")
+    parser.add_argument("--output", default=DEFAULT_REGISTRY_PATH)
+    parser.add_argument("--optional", action="store_true", help="exit quietly if the CSV is missing")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.source):
+        if args.optional:
+            logger.info(f"No {args.source}; skipping postal code registry build")
+            return
+        sys.exit(f"CSV not found: {args.source}")
+
+    with open(args.source, "r", encoding="utf-8-sig", newline="") as f:
+        sample = f.read(4096)
+        f.seek(0)
+        dialect = csv.Sniffer().sniff(sample, delimiters=",;\t")
+        rows = ({k.strip().lower(): v for k, v in row.items() if k} for row in csv.DictReader(f, dialect=dialect))
+        count = build(rows, args.output)
+
+    # Read it back through the runtime reader so a bad file fails the build, not a request
+    registry = PostalRegistry(args.output)
+    logger.info(f"Wrote {count} postal codes to {args.output} ({os.path.getsize(args.output) // 1024} KB)")
+    assert len(registry) == count
+
+
+if __name__ == "__main__":
+    main()
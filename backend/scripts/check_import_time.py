@@ -0,0 +1,73 @@
+"""
+Check how long `import app.main` takes, using `python -X importtime`.
+Fails (exit 1) when the cumulative import time exceeds the budget or one of
+the DEFERRED modules is imported at startup, and lists the slowest imports so
+regressions are easy to track down.
+
+The whole app imports in about 850 ms on a developer laptop, most of it
+FastAPI and SQLAlchemy, so the 950 ms default keeps startup well under a
+second. Timings vary between runs (a cold first run can take 30% longer), so
+the check takes the fastest of --runs measurements. DEFERRED catches the usual
+regression, a heavy dependency (NumPy, Pillow, boto3, the Anthropic SDK, each
+50-500 ms) moving back onto the startup path, independent of machine speed.
+
+Usage (from backend/):
+    python -m scripts.check_import_time [--budget-ms 950] [--runs 5] [--top 15]
+"""
+import argparse
+import subprocess
+import sys
+
+# Imported inside the functions that need them, never by `import app.main`
+DEFERRED = ("numpy", "PIL", "boto3", "anthropic", "redis")
+
+
+def measure(module: str) -> list[tuple[int, int, str]]:
+    """Return (self_us, cumulative_us, name) for every import"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line.removeprefix("import time:").split("|")
+        rows.append((int(self_us), int(cumulative_us), name.rstrip()))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--module", default="app.main")
+    parser.add_argument("--budget-ms", type=float, default=950.0)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    # The module's own cumulative time, leaving out the interpreter's startup imports
+    runs = [measure(args.module) for _ in range(max(args.runs, 1))]
+    rows = min(runs, key=lambda r: r[-1][1])
+    total_ms = rows[-1][1] / 1000
+
+    print(f"Slowest imports (cumulative) for {args.module}:")
+    for _, cumulative_us, name in sorted(rows, key=lambda r: r[1], reverse=True)[: args.top]:
+        print(f"  {cumulative_us / 1000:8.1f} ms  {name}")
+    print(f"Total import time: {total_ms:.1f} ms (fastest of {len(runs)} runs, budget {args.budget_ms:.0f} ms)")
+
+    failed = False
+    eager = sorted({name.strip() for _, _, name in rows if name.strip() in DEFERRED})
+    if eager:
+        print(f"Imported at startup but should be deferred: {', '.join(eager)}", file=sys.stderr)
+        failed = True
+    if total_ms > args.budget_ms:
+        print("Import time budget exceeded", file=sys.stderr)
+        failed = True
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
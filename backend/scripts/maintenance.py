@@ -0,0 +1,22 @@
+"""
+Run one listing lifecycle pass (expire stale listings, archive finished ones,
+purge expired idempotency keys).
+The API workers also run this on a timer; use this script for cron jobs or backfills.
+
+Usage (from backend/):
+    python -m scripts.maintenance
+"""
+import logging
+
+from app.services.listing_lifecycle import run_maintenance
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+if __name__ == "__main__":
+    result = run_maintenance()
+    logger.info(
+        f"Expired {result['expired']} listings, archived {result['archived']} listings, "
+        f"purged {result['idempotency_purged']} idempotency keys"
+    )
@@ -0,0 +1,56 @@
+"""
+Bring the database schema up to date. Runs once per deploy, outside the
+web workers (Render preDeployCommand / docker-compose), so app startup
+never does DDL.
+
+- Fresh database: create all tables from the models and stamp Alembic head.
+- Existing database: apply pending Alembic migrations, then create any
+  tables that don't exist yet.
+
+With region sharding (SHARD_DATABASE_URLS) every shard database gets the
+same schema, and listing ids handed out by the directory are moved past
+the ids already in use.
+
+Usage (from backend/):
+    python -m scripts.migrate
+"""
+import logging
+
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import inspect
+
+from app import models  # noqa: F401 - register tables on Base.metadata
+from app.database import Base
+from app.sharding import get_shard_router
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def migrate(name: str, engine) -> None:
+    alembic_cfg = Config("alembic.ini")
+    alembic_cfg.attributes["database_url"] = engine.url.render_as_string(hide_password=False)
+    tables = set(inspect(engine).get_table_names())
+
+    if "glove_listings" not in tables:
+        Base.metadata.create_all(bind=engine)
+        command.stamp(alembic_cfg, "head")
+        logger.info(f"[{name}] Created schema and stamped Alembic head")
+        return
+
+    command.upgrade(alembic_cfg, "head")
+    Base.metadata.create_all(bind=engine)
+    logger.info(f"[{name}] Schema is up to date")
+
+
+def main():
+    router = get_shard_router()
+    for name in router.names:
+        migrate(name, router.engine(name))
+    if router.enabled:
+        logger.info(f"Listing ids continue after {router.seed_listing_ids()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,29 @@
+"""
+Delete orphaned photo files and the photos of long removed or expired
+listings (see app/services/photo_gc.py).
+The API workers also run this on a timer; use this script for cron jobs or,
+with --dry-run, to see what a pass would delete.
+
+Usage (from backend/):
+    python -m scripts.photo_gc [--dry-run]
+"""
+import argparse
+import logging
+
+from app.services.photo_gc import run_photo_gc
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--dry-run", action="store_true", help="Report what would be deleted without deleting")
+    args = parser.parse_args()
+    result = run_photo_gc(dry_run=args.dry_run)
+    verb = "Would delete" if args.dry_run else "Deleted"
+    logger.info(
+        f"Scanned {result['scanned']} files ({result['referenced']} referenced, {result['missing']} listings "
+        f"without a file). {verb} {result['orphans_deleted']} orphaned and {result['dead_deleted']} dead photos, "
+        f"{result['bytes_freed'] / 1024 / 1024:.1f} MiB"
+    )
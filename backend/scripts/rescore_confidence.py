@@ -0,0 +1,23 @@
+"""
+Recompute the confidence score of every active listing and remove those
+that fall below the threshold.
+The API workers also run this on a timer; use this script after changing
+the confidence weights or for cron jobs.
+
+Usage (from backend/):
+    python -m scripts.rescore_confidence
+"""
+import logging
+
+from app.services.confidence import run_rescore, stats
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+if __name__ == "__main__":
+    result = run_rescore()
+    logger.info(
+        f"Scored {result['scored']} listings, updated {result['updated']}, "
+        f"removed {result['removed']} in {stats['last_run_seconds']}s"
+    )
@@ -0,0 +1,77 @@
+import asyncio
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app.models import GloveAlertMatch, GloveListing, GloveSize, ListingStatus
+from app.services import alerts
+
+
+@pytest.fixture()
+def make_session(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'main.db'}")
+    Base.metadata.create_all(engine)
+    return sessionmaker(bind=engine)
+
+
+def add_listing(db, brand=None, color="black", size=GloveSize.UNKNOWN):
+    listing = GloveListing(
+        photo_url="/uploads/a.jpg",
+        photo_filename="a.jpg",
+        postal_code="10115",
+        color=color,
+        brand=brand,
+        size=size,
+        found_date=datetime(2026, 1, 1),
+        finder_email="finder@example.com",
+        status=ListingStatus.ACTIVE,
+    )
+    db.add(listing)
+    db.flush()
+    return listing
+
+
+def test_failed_digest_is_retried_and_sent_ones_are_not(monkeypatch, make_session):
+    db = make_session()
+    alerts.create_alert(db, "ok@example.com", ["10115"])
+    alerts.create_alert(db, "broken@example.com", ["10115"])
+    alerts.match_listing(db, add_listing(db))
+    db.commit()
+
+    sent, failures = [], ["broken@example.com"]
+
+    async def send_alert_digest(email, listings, unsubscribe_urls):
+        if email in failures:
+            failures.remove(email)
+            raise ConnectionError("SMTP down")
+        sent.append(email)
+
+    monkeypatch.setattr(alerts, "get_session", make_session)
+    monkeypatch.setattr(alerts.email_service, "send_alert_digest", send_alert_digest)
+
+    assert asyncio.run(alerts.send_alert_digests()) == 1
+    assert sent == ["ok@example.com"]
+    assert db.query(GloveAlertMatch).filter(GloveAlertMatch.notified_at.is_(None)).count() == 1
+
+    assert asyncio.run(alerts.send_alert_digests()) == 1
+    assert sent == ["ok@example.com", "broken@example.com"]
+    assert asyncio.run(alerts.send_alert_digests()) == 0
+
+
+def test_brand_and_color_match_like_search(make_session):
+    db = make_session()
+    blue = alerts.create_alert(db, "blue@example.com", ["10115"], color="Blue")
+    nike_m = alerts.create_alert(db, "nike@example.com", ["10115"], brand="nike", size="m")
+    long_color = alerts.create_alert(db, "long@example.com", ["10115"], color="navy with thin white and red stripes")
+
+    alerts.match_listing(db, add_listing(db, color="Dark-Blue"))
+    alerts.match_listing(db, add_listing(db, brand="NikeLab", color="Navy with thin white and red stripes"))
+    alerts.match_listing(db, add_listing(db, brand="NikeLab", size=GloveSize.M))
+    db.commit()
+
+    matched = {(match.alert_id, match.listing_id) for match in db.query(GloveAlertMatch)}
+    # Listing 2 has no size, so only listing 3 meets nike_m's size filter
+    assert matched == {(blue.id, 1), (long_color.id, 2), (nike_m.id, 3)}
@@ -0,0 +1,36 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from app.services import claude_service as claude_module
+from app.services.resilience import ServiceUnavailableError
+
+
+def tool_message(name, arguments):
+    return SimpleNamespace(
+        content=[SimpleNamespace(type="tool_use", name=name, input=arguments)],
+        usage=SimpleNamespace(input_tokens=1, output_tokens=1),
+    )
+
+
+def test_cascade_shares_one_deadline(monkeypatch):
+    monkeypatch.setattr(claude_module.settings, "claude_request_deadline_seconds", 0.5)
+    monkeypatch.setattr(claude_module.settings, "claude_cascade_enabled", True)
+    monkeypatch.setattr(claude_module.settings, "anthropic_api_key", "test")
+    service = claude_module.ClaudeService()
+
+    async def create(model, **kwargs):
+        if model == service.fast_model:
+            # Unsure after most of the deadline: escalates to the large model
+            await asyncio.sleep(0.3)
+            return tool_message(kwargs["tools"][0]["name"], {"confidence": 0.1})
+        await asyncio.sleep(10)
+
+    service.client = SimpleNamespace(messages=SimpleNamespace(create=create))
+
+    started = time.monotonic()
+    with pytest.raises(ServiceUnavailableError):
+        asyncio.run(service.analyze_glove_image("aGk=", "image/jpeg"))
+    assert time.monotonic() - started < 0.8
@@ -0,0 +1,40 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app.models import CoinTransaction
+from app.routes import coins
+from app.services import coin_ledger
+
+
+@pytest.fixture()
+def db(monkeypatch):
+    monkeypatch.setattr(coin_ledger.settings, "coin_balance_secret", "test-secret")
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+
+
+def test_balance_needs_the_signed_token_and_writes_nothing(db):
+    with pytest.raises(HTTPException) as rejected:
+        asyncio.run(coins.get_coin_balance(email="a@example.com", token="guess", db=db))
+    assert rejected.value.status_code == 403
+
+    token = coin_ledger.balance_token("a@example.com")
+    balance = asyncio.run(coins.get_coin_balance(email=" A@example.com", token=token, db=db))
+    assert balance.balance == coins.settings.initial_postaal_coins
+    assert db.scalar(select(func.count()).select_from(CoinTransaction)) == 0
+    assert "token=" + token in coin_ledger.balance_url("a@example.com")
+
+
+def test_balance_is_disabled_without_a_secret(db, monkeypatch):
+    monkeypatch.setattr(coin_ledger.settings, "coin_balance_secret", "")
+    with pytest.raises(HTTPException):
+        asyncio.run(coins.get_coin_balance(email="a@example.com", token=coin_ledger.balance_token("a@example.com"), db=db))
+    assert coin_ledger.balance_url("a@example.com") is None
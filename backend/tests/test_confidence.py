@@ -0,0 +1,68 @@
+from datetime import datetime
+from types import SimpleNamespace
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app.models import GloveListing, ListingStatus
+from app.services import confidence
+
+
+def test_orm_write_only_touches_active_listings():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+    for status in (ListingStatus.ACTIVE, ListingStatus.ACTIVE, ListingStatus.CLAIMED):
+        db.add(GloveListing(
+            photo_url="/uploads/a.jpg",
+            photo_filename="a.jpg",
+            postal_code="10115",
+            color="black",
+            found_date=datetime(2026, 1, 1),
+            finder_email="finder@example.com",
+            status=status,
+            confidence_score=0.5,
+        ))
+    db.commit()
+
+    # Listing 3 was claimed after the rescore read it
+    confidence._write_orm(db, [1, 2, 3], [0.9, 0.1, 0.1], [False, True, True])
+    db.commit()
+
+    rows = {row.id: (row.status, row.confidence_score) for row in db.query(GloveListing)}
+    assert rows == {
+        1: (ListingStatus.ACTIVE, 0.9),
+        2: (ListingStatus.REMOVED, 0.1),
+        3: (ListingStatus.CLAIMED, 0.5),
+    }
+
+
+def test_rescore_in_several_batches_on_a_sqlite_file(monkeypatch, tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'listings.db'}")
+    Base.metadata.create_all(engine)
+    make_session = sessionmaker(bind=engine)
+    db = make_session()
+    for number in range(7):
+        db.add(GloveListing(
+            photo_url=f"/uploads/{number}.jpg",
+            photo_filename=f"{number}.jpg",
+            postal_code="10115",
+            color="black",
+            found_date=datetime(2026, 1, 1),
+            finder_email="finder@example.com",
+            status=ListingStatus.ACTIVE,
+            ai_is_valid_glove=number % 2 == 0,
+            ai_moderation_passed=True,
+            created_at=datetime.utcnow(),
+        ))
+    db.commit()
+    monkeypatch.setattr(confidence, "get_shard_router", lambda: SimpleNamespace(
+        names=["default"], engine=lambda shard: engine, session=lambda shard: make_session(),
+    ))
+
+    result = confidence.rescore_listings(2)
+
+    assert result["scored"] == 7
+    assert result["updated"] == 7
+    assert db.query(GloveListing).filter(GloveListing.confidence_score == 0.5).count() == 0
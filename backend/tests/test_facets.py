@@ -0,0 +1,56 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app.models import GloveListing, GloveSize, ListingStatus
+from app.services import facets
+
+LISTINGS = [
+    ("10115", "black", "Nike", GloveSize.M, ListingStatus.ACTIVE),
+    ("10115", "navy", None, GloveSize.L, ListingStatus.ACTIVE),
+    ("10117", "dunkelblau", "nike ", GloveSize.M, ListingStatus.ACTIVE),
+    ("10117", "red", "Roeckl", GloveSize.S, ListingStatus.REMOVED),
+]
+
+
+@pytest.fixture()
+def db():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    for number, (postal_code, color, brand, size, status) in enumerate(LISTINGS):
+        session.add(GloveListing(
+            photo_url=f"/uploads/{number}.jpg",
+            photo_filename=f"{number}.jpg",
+            postal_code=postal_code,
+            color=color,
+            brand=brand,
+            size=size,
+            found_date=datetime(2026, 1, 1),
+            finder_email="finder@example.com",
+            status=status,
+        ))
+    session.commit()
+    yield session
+    session.close()
+
+
+ACTIVE = [GloveListing.status == ListingStatus.ACTIVE]
+
+
+def test_total_matches_count_without_facet_filters(db):
+    total, counts = facets.count_facets(db, GloveListing.__table__, ACTIVE, {})
+    assert total == db.scalar(select(func.count()).select_from(GloveListing).where(*ACTIVE)) == 3
+    assert counts["postal_code"] == {"10115": 2, "10117": 1}
+    assert counts["color_family"] == {"black": 1, "blue": 2}
+    assert counts["brand"] == {"nike": 2}
+
+
+def test_facet_ignores_its_own_filter(db):
+    total, counts = facets.count_facets(db, GloveListing.__table__, ACTIVE, {"size": GloveListing.size == GloveSize.M})
+    assert total == 2
+    assert counts["size"] == {"m": 2, "l": 1}
+    assert counts["postal_code"] == {"10115": 1, "10117": 1}
@@ -0,0 +1,59 @@
+import asyncio
+from datetime import datetime
+from types import SimpleNamespace
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app.models import GloveListing, ListingStatus
+from app.services import moderation_queue
+
+
+class FakeStorage:
+    async def load(self, key):
+        if key == "missing.jpg":
+            raise FileNotFoundError(key)
+        return b"photo"
+
+    async def delete(self, key):
+        pass
+
+
+class FakeClaude:
+    breaker = SimpleNamespace(is_available=lambda: True)
+
+    async def analyze_glove_image(self, image_base64, media_type, detailed=True):
+        return SimpleNamespace(
+            model_dump=lambda mode=None: {"is_valid_glove": False},
+            moderation_passed=False,
+            moderation_notes="not a glove",
+        )
+
+
+def test_unreadable_photo_does_not_stop_the_run(monkeypatch):
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    make_session = sessionmaker(bind=engine)
+    db = make_session()
+    for filename in ("missing.jpg", "ok.jpg"):
+        db.add(GloveListing(
+            photo_url=f"/uploads/{filename}",
+            photo_filename=filename,
+            postal_code="10115",
+            color="black",
+            found_date=datetime(2026, 1, 1),
+            finder_email="finder@example.com",
+            status=ListingStatus.PENDING_MODERATION,
+        ))
+    db.commit()
+
+    monkeypatch.setattr(moderation_queue, "get_claude_service", FakeClaude)
+    monkeypatch.setattr(moderation_queue, "get_storage_service", FakeStorage)
+    monkeypatch.setattr(moderation_queue, "get_shard_router", lambda: SimpleNamespace(session=lambda shard: make_session()))
+    errors = moderation_queue.stats["load_errors"]
+
+    assert asyncio.run(moderation_queue.process_shard(moderation_queue.DEFAULT_SHARD, 20)) == 1
+    assert moderation_queue.stats["load_errors"] == errors + 1
+    statuses = dict(db.query(GloveListing.photo_filename, GloveListing.status).all())
+    assert statuses == {"missing.jpg": ListingStatus.PENDING_MODERATION, "ok.jpg": ListingStatus.REMOVED}
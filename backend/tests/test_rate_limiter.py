@@ -0,0 +1,41 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+from starlette.requests import Request
+
+from app.services import rate_limiter
+from app.services.rate_limiter import MemoryBucketStore, RateLimiter, client_ip
+
+
+def make_request(forwarded=None, peer="10.0.0.1"):
+    headers = [(b"x-forwarded-for", forwarded.encode())] if forwarded else []
+    return Request({"type": "http", "headers": headers, "client": (peer, 1234)})
+
+
+def test_client_ip_ignores_spoofed_forwarded_entries(monkeypatch):
+    monkeypatch.setattr(rate_limiter.settings, "trust_proxy_headers", True)
+    monkeypatch.setattr(rate_limiter.settings, "trusted_proxy_hops", 1)
+    assert client_ip(make_request("1.2.3.4, 203.0.113.7")) == "203.0.113.7"
+    assert client_ip(make_request("203.0.113.7")) == "203.0.113.7"
+    assert client_ip(make_request()) == "10.0.0.1"
+
+    monkeypatch.setattr(rate_limiter.settings, "trusted_proxy_hops", 2)
+    assert client_ip(make_request("1.2.3.4, 203.0.113.7, 10.1.1.1")) == "203.0.113.7"
+    assert client_ip(make_request("203.0.113.7")) == "10.0.0.1"
+
+
+def test_email_rejection_does_not_spend_ip_token(monkeypatch):
+    monkeypatch.setattr(rate_limiter.settings, "trust_proxy_headers", False)
+    limiter = RateLimiter(MemoryBucketStore(), {"contact": "1/hour"})
+
+    async def scenario():
+        await limiter.enforce("contact", make_request(), email="a@example.com")
+        # Same email from another IP: rejected on the email bucket only
+        with pytest.raises(HTTPException) as rejected:
+            await limiter.enforce("contact", make_request(peer="10.0.0.2"), email="a@example.com")
+        assert rejected.value.status_code == 429
+        # That IP's token was not spent
+        await limiter.enforce("contact", make_request(peer="10.0.0.2"), email="b@example.com")
+
+    asyncio.run(scenario())
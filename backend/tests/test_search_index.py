@@ -0,0 +1,115 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app.models import GloveListing, GloveSide, GloveSize, ListingStatus
+from app.routes.gloves import build_search_filters, parse_search_date
+from app.services.search_index import INDEX_COLUMNS, ListingSearchIndex
+
+# postal code, color, brand, size, side, confidence, status
+LISTINGS = [
+    ("10115", "black", "Nike", GloveSize.M, GloveSide.LEFT, 0.9, ListingStatus.ACTIVE),
+    ("10115", "navy", None, GloveSize.L, GloveSide.RIGHT, 0.8, ListingStatus.ACTIVE),
+    ("10117", "dunkelblau", "nike ", GloveSize.M, GloveSide.LEFT, 0.7, ListingStatus.ACTIVE),
+    ("10117", "red", "Roeckl", GloveSize.S, GloveSide.UNKNOWN, 0.9, ListingStatus.REMOVED),
+    ("10119", "Dark Grey", "100% wool", GloveSize.XL, GloveSide.RIGHT, 0.6, ListingStatus.ACTIVE),
+    ("10119", "grey", "100 wool", GloveSize.M, GloveSide.LEFT, 0.5, ListingStatus.ACTIVE),
+    ("10115", "light_blue", "H&M", GloveSize.S, GloveSide.RIGHT, 0.9, ListingStatus.ACTIVE),
+    ("10117", "lightblue", "  ", GloveSize.UNKNOWN, GloveSide.LEFT, 0.9, ListingStatus.ACTIVE),
+    ("10115", "black", "Nike", GloveSize.M, GloveSide.RIGHT, 0.05, ListingStatus.ACTIVE),
+    ("10119", "", "Roeckl", GloveSize.L, GloveSide.LEFT, 0.9, ListingStatus.ACTIVE),
+    ("10115", "beige", "", GloveSize.L, GloveSide.LEFT, 0.9, ListingStatus.ACTIVE),
+]
+
+SEARCHES = [
+    {},
+    {"postal_codes": "10115"},
+    {"postal_codes": "10115, 10119"},
+    {"brand": "nike"},
+    {"brand": "nike "},
+    {"brand": " "},
+    {"brand": "NIKE", "side": "left"},
+    {"brand": "100%"},
+    {"brand": "100_w"},
+    {"brand": "%"},
+    {"brand": "h&m"},
+    {"color": "blue"},
+    {"color": "light_"},
+    {"color": "%"},
+    {"color": "GREY", "size": "m"},
+    {"color_family": "blue"},
+    {"color_family": "other"},
+    {"color": "dark", "color_family": "grey"},
+    {"size": "m", "side": "left"},
+    {"size": "unknown"},
+    {"side": "right", "postal_codes": "10119"},
+    {"date_from": "2026-01-04"},
+    {"date_from": "2026-01-02", "date_to": "2026-01-06T00:00:00"},
+    {"date_to": "not a date", "brand": "roeckl"},
+]
+
+
+@pytest.fixture()
+def db():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    for number, (postal_code, color, brand, size, side, confidence, status) in enumerate(LISTINGS):
+        session.add(GloveListing(
+            photo_url=f"/uploads/{number}.jpg",
+            photo_filename=f"{number}.jpg",
+            postal_code=postal_code,
+            color=color,
+            brand=brand,
+            size=size,
+            side=side,
+            # Pairs of listings share a date, so the page order also depends on the id tie-break
+            found_date=datetime(2026, 1, 1) + timedelta(days=number // 2),
+            finder_email="finder@example.com",
+            confidence_score=confidence,
+            status=status,
+        ))
+    session.commit()
+    yield session
+    session.close()
+
+
+def sql_search(db, offset: int, limit: int, **params) -> tuple[int, list[int]]:
+    filters = build_search_filters(**params)
+    total = db.scalar(select(func.count(GloveListing.id)).where(*filters))
+    ids = db.scalars(
+        select(GloveListing.id)
+        .where(*filters)
+        .order_by(GloveListing.found_date.desc(), GloveListing.id.desc())
+        .offset(offset)
+        .limit(limit)
+    ).all()
+    return total, list(ids)
+
+
+def index_search(index: ListingSearchIndex, offset: int, limit: int, **params) -> tuple[int, list[int]]:
+    postal_codes = params.pop("postal_codes", None)
+    date_from = parse_search_date(params.pop("date_from", None))
+    date_to = parse_search_date(params.pop("date_to", None))
+    total, page = index.search(
+        [code.strip() for code in postal_codes.split(",")] if postal_codes else None,
+        date_from=date_from,
+        date_to=date_to,
+        offset=offset,
+        limit=limit,
+        **params,
+    )
+    return total, [listing_id for _, listing_id in page]
+
+
+@pytest.mark.parametrize("params", SEARCHES)
+@pytest.mark.parametrize("offset, limit", [(0, 20), (0, 2), (1, 2), (3, 3)])
+def test_index_matches_sql_search(db, params, offset, limit):
+    index = ListingSearchIndex(capacity=4)  # Small, so loading also grows the columns
+    for row in db.execute(select(*INDEX_COLUMNS)):
+        index.apply("default", row)
+
+    assert index_search(index, offset, limit, **params) == sql_search(db, offset, limit, **params)
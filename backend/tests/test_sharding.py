@@ -0,0 +1,22 @@
+from sqlalchemy import create_engine
+
+from app import sharding
+from app.database import Base
+from app.sharding import DEFAULT_SHARD, ShardRouter
+
+
+def test_unallocated_id_is_not_cached_as_default(monkeypatch, tmp_path):
+    directory = create_engine(f"sqlite:///{tmp_path / 'main.db'}")
+    Base.metadata.create_all(directory)
+    monkeypatch.setattr(sharding, "get_engine", lambda: directory)
+    shard_urls = {"hamburg": f"sqlite:///{tmp_path / 'hamburg.db'}"}
+    routes = {"2": "hamburg"}
+    prober, writer = ShardRouter(shard_urls, routes), ShardRouter(shard_urls, routes)
+
+    # A client probes the next id before any worker has allocated it
+    assert prober.shard_of_listing(1) == DEFAULT_SHARD
+    assert prober.group_by_shard([1]) == {DEFAULT_SHARD: [1]}
+
+    assert writer.allocate_listing_id("hamburg") == 1
+    assert prober.shard_of_listing(1) == "hamburg"
+    assert prober.group_by_shard([1, 2]) == {"hamburg": [1], DEFAULT_SHARD: [2]}
@@ -0,0 +1,38 @@
+from datetime import datetime
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app.models import GloveListing, ListingStatus
+from app.routes.gloves import stats_data_version
+from app.services.listing_lifecycle import archive_finished_listings
+
+
+def add_listing(db, updated_at, status=ListingStatus.ACTIVE):
+    db.add(GloveListing(
+        photo_url="/uploads/a.jpg",
+        photo_filename="a.jpg",
+        postal_code="10115",
+        color="black",
+        found_date=datetime(2026, 1, 1),
+        finder_email="finder@example.com",
+        status=status,
+        updated_at=updated_at,
+    ))
+    db.commit()
+
+
+def test_stats_version_changes_when_a_claimed_listing_is_archived():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+    add_listing(db, datetime(2026, 1, 1))
+    before = stats_data_version(db)
+
+    # Uploaded, claimed and archived while nobody looked at the stats
+    add_listing(db, datetime(2026, 1, 2), ListingStatus.CLAIMED)
+    assert archive_finished_listings(db, datetime(2026, 1, 3), 100) == 1
+
+    assert db.query(GloveListing).count() == 1
+    assert stats_data_version(db) != before
@@ -248,6 +248,11 @@ export default function UploadPage() {
       setMaterial(result.material || '');
       setDescription(result.description);
       
+      // Postal code from the photo's GPS location, unless the user already typed one
+      if (result.suggested_postal_code && !postalCode) {
+        setPostalCode(result.suggested_postal_code);
+      }
+      
       if (result.suggested_price_eur) {
         setFeeAmount(result.suggested_price_eur);
         setFeeCurrency('eur');
@@ -11,6 +11,7 @@ export interface GloveAnalysis {
   is_valid_glove: boolean;
   moderation_passed: boolean;
   moderation_notes: string | null;
+  suggested_postal_code: string | null;
 }
 
 export interface GloveListing {
@@ -221,3 +222,22 @@ export async function getPostalCodeStats(): Promise<PostalCodeStats[]> {
 
 
 
+
+// Live feed of newly listed gloves (Server-Sent Events); returns an unsubscribe function
+export function subscribeToListings(
+  postalCodes: string[],
+  onListing: (listing: GloveListing) => void,
+): () => void {
+  const searchParams = new URLSearchParams();
+  if (postalCodes.length) {
+    searchParams.set('postal_codes', postalCodes.join(','));
+  }
+
+  // EventSource reconnects on its own, including after the server drops a slow client
+  const source = new EventSource(`${API_BASE}/api/gloves/stream?${searchParams}`);
+  source.addEventListener('listing', (event) => {
+    onListing(JSON.parse((event as MessageEvent).data));
+  });
+
+  return () => source.close();
+}